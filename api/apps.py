@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        # Count queries and DB time per request, see api/instrumentation.py
+        from django.db.backends.signals import connection_created
+        from .db import configure_sqlite
+        from .instrumentation import install_query_recorder
+        connection_created.connect(install_query_recorder, dispatch_uid='api.install_query_recorder')
+        # WAL, busy timeout etc. on SQLite, see api/db.py
+        connection_created.connect(configure_sqlite, dispatch_uid='api.configure_sqlite')
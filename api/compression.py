@@ -0,0 +1,113 @@
+"""
+Negotiated response compression.
+
+CompressionMiddleware works like django.middleware.gzip.GZipMiddleware,
+with these differences:
+- It only compresses bodies of at least ``COMPRESSION['MIN_SIZE']`` bytes. Smaller
+  ones cost more CPU than they save on the wire.
+- It only compresses the ``CONTENT_TYPES`` listed, so images and PDFs are left as they are.
+- It uses brotli when the ``brotli`` package is installed and the client accepts it,
+  and falls back to gzip. The Accept-Encoding q-values are honoured.
+- It leaves streaming responses alone: the status stream must not be buffered,
+  and media files are served by the web server in production.
+- It times the work as a ``compress`` Server-Timing entry.
+
+Configure it with ``REST_FRAMEWORK['COMPRESSION']``. As with GZipMiddleware,
+gzip output is padded with random bytes to blunt BREACH-style attacks.
+"""
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+
+from .instrumentation import span
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def get_config():
+    config = {
+        'ENABLED': True,
+        'MIN_SIZE': 1024,
+        'CONTENT_TYPES': ('application/json', 'text/', 'application/javascript', 'image/svg+xml'),
+        'BROTLI_QUALITY': 5,
+    }
+    config.update(getattr(settings, 'REST_FRAMEWORK', {}).get('COMPRESSION', {}))
+    return config
+
+
+def parse_accept_encoding(header):
+    """{coding: q} of an Accept-Encoding header."""
+    codings = {}
+    for item in header.split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        codings[coding] = quality
+    return codings
+
+
+def choose_encoding(header, available):
+    """The acceptable coding the client ranks highest, ties going to the order of ``available``."""
+    codings = parse_accept_encoding(header)
+    chosen, best = None, 0.0
+    for coding in available:
+        quality = codings.get(coding, codings.get('*', 0.0))
+        if quality > best:
+            chosen, best = coding, quality
+    return chosen
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Put it right after RequestMetricsMiddleware, see the module docstring."""
+
+    max_random_bytes = 100
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.config = get_config()
+        self.content_types = tuple(self.config['CONTENT_TYPES'])
+        # In order of preference
+        self.encoders = {}
+        if brotli is not None:
+            self.encoders['br'] = lambda content: brotli.compress(content, quality=self.config['BROTLI_QUALITY'])
+        self.encoders['gzip'] = lambda content: compress_string(content, max_random_bytes=self.max_random_bytes)
+
+    def process_response(self, request, response):
+        if not self.config['ENABLED'] or response.streaming or response.has_header('Content-Encoding'):
+            return response
+        if not response.get('Content-Type', '').startswith(self.content_types):
+            return response
+        if len(response.content) < self.config['MIN_SIZE']:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''), self.encoders)
+        if encoding is None:
+            return response
+
+        with span('compress'):
+            compressed = self.encoders[encoding](response.content)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+
+        # A strong ETag stands for the uncompressed bytes, RFC 9110 section 8.8.1
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
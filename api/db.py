@@ -0,0 +1,38 @@
+"""
+SQLite connection tuning, applied to every new connection (see ApiConfig.ready()).
+
+WAL lets readers carry on while a registration is being written, and the
+busy timeout makes a second writer wait for the lock instead of failing
+with "database is locked".
+"""
+from django.conf import settings
+
+DEFAULT_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',  # Safe with WAL, only checkpoints wait for fsync
+    'busy_timeout': 5000,  # Milliseconds
+    'mmap_size': 128 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+
+def get_sqlite_pragmas():
+    """DEFAULT_SQLITE_PRAGMAS updated with ``settings.SQLITE_PRAGMAS``."""
+    return {**DEFAULT_SQLITE_PRAGMAS, **getattr(settings, 'SQLITE_PRAGMAS', {})}
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    # Straight on the sqlite3 connection, so the pragmas don't count as request queries
+    for name, value in get_sqlite_pragmas().items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+
+
+def sqlite_pragma_values(connection):
+    """Current values of the configured pragmas, for checking a connection."""
+    connection.ensure_connection()
+    return {
+        name: connection.connection.execute(f'PRAGMA {name}').fetchone()[0]
+        for name in get_sqlite_pragmas()
+    }
@@ -0,0 +1,203 @@
+"""
+Per-request query count and timing.
+
+RequestMetricsMiddleware records, for every request, the number of queries,
+the time spent in the database, the time spent rendering the response and
+the total time, keyed by URL name. They go out as a JSON log line on the
+``api.requests`` logger and histograms shown by /api/metrics/, and with
+``SERVER_TIMING`` on as a ``Server-Timing`` header to INTERNAL_IPS only, since
+DB timings tell others too much. Requests over their QUERY_BUDGETS entry are
+logged as warnings.
+
+Wrap a block in ``span('name')`` (from ice_alumni_association/timing.py) to
+time it as its own Server-Timing entry.
+"""
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from ice_alumni_association.timing import RequestMetrics, _current, current, span  # noqa: F401
+
+logger = logging.getLogger('api.requests')
+
+
+def get_config():
+    config = {
+        'ENABLED': True,
+        'SERVER_TIMING': False,
+        'QUERY_BUDGETS': {},
+    }
+    config.update(getattr(settings, 'REQUEST_METRICS', {}))
+    return config
+
+
+def record_query(execute, sql, params, many, context):
+    # Installed on every connection, see ApiConfig.ready()
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_time += time.perf_counter() - started
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class Histogram:
+    """A labelled Prometheus histogram kept in process memory."""
+
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.counts = defaultdict(lambda: [0] * (len(self.buckets) + 1))
+            self.sums = defaultdict(float)
+
+    def observe(self, label, value):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[label][index] += 1
+            self.sums[label] += value
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self.lock:
+            series = sorted((label, list(counts), self.sums[label]) for label, counts in self.counts.items())
+        for label, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{view="{label}",le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{view="{label}"}} {total:.6f}')
+            lines.append(f'{self.name}_count{{view="{label}"}} {cumulative}')
+        return lines
+
+
+SECONDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUEST_DURATION = Histogram('http_request_duration_seconds', 'Total time per request.', SECONDS)
+REQUEST_DB_TIME = Histogram('http_request_db_seconds', 'Time spent in database queries per request.', SECONDS)
+REQUEST_RENDER_TIME = Histogram('http_request_render_seconds', 'Time spent rendering the response body.', SECONDS)
+REQUEST_QUERIES = Histogram('http_request_queries', 'Database queries per request.', (0, 1, 2, 3, 5, 10, 20, 50, 100))
+
+HISTOGRAMS = [REQUEST_DURATION, REQUEST_DB_TIME, REQUEST_RENDER_TIME, REQUEST_QUERIES]
+
+
+def expose_histograms():
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.expose())
+    return lines
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.view_name
+
+
+class RequestMetricsMiddleware:
+    """
+    Put this first in MIDDLEWARE so the total covers the other middleware.
+    Streaming responses are timed until the response starts, not until the
+    stream ends.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.config = get_config()
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.config['ENABLED']:
+            return self.get_response(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        if not self.config['ENABLED']:
+            return await self.get_response(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered right after this hook returns
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.render_started = time.perf_counter()
+        return response
+
+    def finish(self, request, response, metrics):
+        now = time.perf_counter()
+        total = now - metrics.started
+        if metrics.render_started is not None:
+            metrics.render_time = now - metrics.render_started
+        view = view_name(request)
+
+        REQUEST_DURATION.observe(view, total)
+        REQUEST_DB_TIME.observe(view, metrics.db_time)
+        REQUEST_RENDER_TIME.observe(view, metrics.render_time)
+        REQUEST_QUERIES.observe(view, metrics.queries)
+
+        if self.config['SERVER_TIMING'] and request.META.get('REMOTE_ADDR') in settings.INTERNAL_IPS:
+            entries = [
+                f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.queries} queries"',
+                f'render;dur={metrics.render_time * 1000:.1f}',
+            ]
+            entries += [f'{name};dur={seconds * 1000:.1f}' for name, seconds in metrics.spans.items()]
+            entries.append(f'total;dur={total * 1000:.1f}')
+            response['Server-Timing'] = ', '.join(entries)
+
+        budget = self.config['QUERY_BUDGETS'].get(view)
+        over_budget = budget is not None and metrics.queries > budget
+        record = {
+            'view': view,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': metrics.queries,
+            'query_budget': budget,
+            'db_ms': round(metrics.db_time * 1000, 2),
+            'render_ms': round(metrics.render_time * 1000, 2),
+            'total_ms': round(total * 1000, 2),
+        }
+        record.update({f'{name}_ms': round(seconds * 1000, 2) for name, seconds in metrics.spans.items()})
+        if over_budget:
+            logger.warning(json.dumps(record), extra={'request_metrics': record})
+        else:
+            logger.info(json.dumps(record), extra={'request_metrics': record})
+        return response
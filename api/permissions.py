@@ -0,0 +1,10 @@
+from django.conf import settings
+from rest_framework.permissions import BasePermission
+
+class IsInternalRequest(BasePermission):
+    """Allow staff users and requests coming from INTERNAL_IPS (e.g. a metrics scraper)."""
+
+    def has_permission(self, request, view):
+        if request.user and request.user.is_staff:
+            return True
+        return request.META.get('REMOTE_ADDR') in getattr(settings, 'INTERNAL_IPS', [])
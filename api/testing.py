@@ -0,0 +1,50 @@
+"""
+Helpers for checking endpoints against their query budgets.
+
+    from api.testing import QueryBudgetMixin
+
+    class EventListTests(QueryBudgetMixin, TestCase):
+        def test_list(self):
+            with self.assertQueryBudget('event-list'):
+                self.client.get('/api/events/')
+
+Budgets come from ``REQUEST_METRICS['QUERY_BUDGETS']`` unless one is passed.
+"""
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+from .instrumentation import get_config
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def get_budget(view_name):
+    budgets = get_config()['QUERY_BUDGETS']
+    if view_name not in budgets:
+        raise KeyError(f"No query budget declared for {view_name!r} in REQUEST_METRICS['QUERY_BUDGETS'].")
+    return budgets[view_name]
+
+
+@contextmanager
+def query_budget(view_name=None, budget=None, using=DEFAULT_DB_ALIAS):
+    """Fail with the captured SQL when the block runs more queries than the budget."""
+    if budget is None:
+        budget = get_budget(view_name)
+    with CaptureQueriesContext(connections[using]) as context:
+        yield context
+    if len(context) > budget:
+        queries = '\n'.join(f"{i}. {query['sql']}" for i, query in enumerate(context.captured_queries, start=1))
+        raise QueryBudgetExceeded(
+            f"{view_name or 'Block'} ran {len(context)} queries, the budget is {budget}:\n{queries}"
+        )
+
+
+class QueryBudgetMixin:
+    """TestCase mixin, see the module docstring."""
+
+    def assertQueryBudget(self, view_name=None, budget=None, using=DEFAULT_DB_ALIAS):
+        return query_budget(view_name, budget, using)
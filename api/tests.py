@@ -1,3 +1,190 @@
-from django.test import TestCase
+import datetime
+import gzip
+import json
+import logging
+from decimal import Decimal
+from unittest import mock, skipIf
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from . import renderers
+from .compression import CompressionMiddleware, choose_encoding
+from .db import DEFAULT_SQLITE_PRAGMAS, get_sqlite_pragmas, sqlite_pragma_values
+from .testing import QueryBudgetExceeded, query_budget
+
+
+def metrics_settings(**overrides):
+    return override_settings(REQUEST_METRICS={**settings.REQUEST_METRICS, **overrides})
+
+
+class ServerTimingTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.enterClassContext(mock.patch.object(logging.getLogger('api.requests'), 'disabled', True))
+        super().setUpClass()
+
+    def setUp(self):
+        # Cached responses run no queries
+        cache.clear()
+
+    def test_off_by_default(self):
+        with metrics_settings(SERVER_TIMING=False):
+            response = self.client.get('/api/events/')
+        self.assertNotIn('Server-Timing', response)
+
+    def test_sent_to_internal_ips_only(self):
+        with metrics_settings(SERVER_TIMING=True):
+            internal = self.client.get('/api/events/', REMOTE_ADDR='127.0.0.1')
+            public = self.client.get('/api/events/', REMOTE_ADDR='203.0.113.7')
+        self.assertRegex(internal['Server-Timing'], r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertNotIn('Server-Timing', public)
+
+    def test_over_budget_request_is_logged_as_a_warning(self):
+        with metrics_settings(QUERY_BUDGETS={'event-list': 0}), mock.patch('api.instrumentation.logger') as logger:
+            self.client.get('/api/events/')
+        logger.warning.assert_called_once()
+
+    def test_metrics_are_internal(self):
+        self.assertEqual(self.client.get('/api/metrics/', REMOTE_ADDR='203.0.113.7').status_code, 403)
+        self.assertContains(self.client.get('/api/metrics/'), 'events_cache_hits_total')
+
+
+class QueryBudgetTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_budget_from_settings(self):
+        with query_budget('event-detail') as context:
+            self.client.get('/api/events/missing/')
+        self.assertEqual(len(context), 1)
+
+    def test_exceeded_budget_fails_with_the_queries(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'the budget is 0:\n1. SELECT'):
+            with query_budget('event-list', budget=0):
+                self.client.get('/api/events/')
+
+
+class SQLitePragmaTests(TestCase):
+
+    def test_settings_override_single_pragmas(self):
+        with override_settings(SQLITE_PRAGMAS={'busy_timeout': 1000}):
+            self.assertEqual(get_sqlite_pragmas(), {**DEFAULT_SQLITE_PRAGMAS, 'busy_timeout': 1000})
+
+    def test_applied_to_the_connection(self):
+        values = sqlite_pragma_values(connection)
+        self.assertEqual(values['journal_mode'], 'wal')
+        self.assertEqual(values['busy_timeout'], 5000)
+
+
+def compression_settings(**overrides):
+    config = settings.REST_FRAMEWORK.get('COMPRESSION', {})
+    return override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'COMPRESSION': {**config, **overrides}})
+
+
+class CompressionTests(SimpleTestCase):
+    body = json.dumps([{'description': '<p>Reunion</p>' * 20, 'id': i} for i in range(20)]).encode()
+
+    def compress(self, response, accept_encoding='gzip', **config):
+        with compression_settings(**config):
+            middleware = CompressionMiddleware(lambda request: response)
+        request = RequestFactory().get('/api/events/', HTTP_ACCEPT_ENCODING=accept_encoding)
+        return middleware(request)
+
+    def json_response(self, content=None, **kwargs):
+        return HttpResponse(self.body if content is None else content, content_type='application/json', **kwargs)
+
+    def test_compresses_large_json(self):
+        response = self.compress(self.json_response(), accept_encoding='gzip', MIN_SIZE=1024)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), self.body)
+
+    def test_small_bodies_are_left_alone(self):
+        response = self.compress(self.json_response(b'{"id":1}'), MIN_SIZE=1024)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, b'{"id":1}')
+
+    def test_unlisted_content_types_are_left_alone(self):
+        response = self.compress(HttpResponse(self.body, content_type='image/png'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_streaming_responses_are_left_alone(self):
+        response = self.compress(StreamingHttpResponse(iter([self.body]), content_type='text/event-stream'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(response.streaming_content), self.body)
+
+    def test_disabled(self):
+        response = self.compress(self.json_response(), ENABLED=False)
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_strong_etag_is_weakened(self):
+        response = self.compress(self.json_response(headers={'ETag': '"abc"'}))
+        self.assertEqual(response['ETag'], 'W/"abc"')
+        weak = self.compress(self.json_response(headers={'ETag': 'W/"abc"'}))
+        self.assertEqual(weak['ETag'], 'W/"abc"')
+
+    def test_refused_encoding(self):
+        response = self.compress(self.json_response(), accept_encoding='gzip;q=0')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_choose_encoding(self):
+        available = ('br', 'gzip')
+        self.assertEqual(choose_encoding('gzip, br', available), 'br')
+        self.assertEqual(choose_encoding('br;q=0.5, gzip', available), 'gzip')
+        self.assertEqual(choose_encoding('br;q=0, *', available), 'gzip')
+        self.assertEqual(choose_encoding('*;q=0.1', available), 'br')
+        self.assertEqual(choose_encoding('GZIP;Q=1', available), 'gzip')
+        self.assertIsNone(choose_encoding('gzip;q=0', available))
+        self.assertIsNone(choose_encoding('identity', available))
+        self.assertIsNone(choose_encoding('', available))
+
+
+class JSONBackendTests(SimpleTestCase):
+    data = {
+        'name': 'Reunion \u2028',
+        'amount': Decimal('500.00'),
+        'date': datetime.date(2025, 1, 2),
+        'time': datetime.datetime(2025, 1, 2, 10, 30, tzinfo=datetime.timezone.utc),
+        'big': 2 ** 70,
+        'items': [1, 2.5, None, True],
+    }
+
+    @skipIf(renderers.orjson is None, 'orjson is not installed')
+    def test_backends_agree(self):
+        self.assertEqual(renderers.dumps(self.data, backend='orjson'), renderers.dumps(self.data, backend='stdlib'))
+        self.assertEqual(
+            renderers.dumps(self.data, sort_keys=True, backend='orjson'),
+            renderers.dumps(self.data, sort_keys=True, backend='stdlib'),
+        )
+
+    def test_stdlib_output(self):
+        self.assertEqual(
+            json.loads(renderers.dumps(self.data, backend='stdlib')),
+            {
+                'name': 'Reunion \u2028',
+                'amount': 500.0,
+                'date': '2025-01-02',
+                'time': '2025-01-02T10:30:00Z',
+                'big': 2 ** 70,
+                'items': [1, 2.5, None, True],
+            },
+        )
+        self.assertNotIn(b'\xe2\x80\xa8', renderers.dumps(self.data, backend='stdlib'))
+
+    def test_backend_setting(self):
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'JSON_BACKEND': 'stdlib'}):
+            self.assertEqual(renderers.get_backend(), 'stdlib')
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'JSON_BACKEND': 'simplejson'}):
+            with self.assertRaises(ValueError):
+                renderers.get_backend()
+
+    def test_renderer_matches_dumps(self):
+        self.assertEqual(renderers.FastJSONRenderer().render(self.data), renderers.dumps(self.data))
@@ -1,5 +1,10 @@
 from django.urls import path, include
+from events.views.Media import MediaVariantView
+from .views import MetricsView
 
 urlpatterns = [
     path('events/', include('events.urls')),
+    path('async/events/', include('events.async_urls')),
+    path('media/variants/<slug:size>/<slug:fmt>/<path:source>', MediaVariantView.as_view(), name='media-variant'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
 ]
@@ -1,3 +1,25 @@
-from django.shortcuts import render
+from django.http import HttpResponse
+from rest_framework.views import APIView
+from events import cache as events_cache
+from .instrumentation import expose_histograms
+from .permissions import IsInternalRequest
 
-# Create your views here.
+class MetricsView(APIView):
+    """
+    Internal metrics in the Prometheus text exposition format.
+    """
+    permission_classes = [IsInternalRequest]
+
+    def get(self, request, *args, **kwargs):
+        cache_stats = events_cache.stats()
+        lines = [
+            '# HELP events_cache_hits_total Event responses served from the cache.',
+            '# TYPE events_cache_hits_total counter',
+            f"events_cache_hits_total {cache_stats['hits']}",
+            '# HELP events_cache_misses_total Event responses built from the database.',
+            '# TYPE events_cache_misses_total counter',
+            f"events_cache_misses_total {cache_stats['misses']}",
+        ]
+        # Per-view latency, DB time and query count of this worker process
+        lines += expose_histograms()
+        return HttpResponse('\n'.join(lines) + '\n', content_type='text/plain; version=0.0.4')
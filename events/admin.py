@@ -2,34 +2,136 @@
 # from .models import Event
 from django.contrib import admin
 # from .models import Registration, Event
+from django.db.models import Q
 from django.utils.html import format_html
+from import_export.admin import ImportMixin
 from .models.Event import Event
 from .models.Registration import Registration
+from .models.ImageJob import ImageJob
+from .models.PaymentMethod import PaymentMethod
+from .models.Notification import Notification
+from .models.StoredFile import StoredFile
+from .approvals import set_approval
+from .exports import export_csv_response, export_xlsx_response
+from .resources import RegistrationResource
+from .pagination import EstimatedCountPaginator
+from .search import filter_matching
+
+
+def prefix(field, term):
+    # A range, so the index serves it on every database. LIKE 'term%' can't use it on SQLite
+    return Q(**{f'{field}__gte': term, f'{field}__lt': term + '\U0010ffff'})
+
+class PaymentMethodInline(admin.StackedInline):
+    model = PaymentMethod
+    extra = 0
+    fields = (('provider', 'is_active', 'sort_order'), ('account_name', 'account_number', 'payment_option'), ('bank_name', 'branch_name'), ('swift_code', 'routing_number'), ('city', 'country'))
 
 class EventAdmin(admin.ModelAdmin):
-    list_display = ('event_id', 'title', 'start_time', 'end_time', 'status')
+    list_display = ('event_id', 'title', 'start_time', 'end_time', 'status', 'capacity', 'seats_taken')
     list_filter = ('status',)
-    search_fields = ('title', 'event_id', 'description')
+    # Searched through the full-text index, see get_search_results()
+    search_fields = ('title',)
     # You can include the media file directly in the form
-    fields = ('event_id', 'title', 'description', 'start_time', 'end_time', 'location', 'status', 'media_file', 'amount_per_person', 'amount_per_adult_guest', 'amount_per_child_guest', 'bkash_account_number', 'bkash_payment_option', 'nagad_account_number', 'nagad_payment_option', 'rocket_account_number', 'rocket_payment_option', 'bank_account_name', 'bank_account_number', 'bank_name', 'bank_branch_name', 'bank_swift_code', 'bank_routing_number', 'bank_city', 'bank_country')
+    fields = ('event_id', 'title', 'description', 'start_time', 'end_time', 'location', 'status', 'media_file', 'amount_per_person', 'amount_per_adult_guest', 'amount_per_child_guest', 'capacity', 'seats_taken')
+    readonly_fields = ('seats_taken',)
+    inlines = [PaymentMethodInline]
+
+    def get_search_results(self, request, queryset, search_term):
+        # The full-text index covers the title, location and description text,
+        # instead of a LIKE scan over the description HTML
+        if not search_term.strip():
+            return queryset, False
+        return filter_matching(queryset, search_term) | queryset.filter(event_id=search_term.strip()), False
 
 admin.site.register(Event, EventAdmin)
 
 # Define a custom admin class for Registration model
-class RegistrationAdmin(admin.ModelAdmin):
+class RegistrationAdmin(ImportMixin, admin.ModelAdmin):
+    # Spreadsheet import, see events/resources.py
+    resource_classes = [RegistrationResource]
+
     # List the fields you want to display in the admin list view
     list_display = (
-        'student_id', 'full_name', 'event_id', 'total_amount', 'registration_datetime', 'approved', 'transaction_document', 'profile_picture'
+        'student_id', 'full_name', 'event', 'total_amount', 'registration_datetime', 'approved', 'transaction_document', 'profile_picture'
     )
+    # The event title comes from the same query
+    list_select_related = ('event',)
 
     # Add filters to the sidebar
-    list_filter = ('approved', 'event_id')
+    list_filter = ('approved', 'waitlisted', 'event')
 
-    # Add search fields for quick searching
+    # Add search fields for quick searching, see get_search_results()
     search_fields = ('student_id', 'full_name', 'email', 'transaction_id')
 
+    # Don't COUNT(*) the whole table on every page
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
     # Make sure admin can see the password field (although hashed, useful for debugging)
     readonly_fields = ('password',)
 
+    def get_search_results(self, request, queryset, search_term):
+        # Exact and prefix lookups each index can serve, no LIKE '%term%' scans.
+        # Case-sensitive, so names are also tried capitalized and emails lowercased
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        capitalized = term[:1].upper() + term[1:]
+        q = (
+            prefix('student_id', term) | Q(transaction_id=term) | Q(email__in={term, term.lower()})
+            | prefix('full_name', term) | prefix('full_name', capitalized)
+        )
+        return queryset.filter(q), False
+
+    actions = ['approve_selected', 'reject_selected', 'export_csv', 'export_xlsx']
+
+    @admin.action(description="Approve selected registrations and email them")
+    def approve_selected(self, request, queryset):
+        changed = set_approval(list(queryset.values_list('pk', flat=True)), True)
+        self.message_user(request, f"{len(changed)} registration(s) approved, emails queued.")
+
+    @admin.action(description="Reject selected registrations and email them")
+    def reject_selected(self, request, queryset):
+        changed = set_approval(list(queryset.values_list('pk', flat=True)), False)
+        self.message_user(request, f"{len(changed)} registration(s) rejected, emails queued.")
+
+    @admin.action(description="Export selected registrations as CSV")
+    def export_csv(self, request, queryset):
+        return export_csv_response(queryset, 'registrations')
+
+    @admin.action(description="Export selected registrations as XLSX")
+    def export_xlsx(self, request, queryset):
+        return export_xlsx_response(queryset, 'registrations')
+
 # Register the Registration model with the custom admin class
 admin.site.register(Registration, RegistrationAdmin)
+
+class ImageJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'operation', 'content_type', 'object_id', 'field_name', 'status', 'attempts', 'run_after', 'updated_at')
+    list_filter = ('status', 'operation')
+    readonly_fields = ('last_error',)
+
+admin.site.register(ImageJob, ImageJobAdmin)
+
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ('id', 'registration', 'kind', 'status', 'attempts', 'created_at', 'sent_at')
+    list_filter = ('status', 'kind')
+    list_select_related = ('registration__event',)
+    readonly_fields = ('last_error',)
+
+admin.site.register(Notification, NotificationAdmin)
+
+class StoredFileAdmin(admin.ModelAdmin):
+    # Maintained by the storage backend, see events/storage.py
+    list_display = ('name', 'size', 'references', 'created_at')
+    search_fields = ('name', 'sha256')
+    readonly_fields = ('name', 'sha256', 'size', 'references', 'created_at')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+admin.site.register(StoredFile, StoredFileAdmin)
@@ -0,0 +1,26 @@
+from django.db import transaction
+from .broker import publish_registration_status
+from .models.Registration import Registration
+from .notifications import queue_notifications
+
+
+def set_approval(registration_ids, approved):
+    """
+    Approve or reject many registrations with a single UPDATE.
+
+    Bypasses ``Registration.save()`` (and its hashing/image side effects),
+    queues one notification per changed registration and pushes the new
+    status to waiting clients. Returns the ids that actually changed.
+    """
+    with transaction.atomic():
+        changed = list(
+            Registration.objects.select_for_update()
+            .filter(pk__in=registration_ids)
+            .exclude(approved=approved)
+            .values_list('pk', flat=True)
+        )
+        Registration.objects.filter(pk__in=changed).update(approved=approved)
+        queue_notifications(changed, 'approved' if approved else 'rejected')
+
+        transaction.on_commit(lambda: [publish_registration_status(pk, approved) for pk in changed])
+    return changed
@@ -0,0 +1,11 @@
+from django.urls import path
+from .views import Async
+
+# Async versions of the read endpoints in urls.py, see views/Async.py
+urlpatterns = [
+    path('registrations/check/', Async.registration_check, name='async-registration-check'),
+    path('<str:event_id>/', Async.event_detail, name='async-event-detail'),
+    path('', Async.event_list, name='async-event-list'),
+    path('<slug:event_id>/calculate_total_amount/', Async.calculate_total_amount, name='async-calculate-total-amount'),
+    path('<slug:event_id>/payment-methods/', Async.payment_methods, name='async-payment-methods'),
+]
@@ -0,0 +1,326 @@
+"""
+Load benchmark for the events API, run by ``python manage.py benchmark_api``.
+
+Seeds a throwaway database with events, registrations and synthetic images,
+then drives each endpoint through the Django test client, either from a
+thread pool (the WSGI path) or from asyncio tasks through the ASGI handler.
+Queries per request are read from the Server-Timing header added by
+api.instrumentation.
+"""
+import asyncio
+import json
+import math
+import platform
+import re
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import BytesIO
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.utils import timezone
+from PIL import Image
+
+from . import search
+from .models.Event import Event, event_media_upload_to
+from .models.PaymentMethod import PaymentMethod
+from .models.Registration import Registration
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PASSWORD = 'bench-password'
+QUERIES_RE = re.compile(r'desc="(\d+) queries"')
+
+
+def synthetic_image(size, seed, fmt='JPEG'):
+    """A gradient image, so it doesn't compress down to nothing like a flat colour would."""
+    image = Image.linear_gradient('L').resize(size).convert('RGB')
+    image = Image.merge('RGB', [band.point(lambda v, s=seed * (i + 1): (v + s) % 256) for i, band in enumerate(image.split())])
+    buffer = BytesIO()
+    image.save(buffer, fmt, quality=85)
+    return buffer.getvalue()
+
+
+def seed(events=50, registrations=500, image_size=(1600, 900)):
+    """Bulk-create the benchmark data, returns the event IDs."""
+    now = timezone.now()
+    event_objects = []
+    for i in range(events):
+        event = Event(
+            event_id=f'bench-{i:04d}',
+            title=f'Benchmark Reunion {i}',
+            description=f'<p>Alumni gathering number {i}.</p><p>Dinner, cultural programme and a photo session.</p>',
+            start_time=now + timedelta(days=i + 1),
+            end_time=now + timedelta(days=i + 1, hours=6),
+            location=['Rajshahi', 'Dhaka', 'Chattogram'][i % 3],
+            amount_per_person=1000,
+            amount_per_adult_guest=500,
+            amount_per_child_guest=200,
+        )
+        name = event_media_upload_to(event, 'cover.jpg')
+        event.media_file.name = default_storage.save(name, ContentFile(synthetic_image(image_size, i)))
+        event_objects.append(event)
+    Event.objects.bulk_create(event_objects, batch_size=500)
+    search.rebuild()
+
+    PaymentMethod.objects.bulk_create([
+        PaymentMethod(event=event, provider='bkash', account_number='01700000000', payment_option='send money')
+        for event in event_objects
+    ])
+
+    # One hash and one set of files for every row, seeding shouldn't take longer than the run
+    password = make_password(PASSWORD)
+    picture = default_storage.save('profile_picture/bench.jpg', ContentFile(synthetic_image((600, 800), 7)))
+    document = default_storage.save('transactions_documents/bench.jpg', ContentFile(synthetic_image((400, 300), 3)))
+    rows = []
+    for i in range(registrations):
+        rows.append(Registration(
+            event=event_objects[i % events], student_id=f'bench-{i:06d}', full_name=f'Alumnus {i}',
+            date_of_birth='1995-01-01', batch=str(10 + i % 15), session='2015-16',
+            email=f'alumnus{i}@example.com', contact_number='01700000000', whatsapp_number='01700000000',
+            adult_guests=1, child_guests=i % 3, total_amount=1500 + 200 * (i % 3), payment_method='bkash',
+            transaction_id=f'BENCH{i:08d}', transaction_document=document, profile_picture=picture,
+            password=password, approved=i % 2 == 0,
+        ))
+    Registration.objects.bulk_create(rows, batch_size=500)
+    return [event.event_id for event in event_objects]
+
+
+REGISTER_PICTURE = synthetic_image((1200, 1600), 11)
+REGISTER_DOCUMENT = synthetic_image((800, 600), 5)
+
+
+class Endpoint:
+    """Builds the request for iteration ``i`` as (method, path, kwargs)."""
+
+    def __init__(self, name, build):
+        self.name = name
+        self.build = build
+
+
+def get_endpoints(event_ids, registrations, run_id, async_views=False):
+    # The read endpoints also exist as async views, see events/views/Async.py
+    base = '/api/async/events' if async_views else '/api/events'
+
+    def event(i):
+        return event_ids[i % len(event_ids)]
+
+    def register(i):
+        student_id = f'{run_id}-{i:06d}'
+        data = {
+            'student_id': student_id, 'full_name': 'New Alumnus', 'date_of_birth': '1996-05-05',
+            'batch': '20', 'session': '2016-17', 'email': f'{student_id}@example.com',
+            'contact_number': '01800000000', 'whatsapp_number': '01800000000',
+            'adult_guests': 1, 'child_guests': 1, 'payment_method': 'bkash', 'transaction_id': f'TX{student_id}',
+            'password': PASSWORD,
+            'profile_picture': SimpleUploadedFile('me.jpg', REGISTER_PICTURE, content_type='image/jpeg'),
+            'transaction_document': SimpleUploadedFile('tx.jpg', REGISTER_DOCUMENT, content_type='image/jpeg'),
+        }
+        return 'post', f'/api/events/{event(i)}/register/', {'data': data}
+
+    def check(i):
+        data = {'student_id': f'bench-{i % max(registrations, 1):06d}', 'password': PASSWORD}
+        return 'post', f'{base}/registrations/check/', {'data': data}
+
+    pages = max(len(event_ids) // 10, 1)
+    return [
+        Endpoint('list', lambda i: ('get', f'{base}/?page={i % pages + 1}', {})),
+        Endpoint('detail', lambda i: ('get', f'{base}/{event(i)}/', {})),
+        Endpoint('quote', lambda i: ('get', f'{base}/{event(i)}/calculate_total_amount/?adult_guests={i % 4}&child_guests={i % 3}', {})),
+        Endpoint('payment-methods', lambda i: ('get', f'{base}/{event(i)}/payment-methods/', {})),
+        Endpoint('register', register),
+        Endpoint('check', check),
+    ]
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if platform.system() == 'Darwin' else 1024), 1)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a sorted list."""
+    if not values:
+        return None
+    index = max(math.ceil(pct / 100 * len(values)) - 1, 0)
+    return values[index]
+
+
+def summarize(samples, elapsed):
+    latencies = sorted(sample['latency'] for sample in samples)
+    queries = [sample['queries'] for sample in samples if sample['queries'] is not None]
+    errors = sum(1 for sample in samples if sample['status'] >= 400)
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2) if latencies else None,
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+        'throughput_rps': round(len(samples) / elapsed, 1) if elapsed else None,
+        'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def _sample(response, started):
+    match = QUERIES_RE.search(response.get('Server-Timing', ''))
+    return {
+        'latency': time.perf_counter() - started,
+        'status': response.status_code,
+        'queries': int(match.group(1)) if match else None,
+    }
+
+
+def run_threads(endpoint, requests, concurrency):
+    """Drive ``endpoint`` through the WSGI handler from a thread pool."""
+    local = threading.local()
+
+    def one(i):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = Client(raise_request_exception=False)
+        method, path, kwargs = endpoint.build(i)
+        started = time.perf_counter()
+        response = getattr(client, method)(path, **kwargs)
+        return _sample(response, started)
+
+    def close_connection(_):
+        connection.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(one, range(requests)))
+        # Worker threads have their own connections, don't leave them open
+        list(pool.map(close_connection, range(concurrency)))
+    return summarize(samples, time.perf_counter() - started)
+
+
+def run_async(endpoint, requests, concurrency):
+    """Drive ``endpoint`` through the ASGI handler with ``concurrency`` tasks in flight."""
+
+    async def main():
+        client = AsyncClient(raise_request_exception=False)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(i):
+            method, path, kwargs = endpoint.build(i)
+            async with semaphore:
+                started = time.perf_counter()
+                response = await getattr(client, method)(path, **kwargs)
+                return _sample(response, started)
+
+        started = time.perf_counter()
+        samples = await asyncio.gather(*(one(i) for i in range(requests)))
+        return summarize(samples, time.perf_counter() - started)
+
+    return asyncio.run(main())
+
+
+RUNNERS = {
+    'wsgi': run_threads,
+    'asgi': run_async,
+}
+
+
+def _timed(func, rounds):
+    """Result of ``func()`` and its median time in milliseconds over ``rounds`` calls."""
+    times = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - started)
+    return result, round(sorted(times)[len(times) // 2] * 1000, 3)
+
+
+def run_payload(page_size=100, rounds=50):
+    """
+    Bytes on the wire and render time of the event list at ``page_size``:
+    the JSON body on every available backend, every content coding of it,
+    and what the compression middleware actually sends for each
+    Accept-Encoding.
+    """
+    from api import compression, renderers
+
+    client = Client()
+    path = f'/api/events/?page_size={page_size}'
+    data = json.loads(client.get(path, HTTP_ACCEPT_ENCODING='identity').content)
+
+    results = {}
+    body = None
+    for backend in ['stdlib'] + (['orjson'] if renderers.orjson is not None else []):
+        body, ms = _timed(lambda backend=backend: renderers.dumps(data, backend=backend), rounds)
+        results[f'render-{backend}'] = {'bytes': len(body), 'ms': ms}
+
+    for coding, encode in compression.CompressionMiddleware(lambda request: None).encoders.items():
+        compressed, ms = _timed(lambda encode=encode: encode(body), rounds)
+        results[f'encode-{coding}'] = {'bytes': len(compressed), 'ms': ms}
+
+    for accept in ('identity', 'gzip', 'br, gzip'):
+        response = client.get(path, HTTP_ACCEPT_ENCODING=accept)
+        results[f'wire {accept}'] = {'bytes': len(response.content), 'encoding': response.get('Content-Encoding', 'identity')}
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def report(results, options):
+    return {
+        'meta': {
+            'revision': git_revision(),
+            'created': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'options': options,
+        },
+        'results': results,
+    }
+
+
+def save(data, path):
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline, results, threshold):
+    """
+    Rows of (endpoint, p95 change %, throughput change %, regressed) for
+    endpoints in both runs. A regression is a p95 more than ``threshold``
+    percent slower or a throughput more than ``threshold`` percent lower.
+    """
+    rows = []
+    for name, current in results.items():
+        previous = baseline.get('results', {}).get(name)
+        if not previous or not previous.get('p95_ms') or not previous.get('throughput_rps'):
+            continue
+        p95_change = (current['p95_ms'] - previous['p95_ms']) / previous['p95_ms'] * 100
+        rps_change = (current['throughput_rps'] - previous['throughput_rps']) / previous['throughput_rps'] * 100
+        regressed = p95_change > threshold or rps_change < -threshold
+        rows.append((name, round(p95_change, 1), round(rps_change, 1), regressed))
+    return rows
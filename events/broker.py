@@ -0,0 +1,140 @@
+"""
+Publish/subscribe for registration status changes.
+
+``InProcessBroker`` (the default) hands messages straight to listeners in the
+same process. Deployments with several workers should switch to a broker
+every worker can see, e.g. ``CacheBroker`` on top of a shared Redis or
+Memcached cache::
+
+    EVENTS_BROKER = {'BACKEND': 'events.broker.CacheBroker', 'OPTIONS': {'poll_interval': 1}}
+"""
+import asyncio
+import threading
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+
+class BaseBroker:
+    def publish(self, channel, message):
+        """Send ``message`` to everybody listening on ``channel``. Called from sync code."""
+        raise NotImplementedError
+
+    async def subscribe(self, channel):
+        """Start listening on ``channel``, messages published from now on are delivered."""
+        raise NotImplementedError
+
+
+class InProcessSubscription:
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+
+    async def get(self, timeout):
+        """The next message, or None after ``timeout`` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker._unsubscribe(self)
+
+
+class InProcessBroker(BaseBroker):
+    def __init__(self, **options):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.queue.put_nowait, message)
+            except RuntimeError:
+                # The listener's event loop is gone
+                self._unsubscribe(subscription)
+
+    async def subscribe(self, channel):
+        subscription = InProcessSubscription(self, channel)
+        with self._lock:
+            self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.channel)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.channel]
+
+
+class CacheSubscription:
+    def __init__(self, broker, channel, last_id):
+        self.broker = broker
+        self.channel = channel
+        self.last_id = last_id
+
+    async def get(self, timeout):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            entry = await cache.aget(self.broker.key(self.channel))
+            if entry is not None and entry['id'] != self.last_id:
+                self.last_id = entry['id']
+                return entry['message']
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return None
+            await asyncio.sleep(min(self.broker.poll_interval, remaining))
+
+    def close(self):
+        pass
+
+
+class CacheBroker(BaseBroker):
+    """
+    Keeps the latest message per channel in the cache and lets listeners poll
+    it. Only the newest message is kept, which is all a status feed needs.
+    """
+
+    def __init__(self, poll_interval=1.0, timeout=60 * 60, **options):
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+
+    def key(self, channel):
+        return f'events:broker:{channel}'
+
+    def publish(self, channel, message):
+        cache.set(self.key(channel), {'id': uuid.uuid4().hex, 'message': message}, self.timeout)
+
+    async def subscribe(self, channel):
+        entry = await cache.aget(self.key(channel))
+        return CacheSubscription(self, channel, entry['id'] if entry else None)
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        config = getattr(settings, 'EVENTS_BROKER', {})
+        broker_class = import_string(config.get('BACKEND', 'events.broker.InProcessBroker'))
+        _broker = broker_class(**config.get('OPTIONS', {}))
+    return _broker
+
+
+def registration_channel(registration_id):
+    return f'registration:{registration_id}'
+
+
+def publish_registration_status(registration_id, approved):
+    get_broker().publish(registration_channel(registration_id), {'approved': approved})
@@ -0,0 +1,161 @@
+"""
+Response caching for the read-only event endpoints.
+
+Every cache key embeds a generation number that is bumped by signals whenever
+an Event is saved or deleted, so stale entries are simply never read again.
+"""
+import hashlib
+import time
+from calendar import timegm
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from api.renderers import dumps
+from ice_alumni_association.timing import span
+
+GENERATION_KEY = 'events:generation'
+HITS_KEY = 'events:cache:hits'
+MISSES_KEY = 'events:cache:misses'
+
+
+def get_timeout():
+    return getattr(settings, 'EVENTS_CACHE_TIMEOUT', 300)
+
+
+def generation():
+    value = cache.get(GENERATION_KEY)
+    if value is None:
+        # Start from the clock so an evicted counter never reuses an old generation
+        cache.add(GENERATION_KEY, int(time.time() * 1000), None)
+        value = cache.get(GENERATION_KEY)
+    return value
+
+
+async def ageneration():
+    value = await cache.aget(GENERATION_KEY)
+    if value is None:
+        await cache.aadd(GENERATION_KEY, int(time.time() * 1000), None)
+        value = await cache.aget(GENERATION_KEY)
+    return value
+
+
+def invalidate():
+    """Drop every cached event response."""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        generation()
+
+
+def _increment(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+async def _aincrement(key):
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        if not await cache.aadd(key, 1, None):
+            await cache.aincr(key)
+
+
+def stats():
+    """Hit/miss counters since the cache was last cleared."""
+    return {
+        'hits': cache.get(HITS_KEY, 0),
+        'misses': cache.get(MISSES_KEY, 0),
+    }
+
+
+def _response_cache_key(request, scope, generation, parts):
+    query = urlencode(sorted(request.query_params.lists()), doseq=True)
+    raw = '|'.join([scope, request.build_absolute_uri(request.path), urlencode(sorted(parts.items())), query])
+    return f'events:response:{generation}:{hashlib.sha1(raw.encode()).hexdigest()}'
+
+
+def response_cache_key(request, scope, **parts):
+    """Key a response by endpoint, URL parts, query string, host and path (links in the payload are absolute)."""
+    return _response_cache_key(request, scope, generation(), parts)
+
+
+async def aresponse_cache_key(request, scope, **parts):
+    return _response_cache_key(request, scope, await ageneration(), parts)
+
+
+def _make_entry(data, last_modified):
+    # Rendered once here, hits send these bytes as they are
+    body = dumps(data)
+    return {
+        'data': data,
+        'body': body,
+        'etag': quote_etag(hashlib.sha1(body).hexdigest()),
+        'last_modified': timegm(last_modified.utctimetuple()) if last_modified else None,
+    }
+
+
+def _conditional_response(request, entry, response):
+    response['ETag'] = entry['etag']
+    if entry['last_modified'] is not None:
+        response['Last-Modified'] = http_date(entry['last_modified'])
+    # Let clients keep a copy but always revalidate it
+    patch_cache_control(response, no_cache=True)
+
+    return get_conditional_response(
+        request, etag=entry['etag'], last_modified=entry['last_modified'], response=response
+    )
+
+
+def cached_response(request, key, build):
+    """
+    Serve a cached response for ``key`` or ``build()`` and cache it.
+
+    ``build`` returns ``(data, last_modified)`` where ``last_modified`` is the
+    newest ``updated_at`` in the payload. The response carries a strong ETag
+    over the payload and a matching Last-Modified, and conditional requests
+    get a 304 without touching the database.
+    """
+    entry = cache.get(key)
+    if entry is None:
+        _increment(MISSES_KEY)
+        with span('build'):
+            entry = _make_entry(*build())
+        cache.set(key, entry, get_timeout())
+    else:
+        _increment(HITS_KEY)
+
+    renderer = getattr(request, 'accepted_renderer', None)
+    if isinstance(renderer, JSONRenderer) and renderer.get_indent(request.accepted_media_type, {}) is None:
+        response = HttpResponse(entry['body'], content_type='application/json')
+    else:
+        # The browsable API, or indented JSON
+        response = Response(entry['data'])
+    return _conditional_response(request, entry, response)
+
+
+async def acached_response(request, key, build):
+    """
+    ``cached_response()`` for async views: ``build`` is a coroutine function
+    and the pre-rendered payload goes out as a plain HttpResponse.
+    """
+    entry = await cache.aget(key)
+    if entry is None:
+        await _aincrement(MISSES_KEY)
+        with span('build'):
+            entry = _make_entry(*await build())
+        await cache.aset(key, entry, get_timeout())
+    else:
+        await _aincrement(HITS_KEY)
+
+    response = HttpResponse(entry['body'], content_type='application/json')
+    return _conditional_response(request, entry, response)
@@ -0,0 +1,159 @@
+"""
+Change feed for events: what was created, updated or deleted since a cursor.
+
+Saved events are read in ``(updated_at, event_id)`` order and deletions from
+EventTombstone in ``(deleted_at, id)`` order. Both are range scans on an
+index that start right after the cursor, and the two streams are merged by
+time. A client pays for the changes since its last sync, not for every
+event. Every write to an event row sets ``updated_at``, including the F()
+updates of the seat counter.
+
+A cursor is the (time, kind, key) of the last change a client has seen.
+Changes from the last ``SETTLE_SECONDS`` are held back. Otherwise a
+transaction that committed late, with an older ``updated_at``, could land
+behind a cursor that was already handed out.
+"""
+import base64
+import heapq
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from .models.EventTombstone import EventTombstone
+
+DEFAULTS = {
+    'DEFAULT_LIMIT': 100,
+    'MAX_LIMIT': 500,
+    'SETTLE_SECONDS': 2,
+    'TOMBSTONE_RETENTION_DAYS': 90,
+}
+
+# Kinds, in the order changes with the same timestamp are listed. A START
+# position comes before every change at its time
+START, EVENT, DELETED = -1, 0, 1
+
+INVALID_CURSOR = 'Invalid cursor'
+
+
+def get_setting(name):
+    return getattr(settings, 'CHANGE_FEED', {}).get(name, DEFAULTS[name])
+
+
+class CursorExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = "Deletions this old are no longer kept, sync again from the start."
+    default_code = 'cursor_expired'
+
+
+def encode_cursor(position):
+    moment, kind, key = position
+    payload = {'t': moment.isoformat(), 'k': kind, 'i': key}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode()
+
+
+def decode_cursor(encoded):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+        moment = parse_datetime(payload['t'])
+        kind = int(payload['k'])
+        key = {START: lambda key: None, EVENT: str, DELETED: int}[kind](payload.get('i'))
+    except (TypeError, ValueError, KeyError, UnicodeDecodeError):
+        raise ValidationError({'cursor': [INVALID_CURSOR]})
+    if moment is None or timezone.is_naive(moment):
+        raise ValidationError({'cursor': [INVALID_CURSOR]})
+    return moment, kind, key
+
+
+def read_position(params):
+    """The position to read from: ``?cursor=`` from a previous response, or ``?since=<ISO 8601>``, or None for everything."""
+    if 'cursor' in params:
+        position = decode_cursor(params['cursor'])
+    elif 'since' in params:
+        try:
+            moment = parse_datetime(params['since'])
+        except ValueError:
+            # Well formed but not a real date, e.g. month 13
+            moment = None
+        if moment is None:
+            raise ValidationError({'since': ["Enter an ISO 8601 date and time."]})
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        position = (moment, START, None)
+    else:
+        return None
+
+    retention = get_setting('TOMBSTONE_RETENTION_DAYS')
+    if retention is not None and position[0] < timezone.now() - timedelta(days=retention):
+        raise CursorExpired()
+    return position
+
+
+def get_limit(params):
+    try:
+        limit = int(params['limit'])
+    except (KeyError, ValueError):
+        return get_setting('DEFAULT_LIMIT')
+    if limit <= 0:
+        return get_setting('DEFAULT_LIMIT')
+    return min(limit, get_setting('MAX_LIMIT'))
+
+
+def after(position, time_field, key_field, kind):
+    """Rows of ``kind`` that come after ``position``."""
+    if position is None:
+        return Q()
+    moment, position_kind, key = position
+    later = Q(**{f'{time_field}__gt': moment})
+    if kind > position_kind:
+        return later | Q(**{time_field: moment})
+    if kind == position_kind:
+        return later | Q(**{time_field: moment, f'{key_field}__gt': key})
+    return later
+
+
+def get_changes(events, position=None, limit=100):
+    """
+    Up to ``limit`` changes after ``position``, oldest first, as
+    ``(changes, position of the last one, more waiting)``. ``changes`` are
+    ``(kind, obj)`` pairs: an Event from ``events`` or an EventTombstone.
+    """
+    until = timezone.now() - timedelta(seconds=get_setting('SETTLE_SECONDS'))
+    # One extra row each to find out whether there is more
+    saved = (
+        events.filter(after(position, 'updated_at', 'event_id', EVENT), updated_at__lte=until)
+        .order_by('updated_at', 'event_id')[:limit + 1]
+    )
+    deleted = (
+        EventTombstone.objects.filter(after(position, 'deleted_at', 'id', DELETED), deleted_at__lte=until)
+        .order_by('deleted_at', 'id')[:limit + 1]
+    )
+
+    # Each stream is already in index order, merge them by time without re-sorting keys
+    merged = list(heapq.merge(
+        ((event.updated_at, EVENT, event.event_id, event) for event in saved),
+        ((tombstone.deleted_at, DELETED, tombstone.pk, tombstone) for tombstone in deleted),
+        key=lambda change: change[:2],
+    ))
+    has_more = len(merged) > limit
+    merged = merged[:limit]
+    if has_more:
+        position = merged[-1][:3]
+    elif position is None or position[0] < until:
+        # Caught up: move the cursor along even when nothing changed, so it doesn't expire
+        position = (until, START, None)
+    return [(kind, obj) for _, kind, _, obj in merged], position, has_more
+
+
+def prune_tombstones(days=None):
+    """Delete tombstones older than the retention period, returns how many."""
+    days = get_setting('TOMBSTONE_RETENTION_DAYS') if days is None else days
+    if days is None:
+        return 0
+    deleted, _ = EventTombstone.objects.filter(deleted_at__lt=timezone.now() - timedelta(days=days)).delete()
+    return deleted
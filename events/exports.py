@@ -0,0 +1,104 @@
+"""
+Registration exports that keep memory flat for any number of rows.
+
+CSV is streamed straight from a chunked queryset iterator, XLSX is written
+row by row with openpyxl's write-only mode into a temporary file.
+"""
+import csv
+import tempfile
+from datetime import datetime
+
+from django.conf import settings
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+from openpyxl import Workbook
+
+# (header, queryset lookup), the event title comes from a join, not a query per row
+EXPORT_COLUMNS = [
+    ('ID', 'id'),
+    ('Event ID', 'event_id'),
+    ('Event', 'event__title'),
+    ('Student ID', 'student_id'),
+    ('Full Name', 'full_name'),
+    ('Date of Birth', 'date_of_birth'),
+    ('Batch', 'batch'),
+    ('Session', 'session'),
+    ('Email', 'email'),
+    ('Contact Number', 'contact_number'),
+    ('WhatsApp Number', 'whatsapp_number'),
+    ('Adult Guests', 'adult_guests'),
+    ('Child Guests', 'child_guests'),
+    ('Total Amount', 'total_amount'),
+    ('Payment Method', 'payment_method'),
+    ('Transaction ID', 'transaction_id'),
+    ('Transaction Document', 'transaction_document'),
+    ('Profile Picture', 'profile_picture'),
+    ('Registered At', 'registration_datetime'),
+    ('Approved', 'approved'),
+]
+
+FILE_COLUMNS = {'transaction_document', 'profile_picture'}
+
+# Spreadsheets run a cell starting with one of these as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+CHUNK_SIZE = 2000
+
+
+def escape_formula(value):
+    """Keep registrant input such as ``=HYPERLINK(...)`` a plain string in the spreadsheet."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def export_rows(queryset):
+    """Header plus one list per registration, fetched CHUNK_SIZE rows at a time, formulas escaped."""
+    lookups = [lookup for header, lookup in EXPORT_COLUMNS]
+    file_indexes = [index for index, lookup in enumerate(lookups) if lookup in FILE_COLUMNS]
+
+    yield [header for header, lookup in EXPORT_COLUMNS]
+    for row in queryset.order_by('pk').values_list(*lookups).iterator(chunk_size=CHUNK_SIZE):
+        row = [escape_formula(value) for value in row]
+        for index in file_indexes:
+            row[index] = settings.MEDIA_URL + row[index] if row[index] else ''
+        yield row
+
+
+class Echo:
+    """File-like object that hands back what is written, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def export_csv_response(queryset, filename):
+    writer = csv.writer(Echo())
+    rows = (writer.writerow(row) for row in export_rows(queryset))
+    response = StreamingHttpResponse(rows, content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
+
+
+def excel_value(value):
+    # Excel has no time zones
+    if isinstance(value, datetime) and timezone.is_aware(value):
+        return timezone.localtime(value).replace(tzinfo=None)
+    return value
+
+
+def export_xlsx_response(queryset, filename):
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Registrations')
+    for row in export_rows(queryset):
+        sheet.append([excel_value(value) for value in row])
+
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return FileResponse(
+        output,
+        as_attachment=True,
+        filename=f'{filename}.xlsx',
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
@@ -0,0 +1,183 @@
+import hashlib
+import os
+import posixpath
+import warnings
+from io import BytesIO
+from PIL import Image
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import InMemoryUploadedFile
+from django.urls import reverse
+
+
+def get_max_pixels():
+    return getattr(settings, 'REGISTRATION_UPLOADS', {}).get('MAX_IMAGE_PIXELS', 40_000_000)
+
+
+def open_image(source, max_pixels=None):
+    """
+    Open an image without decoding it, rejecting decompression bombs.
+
+    Only the header is read here, so the size check happens before any
+    pixel data is decoded. Raises ValidationError for unreadable or
+    oversized images.
+    """
+    max_pixels = max_pixels or get_max_pixels()
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', Image.DecompressionBombWarning)
+            img = Image.open(source)
+    except (Image.DecompressionBombError, Image.DecompressionBombWarning):
+        raise ValidationError("The image is too large.")
+    except (OSError, SyntaxError, ValueError):
+        raise ValidationError("Upload a valid image.")
+
+    width, height = img.size
+    if width * height > max_pixels:
+        raise ValidationError(f"The image is too large ({width}x{height} pixels).")
+    return img
+
+
+def compress_image(image):
+    """
+    Compress the uploaded image before saving.
+    """
+    img = open_image(image)
+    
+    # Get original dimensions
+    original_width, original_height = img.size
+    
+    target_height = 900
+    # Calculate new width maintaining the aspect ratio
+    target_width = int((target_height / original_height) * original_width)
+
+    # Let the JPEG decoder scale down by 1/2, 1/4 or 1/8 while decoding, so a big
+    # photo is never held in memory at full size
+    img.draft('RGB', (target_width, target_height))
+    
+    # Resize image with the new width and height (reduce() first for the other formats)
+    img = img.resize((target_width, target_height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+    # JPEG has no alpha channel or palette
+    if img.mode not in ('RGB', 'L'):
+        img = img.convert('RGB')
+    
+    # Save the image to a BytesIO object
+    img_io = BytesIO()
+    img.save(img_io, format='JPEG', quality=50)
+    size = img_io.tell()
+    img_io.seek(0)
+
+    # Create an InMemoryUploadedFile to replace the original image
+    return InMemoryUploadedFile(img_io, None, image.name, 'image/jpeg', size, None)
+
+
+# Named responsive sizes (maximum width in pixels) and the formats each one is rendered in
+IMAGE_VARIANTS = {
+    'thumbnail': 320,
+    'medium': 768,
+    'full': 1600,
+}
+VARIANT_FORMATS = {
+    'webp': ('WEBP', 'image/webp'),
+    'jpeg': ('JPEG', 'image/jpeg'),
+}
+VARIANT_QUALITY = 75
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.gif', '.webp']
+
+
+def is_image(name):
+    return os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+
+
+def variant_dir(source_name):
+    """Deterministic directory holding every variant of ``source_name``."""
+    digest = hashlib.sha1(source_name.encode()).hexdigest()
+    stem = os.path.splitext(os.path.basename(source_name))[0]
+    return posixpath.join('variants', digest[:2], f'{stem}-{digest[:12]}')
+
+
+def variant_name(source_name, size, fmt):
+    return posixpath.join(variant_dir(source_name), f'{size}.{fmt}')
+
+
+def render_variant(source, size, fmt):
+    """Resize ``source`` to the named size (never upscaling) and encode it as ``fmt``."""
+    img = open_image(source)
+    # thumbnail() uses draft()/reduce() to avoid a full-size decode
+    img.thumbnail((IMAGE_VARIANTS[size], IMAGE_VARIANTS[size] * 4), Image.Resampling.LANCZOS)
+    if img.mode not in ('RGB', 'L'):
+        img = img.convert('RGB')
+
+    img_io = BytesIO()
+    img.save(img_io, format=VARIANT_FORMATS[fmt][0], quality=VARIANT_QUALITY)
+    return ContentFile(img_io.getvalue())
+
+
+def ensure_variant(storage, source_name, size, fmt):
+    """Return the storage name of a variant, generating it on first use."""
+    name = variant_name(source_name, size, fmt)
+    if not storage.exists(name):
+        with storage.open(source_name, 'rb') as source:
+            content = render_variant(source, size, fmt)
+        # Another worker may have written it meanwhile, the content is identical either way
+        if not storage.exists(name):
+            storage.save(name, content)
+    return name
+
+
+def generate_variants(field_file):
+    """Render every size and format of an image file."""
+    if field_file and is_image(field_file.name):
+        for size in IMAGE_VARIANTS:
+            for fmt in VARIANT_FORMATS:
+                ensure_variant(field_file.storage, field_file.name, size, fmt)
+
+
+def delete_variants(storage, source_name):
+    for size in IMAGE_VARIANTS:
+        for fmt in VARIANT_FORMATS:
+            storage.delete(variant_name(source_name, size, fmt))
+
+
+def rendered_field_name(field_name):
+    """
+    The model field recording which file of ``field_name`` has all its
+    variants rendered, e.g. ``media_file_rendered``. Set by the variants job.
+    """
+    return f'{field_name}_rendered'
+
+
+def variant_urls(field_file, request=None, rendered=None):
+    """
+    Build the ``srcset``-style map for an image file field.
+
+    When ``rendered`` (see rendered_field_name()) names the current file, the
+    variants point straight at storage, otherwise at the lazy endpoint that
+    renders them on first request. Storage isn't asked, this runs for every
+    row of a list.
+    """
+    if not field_file or not is_image(field_file.name):
+        return None
+
+    storage = field_file.storage
+    is_rendered = rendered == field_file.name
+    sizes = {}
+    srcset = {}
+    for size, width in IMAGE_VARIANTS.items():
+        sizes[size] = {}
+        for fmt in VARIANT_FORMATS:
+            if is_rendered:
+                url = storage.url(variant_name(field_file.name, size, fmt))
+            else:
+                url = reverse('media-variant', kwargs={'size': size, 'fmt': fmt, 'source': field_file.name})
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            sizes[size][fmt] = url
+            srcset.setdefault(fmt, []).append(f'{url} {width}w')
+
+    return {
+        'sizes': sizes,
+        'srcset': {fmt: ', '.join(candidates) for fmt, candidates in srcset.items()},
+    }
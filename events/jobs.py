@@ -0,0 +1,185 @@
+"""
+Background image processing backed by the ImageJob table.
+
+Uploads are stored as-is by the request; the expensive Pillow work is done
+later by ``python manage.py process_image_jobs`` (or ``drain()`` in tests).
+"""
+import logging
+import os
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .images import compress_image, delete_variants, generate_variants, rendered_field_name
+from .models.ImageJob import ImageJob
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'EAGER': False,
+    'MAX_ATTEMPTS': 3,
+    'RETRY_DELAY': 30,
+    'STALE_AFTER': 600,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'IMAGE_JOBS', {}).get(name, DEFAULTS[name])
+
+
+def enqueue(instance, field_name, operation='compress'):
+    """Queue ``operation`` for ``instance.<field_name>``."""
+    job = ImageJob.objects.create(
+        content_type=ContentType.objects.get_for_model(instance),
+        object_id=str(instance.pk),
+        field_name=field_name,
+        operation=operation,
+        max_attempts=get_setting('MAX_ATTEMPTS'),
+    )
+    if get_setting('EAGER'):
+        transaction.on_commit(lambda: run(job.pk))
+    return job
+
+
+def enqueue_many(model, pks, field_name, operation='compress'):
+    """Queue ``operation`` for many rows at once, e.g. after a bulk import."""
+    content_type = ContentType.objects.get_for_model(model)
+    return ImageJob.objects.bulk_create([
+        ImageJob(
+            content_type=content_type,
+            object_id=str(pk),
+            field_name=field_name,
+            operation=operation,
+            max_attempts=get_setting('MAX_ATTEMPTS'),
+        )
+        for pk in pks
+    ], batch_size=500)
+
+
+def claim(pk=None):
+    """
+    Atomically move one runnable job to ``processing`` and return it.
+
+    Jobs stuck in ``processing`` for longer than STALE_AFTER seconds (e.g.
+    the worker died) are picked up again.
+    """
+    now = timezone.now()
+    runnable = Q(status='pending', run_after__lte=now) | Q(
+        status='processing', updated_at__lt=now - timedelta(seconds=get_setting('STALE_AFTER'))
+    )
+    candidates = ImageJob.objects.filter(runnable)
+    if pk is not None:
+        candidates = candidates.filter(pk=pk)
+
+    for candidate in candidates.order_by('run_after', 'pk').values_list('pk', flat=True)[:10]:
+        # Only one worker wins the conditional update
+        claimed = ImageJob.objects.filter(runnable, pk=candidate).update(
+            status='processing', attempts=F('attempts') + 1, updated_at=now
+        )
+        if claimed:
+            return ImageJob.objects.get(pk=candidate)
+    return None
+
+
+def move_jobs(instance, old_pk):
+    """Point the jobs of a row whose primary key changed at its new key."""
+    ImageJob.objects.filter(
+        content_type=ContentType.objects.get_for_model(instance), object_id=str(old_pk)
+    ).update(object_id=str(instance.pk))
+
+
+def compress(instance, field_name):
+    """Replace the stored file with its compressed variant."""
+    field_file = getattr(instance, field_name)
+    if not field_file:
+        return
+
+    old_name = field_file.name
+    with field_file.open('rb') as source:
+        compressed = compress_image(source)
+
+    field = instance._meta.get_field(field_name)
+    filename = os.path.splitext(os.path.basename(old_name))[0] + '.jpg'
+    new_name = field_file.storage.save(field.generate_filename(instance, filename), compressed)
+
+    # Swap the new file in without going through save() and its side effects,
+    # unless the file was replaced meanwhile. The newer file has a job of its own
+    updated = type(instance)._default_manager.filter(pk=instance.pk, **{field_name: old_name}).update(
+        **{field_name: new_name}
+    )
+    if not updated:
+        field_file.storage.delete(new_name)
+        return
+    field_file.storage.delete(old_name)
+    # Content-addressed files may still be used by other rows
+    if not field_file.storage.exists(old_name):
+        delete_variants(field_file.storage, old_name)
+
+    # Responsive sizes are cut from the compressed file
+    enqueue(instance, field_name, operation='variants')
+
+
+def variants(instance, field_name):
+    """Pre-render the responsive sizes so the first visitor doesn't have to wait."""
+    field_file = getattr(instance, field_name)
+    generate_variants(field_file)
+
+    # Lets variant_urls() link to them without asking storage, unless the file changed meanwhile
+    rendered = rendered_field_name(field_name)
+    if field_file and any(field.name == rendered for field in instance._meta.concrete_fields):
+        type(instance)._default_manager.filter(pk=instance.pk, **{field_name: field_file.name}).update(
+            **{rendered: field_file.name}
+        )
+
+
+OPERATIONS = {
+    'compress': compress,
+    'variants': variants,
+}
+
+
+def process(job):
+    """Run a claimed job and record the outcome."""
+    instance = job.target
+    try:
+        if instance is not None:
+            OPERATIONS[job.operation](instance, job.field_name)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            delay = get_setting('RETRY_DELAY') * 2 ** (job.attempts - 1)
+            job.status = 'pending'
+            job.run_after = timezone.now() + timedelta(seconds=delay)
+        else:
+            job.status = 'failed'
+        logger.warning("Image job %s failed (attempt %s/%s)", job.pk, job.attempts, job.max_attempts)
+    else:
+        job.status = 'done'
+        job.last_error = ''
+    job.save(update_fields=['status', 'last_error', 'run_after', 'updated_at'])
+    return job
+
+
+def run(pk):
+    """Run a single job right away if nobody else has claimed it."""
+    job = claim(pk)
+    if job is not None:
+        process(job)
+    return job
+
+
+def drain(max_jobs=None):
+    """Process runnable jobs synchronously until the queue is empty. Returns the number processed."""
+    processed = 0
+    while max_jobs is None or processed < max_jobs:
+        job = claim()
+        if job is None:
+            break
+        process(job)
+        processed += 1
+    return processed
@@ -0,0 +1,153 @@
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from ... import benchmark
+
+ENDPOINTS = ['list', 'detail', 'quote', 'payment-methods', 'register', 'check']
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the events API against a throwaway database seeded with events, "
+        "registrations and synthetic images. Reports latency percentiles, throughput, "
+        "queries per request and peak RSS, and can save or compare a JSON baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=50, help="Events to seed.")
+        parser.add_argument('--registrations', type=int, default=500, help="Registrations to seed.")
+        parser.add_argument('--requests', type=int, default=200, help="Requests per endpoint.")
+        parser.add_argument('--concurrency', type=int, default=4, help="Requests in flight at once.")
+        parser.add_argument('--server', choices=sorted(benchmark.RUNNERS), default='wsgi',
+                            help="wsgi: test client in a thread pool, asgi: async test client through the ASGI handler.")
+        parser.add_argument('--async-views', action='store_true',
+                            help="Use the async read views under /api/async/events/ (best with --server asgi).")
+        parser.add_argument('--endpoint', action='append', choices=ENDPOINTS, dest='endpoints',
+                            help="Endpoint to run, repeat for several (default: all). register and check hash a password per request.")
+        parser.add_argument('--cold', action='store_true', help="Run without a cache, so every request reads the database.")
+        parser.add_argument('--warmup', type=int, default=5, help="Untimed requests per endpoint before measuring.")
+        parser.add_argument('--save', metavar='PATH', help="Write the results as a JSON baseline.")
+        parser.add_argument('--compare', metavar='PATH', help="Compare against a saved baseline.")
+        parser.add_argument('--threshold', type=float, default=10.0,
+                            help="Percent change in p95 or throughput counted as a regression.")
+        parser.add_argument('--fail-on-regression', action='store_true', help="Exit with an error when a regression is found.")
+        parser.add_argument('--payload', action='store_true',
+                            help="Instead of the load test, measure bytes on the wire and render time of the event list at page_size=100.")
+
+    def handle(self, *args, **options):
+        baseline = benchmark.load(options['compare']) if options['compare'] else None
+        names = options['endpoints'] or ENDPOINTS
+
+        # Per-request log lines would drown the report
+        logging.getLogger('api.requests').setLevel(logging.ERROR)
+        logging.getLogger('django.request').setLevel(logging.CRITICAL)
+
+        media_root = settings.MEDIA_ROOT
+        settings.MEDIA_ROOT = tempfile.mkdtemp(prefix='benchmark-media-')
+        old_name = connection.settings_dict['NAME']
+        if connection.vendor == 'sqlite':
+            # A file, not the default in-memory test database, so threads share it like real workers
+            connection.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(settings.MEDIA_ROOT, 'benchmark.sqlite3')
+        setup_test_environment()
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        # Queries per request come from the Server-Timing header, the test client is an internal IP
+        metrics = override_settings(REQUEST_METRICS={**settings.REQUEST_METRICS, 'SERVER_TIMING': True})
+        metrics.enable()
+        try:
+            if options['payload']:
+                return self.payload(options)
+            if options['cold']:
+                with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}):
+                    results = self.run(names, options)
+            else:
+                results = self.run(names, options)
+        finally:
+            metrics.disable()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+            settings.MEDIA_ROOT = media_root
+
+        self.print_results(results)
+        data = benchmark.report(results, {
+            key: options[key] for key in ('events', 'registrations', 'requests', 'concurrency', 'server', 'async_views', 'cold')
+        })
+        if options['save']:
+            benchmark.save(data, options['save'])
+            self.stdout.write(f"Saved results to {options['save']}")
+        if baseline is not None:
+            self.print_comparison(baseline, results, options)
+
+    def payload(self, options):
+        # A full page of 100 events
+        benchmark.seed(max(options['events'], 100), 0)
+        cache.clear()
+        results = benchmark.run_payload(page_size=100)
+
+        header = f"{'event list, page_size=100':<28}{'bytes':>10}{'ms':>10}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for name, row in results.items():
+            detail = row['ms'] if 'ms' in row else row['encoding']
+            self.stdout.write(f"{name:<28}{row['bytes']:>10}{detail:>10}")
+        if options['save']:
+            benchmark.save(benchmark.report(results, {'payload': True, 'events': max(options['events'], 100)}), options['save'])
+            self.stdout.write(f"Saved results to {options['save']}")
+
+    def run(self, names, options):
+        started = time.perf_counter()
+        event_ids = benchmark.seed(options['events'], options['registrations'])
+        self.stdout.write(
+            f"Seeded {options['events']} events and {options['registrations']} registrations "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+        cache.clear()
+
+        run_id = f'run{int(time.time())}'
+        endpoints = {endpoint.name: endpoint for endpoint in benchmark.get_endpoints(event_ids, options['registrations'], run_id, options['async_views'])}
+        runner = benchmark.RUNNERS[options['server']]
+        results = {}
+        for name in names:
+            endpoint = endpoints[name]
+            if options['warmup']:
+                warmup = benchmark.Endpoint(name, lambda i, build=endpoint.build: build(options['requests'] + i))
+                runner(warmup, options['warmup'], 1)
+            results[name] = runner(endpoint, options['requests'], options['concurrency'])
+            self.stdout.write(f"  {name}: done")
+        return results
+
+    def print_results(self, results):
+        header = f"{'endpoint':<16}{'reqs':>6}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>9}{'queries':>9}{'rss MB':>9}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for name, row in results.items():
+            values = [row[key] if row[key] is not None else '-' for key in
+                      ('p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps', 'queries_per_request', 'peak_rss_mb')]
+            self.stdout.write(
+                f"{name:<16}{row['requests']:>6}{row['errors']:>8}"
+                + ''.join(f"{value:>10}" for value in values[:3])
+                + ''.join(f"{value:>9}" for value in values[3:])
+            )
+
+    def print_comparison(self, baseline, results, options):
+        revision = baseline.get('meta', {}).get('revision') or 'baseline'
+        self.stdout.write(f"\nCompared with {revision} (threshold {options['threshold']}%):")
+        regressions = []
+        for name, p95_change, rps_change, regressed in benchmark.compare(baseline, results, options['threshold']):
+            line = f"  {name:<16} p95 {p95_change:+.1f}%  throughput {rps_change:+.1f}%"
+            if regressed:
+                regressions.append(name)
+                self.stdout.write(self.style.ERROR(line + '  REGRESSION'))
+            else:
+                self.stdout.write(line)
+        if regressions and options['fail_on_regression']:
+            raise CommandError(f"Regressed: {', '.join(regressions)}")
@@ -0,0 +1,59 @@
+import os
+from django.core.management.base import BaseCommand, CommandError
+from tablib import Dataset
+from ...resources import RegistrationResource
+
+class Command(BaseCommand):
+    help = "Import registrations from a CSV, XLSX or JSON file. The whole file is validated before anything is written."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Spreadsheet with one registration per row, headers as in the registration API.")
+        parser.add_argument('--format', dest='file_format', choices=['csv', 'xlsx', 'json'], help="Defaults to the file extension.")
+        parser.add_argument('--event', help="Event ID for rows without an 'event' column.")
+        parser.add_argument('--dry-run', action='store_true', help="Only validate and report per-row errors.")
+
+    def handle(self, *args, **options):
+        dataset = self.load(options['path'], options['file_format'])
+        if options['event']:
+            if 'event' in dataset.headers:
+                raise CommandError("The file already has an 'event' column.")
+            dataset.append_col([options['event']] * len(dataset), header='event')
+
+        resource = RegistrationResource()
+        result = resource.import_data(dataset, dry_run=True, collect_failed_rows=False)
+        if self.report(result):
+            raise CommandError("Nothing was imported, fix the rows above and try again.")
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"{len(dataset)} row(s) are valid (dry run, nothing written)."))
+            return
+
+        result = resource.import_data(dataset, dry_run=False, use_transactions=True)
+        if self.report(result):
+            raise CommandError("The import failed and was rolled back.")
+        totals = result.totals
+        self.stdout.write(self.style.SUCCESS(f"Imported {totals['new']} new and {totals['update']} updated registration(s)."))
+
+    def load(self, path, file_format):
+        if not os.path.exists(path):
+            raise CommandError(f"{path} does not exist.")
+        file_format = file_format or os.path.splitext(path)[1].lstrip('.').lower()
+        if file_format in ('csv', 'json'):
+            with open(path, encoding='utf-8-sig') as f:
+                return Dataset().load(f.read(), format=file_format)
+        if file_format == 'xlsx':
+            with open(path, 'rb') as f:
+                return Dataset().load(f.read(), format='xlsx')
+        raise CommandError(f"Unsupported format '{file_format}'.")
+
+    def report(self, result):
+        """Print the errors of every failed row, returns True if there were any."""
+        for error in result.base_errors:
+            self.stderr.write(f"Error: {error.error}")
+        for number, errors in result.row_errors():
+            for error in errors:
+                self.stderr.write(f"Row {number}: {error.error}")
+        for row in result.invalid_rows:
+            for field, messages in row.error_dict.items():
+                self.stderr.write(f"Row {row.number}: {field}: {'; '.join(str(message) for message in messages)}")
+        return result.has_errors() or result.has_validation_errors()
@@ -0,0 +1,51 @@
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from ...images import delete_variants
+from ...storage import file_fields, is_content_addressed, recount_references
+
+class Command(BaseCommand):
+    help = "Move media files saved under their old flat names into content-addressed storage and rebuild the reference counts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only report what would be moved.")
+        parser.add_argument('--keep-old', action='store_true', help="Leave the old files in place.")
+        parser.add_argument('--recount-only', action='store_true', help="Only rebuild the reference counts.")
+
+    def handle(self, *args, **options):
+        if not options['recount_only']:
+            moved, missing = 0, 0
+            for model, field in file_fields():
+                manager = model._default_manager
+                names = (
+                    manager.exclude(**{field.attname: ''}).exclude(**{f'{field.attname}__isnull': True})
+                    .values_list(field.attname, flat=True).distinct()
+                )
+                for name in list(names):
+                    if is_content_addressed(name):
+                        continue
+                    if not field.storage.exists(name):
+                        missing += 1
+                        self.stderr.write(f"Missing file {name}, left as is.")
+                        continue
+                    moved += 1
+                    if options['dry_run']:
+                        self.stdout.write(f"Would move {name}")
+                        continue
+
+                    # The directory of the old name is the content-addressed directory
+                    with field.storage.open(name, 'rb') as f:
+                        new_name = field.storage.save(name, File(f, name))
+                    # Every row sharing the old name at once, without save() and its side effects
+                    manager.filter(**{field.attname: name}).update(**{field.attname: new_name})
+                    if not options['keep_old']:
+                        field.storage.delete(name)
+                        delete_variants(field.storage, name)
+                    self.stdout.write(f"{name} -> {new_name}")
+
+            verb = "Would move" if options['dry_run'] else "Moved"
+            self.stdout.write(f"{verb} {moved} file(s), {missing} missing.")
+            if options['dry_run']:
+                return
+
+        indexed, deleted = recount_references()
+        self.stdout.write(f"Indexed {indexed} file(s), deleted {deleted} unreferenced file(s).")
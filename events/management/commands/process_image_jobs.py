@@ -0,0 +1,26 @@
+import time
+from django.core.management.base import BaseCommand
+from ...jobs import drain
+
+class Command(BaseCommand):
+    help = "Run the background image processing worker."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Drain the queue once and exit.")
+        parser.add_argument('--sleep', type=float, default=2.0, help="Seconds to wait when the queue is empty.")
+        parser.add_argument('--max-jobs', type=int, default=None, help="Stop after processing this many jobs.")
+
+    def handle(self, *args, **options):
+        remaining = options['max_jobs']
+        while True:
+            processed = drain(max_jobs=remaining)
+            if processed:
+                self.stdout.write(f"Processed {processed} image job(s).")
+            if remaining is not None:
+                remaining -= processed
+                if remaining <= 0:
+                    break
+            if options['once']:
+                break
+            if not processed:
+                time.sleep(options['sleep'])
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from ... import changes
+
+class Command(BaseCommand):
+    help = "Delete event tombstones older than CHANGE_FEED['TOMBSTONE_RETENTION_DAYS']."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help="Keep this many days instead of the setting.")
+
+    def handle(self, *args, **options):
+        count = changes.prune_tombstones(options['days'])
+        self.stdout.write(f"Deleted {count} tombstone(s).")
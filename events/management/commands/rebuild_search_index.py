@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from ... import search
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text event search index."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Events read per query.")
+
+    def handle(self, *args, **options):
+        if search.backend() is None:
+            self.stdout.write("No full-text index on this database, search uses icontains.")
+            return
+        count = search.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(f"Indexed {count} event(s).")
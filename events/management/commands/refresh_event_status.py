@@ -0,0 +1,20 @@
+import time
+from django.core.management.base import BaseCommand
+from ...status import refresh_statuses
+
+class Command(BaseCommand):
+    help = "Set upcoming/ongoing/completed from the start and end times. Run it every minute or keep it running with --loop."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Keep running instead of exiting after one pass.")
+        parser.add_argument('--sleep', type=float, default=60.0, help="Seconds between passes with --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            moved = refresh_statuses()
+            changed = {status: count for status, count in moved.items() if count}
+            if changed:
+                self.stdout.write(', '.join(f"{count} event(s) now {status}" for status, count in changed.items()))
+            if not options['loop']:
+                break
+            time.sleep(options['sleep'])
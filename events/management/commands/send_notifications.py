@@ -0,0 +1,21 @@
+import time
+from django.core.management.base import BaseCommand
+from ...notifications import send_pending
+
+class Command(BaseCommand):
+    help = "Send queued registrant emails in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Send everything that is queued and exit.")
+        parser.add_argument('--batch-size', type=int, default=100, help="Emails sent per batch.")
+        parser.add_argument('--sleep', type=float, default=10.0, help="Seconds to wait when the outbox is empty.")
+
+    def handle(self, *args, **options):
+        while True:
+            sent = send_pending(batch_size=options['batch_size'])
+            if sent:
+                self.stdout.write(f"Sent {sent} notification(s).")
+            if options['once']:
+                break
+            if not sent:
+                time.sleep(options['sleep'])
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-18 08:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0005_imagejob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='imagejob',
+            name='operation',
+            field=models.CharField(choices=[('compress', 'Compress'), ('variants', 'Responsive variants')], default='compress', max_length=20),
+        ),
+    ]
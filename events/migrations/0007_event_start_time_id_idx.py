@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2026-10-18 08:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0006_imagejob_variants_operation'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['start_time', 'event_id'], name='event_start_time_id_idx'),
+        ),
+    ]
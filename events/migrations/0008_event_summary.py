@@ -0,0 +1,37 @@
+# Generated by Django 5.1.4 on 2026-10-18 08:41
+
+from html import unescape
+
+from django.db import migrations, models
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+
+# Frozen copy of events.models.Event.make_summary as it was when this migration was written
+def make_summary(html, length=280):
+    text = ' '.join(unescape(strip_tags((html or '').replace('<', ' <'))).split())
+    return Truncator(text).chars(length)
+
+
+def populate_summaries(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    events = list(Event.objects.only('event_id', 'description'))
+    for event in events:
+        event.summary = make_summary(event.description)
+    Event.objects.bulk_update(events, ['summary'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0007_event_start_time_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='summary',
+            field=models.CharField(blank=True, editable=False, help_text='Plain-text excerpt of the description, kept up to date on save.', max_length=300),
+        ),
+        migrations.RunPython(populate_summaries, migrations.RunPython.noop),
+    ]
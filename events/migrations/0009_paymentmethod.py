@@ -0,0 +1,141 @@
+# Generated by Django 5.1.4 on 2026-10-18 08:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Flat Event columns per provider, mapped to PaymentMethod fields
+LEGACY_COLUMNS = {
+    'bkash': {'account_number': 'bkash_account_number', 'payment_option': 'bkash_payment_option'},
+    'nagad': {'account_number': 'nagad_account_number', 'payment_option': 'nagad_payment_option'},
+    'rocket': {'account_number': 'rocket_account_number', 'payment_option': 'rocket_payment_option'},
+    'bank': {
+        'account_name': 'bank_account_name',
+        'account_number': 'bank_account_number',
+        'bank_name': 'bank_name',
+        'branch_name': 'bank_branch_name',
+        'swift_code': 'bank_swift_code',
+        'routing_number': 'bank_routing_number',
+        'city': 'bank_city',
+        'country': 'bank_country',
+    },
+}
+
+
+def copy_payment_methods(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    PaymentMethod = apps.get_model('events', 'PaymentMethod')
+
+    methods = []
+    for event in Event.objects.all():
+        for sort_order, (provider, columns) in enumerate(LEGACY_COLUMNS.items()):
+            details = {field: getattr(event, column) for field, column in columns.items()}
+            if any(details.values()):
+                methods.append(PaymentMethod(event=event, provider=provider, sort_order=sort_order, **details))
+    PaymentMethod.objects.bulk_create(methods, batch_size=500)
+
+
+def restore_payment_methods(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    PaymentMethod = apps.get_model('events', 'PaymentMethod')
+
+    for method in PaymentMethod.objects.filter(provider__in=LEGACY_COLUMNS):
+        columns = LEGACY_COLUMNS[method.provider]
+        Event.objects.filter(pk=method.event_id).update(
+            **{column: getattr(method, field) for field, column in columns.items()}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0008_event_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentMethod',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.SlugField(help_text='Identifier sent by registrants, e.g. bkash, nagad, rocket or bank.', max_length=30)),
+                ('is_active', models.BooleanField(default=True)),
+                ('sort_order', models.PositiveSmallIntegerField(default=0)),
+                ('account_name', models.CharField(blank=True, help_text='Account holder name.', max_length=100)),
+                ('account_number', models.CharField(blank=True, help_text='Wallet or bank account number.', max_length=30)),
+                ('payment_option', models.CharField(blank=True, choices=[('make payment', 'Make Payment'), ('send money', 'Send Money')], help_text='Wallet payment option.', max_length=20)),
+                ('bank_name', models.CharField(blank=True, help_text='Bank name.', max_length=100)),
+                ('branch_name', models.CharField(blank=True, help_text='Bank branch name.', max_length=100)),
+                ('swift_code', models.CharField(blank=True, help_text='Bank SWIFT code.', max_length=20)),
+                ('routing_number', models.CharField(blank=True, help_text='Bank routing number.', max_length=20)),
+                ('city', models.CharField(blank=True, help_text='Bank city.', max_length=100)),
+                ('country', models.CharField(blank=True, help_text='Bank country.', max_length=100)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payment_methods', to='events.event')),
+            ],
+            options={
+                'ordering': ['sort_order', 'id'],
+                'constraints': [models.UniqueConstraint(fields=('event', 'provider'), name='unique_event_payment_provider')],
+            },
+        ),
+        migrations.RunPython(copy_payment_methods, restore_payment_methods),
+        migrations.RemoveField(
+            model_name='event',
+            name='bank_account_name',
+        ),
+        migrations.RemoveField(
+            model_name='event',
+            name='bank_account_number',
+        ),
+        migrations.RemoveField(
+            model_name='event',
+            name='bank_branch_name',
+        ),
+        migrations.RemoveField(
+            model_name='event',
+            name='bank_city',
+        ),
+        migrations.RemoveField(
+            model_name='event',
+            name='bank_country',
+        ),
+        migrations.RemoveField(
+            model_name='event',
+            name='bank_name',
+        ),
+        migrations.RemoveField(
+            model_name='event',
+            name='bank_routing_number',
+        ),
+        migrations.RemoveField(
+            model_name='event',
+            name='bank_swift_code',
+        ),
+        migrations.RemoveField(
+            model_name='event',
+            name='bkash_account_number',
+        ),
+        migrations.RemoveField(
+            model_name='event',
+            name='bkash_payment_option',
+        ),
+        migrations.RemoveField(
+            model_name='event',
+            name='nagad_account_number',
+        ),
+        migrations.RemoveField(
+            model_name='event',
+            name='nagad_payment_option',
+        ),
+        migrations.RemoveField(
+            model_name='event',
+            name='rocket_account_number',
+        ),
+        migrations.RemoveField(
+            model_name='event',
+            name='rocket_payment_option',
+        ),
+        migrations.AlterField(
+            model_name='registration',
+            name='payment_method',
+            field=models.CharField(help_text="Provider of one of the event's payment methods.", max_length=100),
+        ),
+    ]
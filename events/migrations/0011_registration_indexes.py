@@ -0,0 +1,36 @@
+# Generated by Django 5.1.4 on 2026-10-18 08:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0010_notification'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='registration',
+            name='email',
+            field=models.EmailField(db_index=True, max_length=254),
+        ),
+        migrations.AlterField(
+            model_name='registration',
+            name='registration_datetime',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='registration',
+            name='transaction_id',
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='registration',
+            index=models.Index(fields=['event', 'approved'], name='registration_event_approved'),
+        ),
+        migrations.AddIndex(
+            model_name='registration',
+            index=models.Index(fields=['approved'], name='registration_approved'),
+        ),
+    ]
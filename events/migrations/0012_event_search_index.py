@@ -0,0 +1,73 @@
+from html import unescape
+
+from django.db import OperationalError, migrations
+from django.utils.html import strip_tags
+
+# Frozen copy of events/search.py as it was when this migration was written
+
+SQLITE_TABLE = 'events_event_fts'
+POSTGRES_TABLE = 'events_event_search'
+
+SQLITE_CREATE = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_TABLE} USING fts5("
+    "event_id UNINDEXED, title, location, body, tokenize='unicode61 remove_diacritics 2')"
+)
+
+POSTGRES_CREATE = [
+    f"CREATE TABLE IF NOT EXISTS {POSTGRES_TABLE} ("
+    "event_id varchar(50) PRIMARY KEY REFERENCES events_event (event_id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+    "document tsvector NOT NULL)",
+    f"CREATE INDEX IF NOT EXISTS {POSTGRES_TABLE}_document_gin ON {POSTGRES_TABLE} USING GIN (document)",
+]
+POSTGRES_DOCUMENT = (
+    "setweight(to_tsvector('simple', %s), 'A') || "
+    "setweight(to_tsvector('simple', %s), 'B') || "
+    "setweight(to_tsvector('simple', %s), 'C')"
+)
+
+
+def html_to_text(html):
+    return ' '.join(unescape(strip_tags((html or '').replace('<', ' <'))).split())
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    connection.__dict__.pop('_events_search_available', None)
+    if connection.vendor == 'sqlite':
+        try:
+            schema_editor.execute(SQLITE_CREATE)
+        except OperationalError:
+            return  # SQLite without FTS5, search falls back to icontains
+        insert = f"INSERT INTO {SQLITE_TABLE} (event_id, title, location, body) VALUES (%s, %s, %s, %s)"
+    elif connection.vendor == 'postgresql':
+        for statement in POSTGRES_CREATE:
+            schema_editor.execute(statement)
+        insert = f"INSERT INTO {POSTGRES_TABLE} (event_id, document) VALUES (%s, {POSTGRES_DOCUMENT})"
+    else:
+        return
+
+    Event = apps.get_model('events', 'Event')
+    events = Event.objects.only('event_id', 'title', 'location', 'description').iterator(chunk_size=500)
+    with connection.cursor() as cursor:
+        for event in events:
+            cursor.execute(insert, [event.event_id, event.title, event.location, html_to_text(event.description)])
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    connection.__dict__.pop('_events_search_available', None)
+    if connection.vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {SQLITE_TABLE}")
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {POSTGRES_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0011_registration_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:05
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def count_seats(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    Registration = apps.get_model('events', 'Registration')
+    seats = (
+        Registration.objects.filter(event=OuterRef('pk'))
+        .order_by()
+        .values('event')
+        .annotate(total=Sum(F('adult_guests') + F('child_guests') + 1))
+        .values('total')
+    )
+    Event.objects.update(seats_taken=Coalesce(Subquery(seats), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0012_event_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='capacity',
+            field=models.PositiveIntegerField(blank=True, help_text='Seats for registrants and their adult and child guests. Leave empty for no limit.', null=True),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='seats_taken',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Seats held by registrations, only changed by atomic updates.'),
+        ),
+        migrations.AddField(
+            model_name='registration',
+            name='waitlisted',
+            field=models.BooleanField(default=False, help_text='Registered after the event was full. Holds no seats until promoted.'),
+        ),
+        migrations.RunPython(count_seats, migrations.RunPython.noop),
+    ]
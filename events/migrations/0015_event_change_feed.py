@@ -0,0 +1,30 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:17
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0014_storedfile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.CharField(max_length=50)),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['updated_at', 'event_id'], name='event_updated_at_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventtombstone',
+            index=models.Index(fields=['deleted_at', 'id'], name='tombstone_deleted_at_id_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:18
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def derive_statuses(apps, schema_editor):
+    # Same rules as events.status.refresh_statuses()
+    Event = apps.get_model('events', 'Event')
+    now = timezone.now()
+    conditions = {
+        'upcoming': models.Q(start_time__gt=now),
+        'ongoing': models.Q(start_time__lte=now, end_time__gt=now),
+        'completed': models.Q(start_time__lte=now, end_time__lte=now),
+    }
+    for status, condition in conditions.items():
+        Event.objects.filter(condition).exclude(status__in=[status, 'cancelled']).update(status=status, updated_at=now)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0015_event_change_feed'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='event',
+            name='status',
+            field=models.CharField(choices=[('upcoming', 'Upcoming'), ('ongoing', 'Ongoing'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], default='upcoming', help_text='Follows the start and end time. Set Cancelled by hand, the other statuses are overwritten.', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['status', 'start_time', 'event_id'], name='event_status_start_time_idx'),
+        ),
+        migrations.RunPython(derive_statuses, migrations.RunPython.noop),
+    ]
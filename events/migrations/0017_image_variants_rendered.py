@@ -0,0 +1,23 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0016_event_status_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='media_file_rendered',
+            field=models.CharField(blank=True, editable=False, help_text='Media file whose responsive variants have all been rendered, see events/images.py.', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='registration',
+            name='profile_picture_rendered',
+            field=models.CharField(blank=True, editable=False, help_text='Profile picture whose responsive variants have all been rendered, see events/images.py.', max_length=100),
+        ),
+    ]
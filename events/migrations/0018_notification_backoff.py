@@ -0,0 +1,27 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:29
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0017_image_variants_rendered'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='notification',
+            name='events_noti_status_1e2aa1_idx',
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, help_text='Not sent before this time, pushed back after every failure.'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['status', 'next_attempt_at'], name='notification_due_idx'),
+        ),
+    ]
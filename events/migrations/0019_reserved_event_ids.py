@@ -0,0 +1,20 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:31
+
+import django.core.validators
+import events.models.Event
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0018_notification_backoff'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='event',
+            name='event_id',
+            field=models.SlugField(primary_key=True, serialize=False, unique=True, validators=[django.core.validators.RegexValidator(message='Event ID can only contain letters, numbers, and hyphens.', regex='^[a-zA-Z0-9-]+$'), events.models.Event.validate_event_id_not_reserved], verbose_name='Event ID'),
+        ),
+    ]
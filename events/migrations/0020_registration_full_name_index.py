@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0019_reserved_event_ids'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='registration',
+            index=models.Index(fields=['full_name'], name='registration_full_name'),
+        ),
+    ]
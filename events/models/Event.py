@@ -1,17 +1,45 @@
 import os
-from django.db import models
+from html import unescape
+from django.db import models, router, transaction
+from django.db.models.fields.files import FieldFile
 from django.core.validators import RegexValidator
 from tinymce.models import HTMLField
 from django.core.exceptions import ValidationError
-from django.utils.text import slugify
+from django.utils import timezone
+from django.utils.html import strip_tags
+from django.utils.text import slugify, Truncator
+from .. import cache
+from ..images import delete_variants
+from ..jobs import enqueue, move_jobs
+from ..status import derive_status
+from ..storage import is_content_addressed
 
 def event_media_upload_to(instance, filename):
-    """Generate file path for the event media file using event_id."""
+    """Generate file path for the event media file using event_id.
+
+    The default storage renames it after its content, see events/storage.py.
+    """
     
     file_extension = os.path.splitext(filename)[1]
     
     return os.path.join('event_media', instance.event_id + file_extension)
 
+# Collection endpoints under /api/events/ that an event detail URL would be shadowed by, see urls.py
+RESERVED_EVENT_IDS = {'search', 'changes'}
+
+def validate_event_id_not_reserved(value):
+    if value.lower() in RESERVED_EVENT_IDS:
+        raise ValidationError(f'"{value}" is reserved for another endpoint, choose a different Event ID.')
+
+def html_to_text(html):
+    """Plain text of an HTML fragment with whitespace collapsed."""
+    # Pad tags with spaces so adjacent paragraphs don't run into each other
+    return ' '.join(unescape(strip_tags((html or '').replace('<', ' <'))).split())
+
+def make_summary(html, length=280):
+    """Plain-text excerpt of an HTML description."""
+    return Truncator(html_to_text(html)).chars(length)
+
 class Event(models.Model):
     event_id = models.SlugField(
         max_length=50,
@@ -21,12 +49,17 @@ class Event(models.Model):
             RegexValidator(
                 regex=r'^[a-zA-Z0-9-]+$',
                 message="Event ID can only contain letters, numbers, and hyphens.",
-            )
+            ),
+            validate_event_id_not_reserved,
         ],
         verbose_name="Event ID"
     )
     title = models.CharField(max_length=200, verbose_name="Event Title")
     description = HTMLField(help_text="Rich HTML content for the event description.")
+    summary = models.CharField(
+        max_length=300, blank=True, editable=False,
+        help_text="Plain-text excerpt of the description, kept up to date on save."
+    )
     
     start_time = models.DateTimeField(help_text="The start time of the event.")
     end_time = models.DateTimeField(help_text="The end time of the event.")
@@ -40,7 +73,7 @@ class Event(models.Model):
             ('cancelled', 'Cancelled'),
         ],
         default='upcoming',
-        help_text="The current status of the event."
+        help_text="Follows the start and end time. Set Cancelled by hand, the other statuses are overwritten."
     )
     created_at = models.DateTimeField(auto_now_add=True, help_text="The time when the event was created.")
     updated_at = models.DateTimeField(auto_now=True, help_text="The last time the event was updated.")
@@ -50,90 +83,200 @@ class Event(models.Model):
         upload_to=event_media_upload_to, null=True, blank=True, 
         help_text="Upload an image, gif, or video for the event."
     )
+    media_file_rendered = models.CharField(
+        max_length=100, blank=True, editable=False,
+        help_text="Media file whose responsive variants have all been rendered, see events/images.py."
+    )
     
     amount_per_person = models.PositiveIntegerField(default=0, help_text="The amount per person for the event.")
     amount_per_adult_guest = models.PositiveIntegerField(default=0, help_text="The amount per person for the event.")
     amount_per_child_guest = models.PositiveIntegerField(default=0, help_text="The amount per person for the event.")
+
+    # Seats for registrants and their guests, see events/seats.py
+    capacity = models.PositiveIntegerField(
+        null=True, blank=True,
+        help_text="Seats for registrants and their adult and child guests. Leave empty for no limit."
+    )
+    seats_taken = models.PositiveIntegerField(
+        default=0, editable=False,
+        help_text="Seats held by registrations, only changed by atomic updates."
+    )
     
+    # Providers offered by default, events can add others as PaymentMethod rows
     PAYMENT_METHOD_CHOICES = [
         ('bkash', 'bKash'),
         ('nagad', 'Nagad'),
         ('rocket', 'Rocket'),
         ('bank', 'Bank Transfer'),
     ]
-    
-    # bKash fields
-    bkash_account_number = models.CharField(max_length=20, blank=True, help_text="bKash account number.")
-    bkash_payment_option = models.CharField(
-        max_length=20,
-        choices=[('make payment', 'Make Payment'), ('send money', 'Send Money')],
-        blank=True,
-        help_text="bKash payment option."
-    )
 
-    # Nagad fields
-    nagad_account_number = models.CharField(max_length=20, blank=True, help_text="Nagad account number.")
-    nagad_payment_option = models.CharField(
-        max_length=20,
-        choices=[('make payment', 'Make Payment'), ('send money', 'Send Money')],
-        blank=True,
-        help_text="Nagad payment option."
-    )
+    class Meta:
+        indexes = [
+            # Backs the ordering and keyset range scans of the event list
+            models.Index(fields=['start_time', 'event_id'], name='event_start_time_id_idx'),
+            # Range scans of the change feed after a cursor, see events/changes.py
+            models.Index(fields=['updated_at', 'event_id'], name='event_updated_at_id_idx'),
+            # ?status= with a start_time range on the event list. Already in list order for a
+            # single status, several statuses are scanned one by one and then sorted
+            models.Index(fields=['status', 'start_time', 'event_id'], name='event_status_start_time_idx'),
+        ]
 
-    # Rocket fields
-    rocket_account_number = models.CharField(max_length=20, blank=True, help_text="Rocket account number.")
-    rocket_payment_option = models.CharField(
-        max_length=20,
-        choices=[('make payment', 'Make Payment'), ('send money', 'Send Money')],
-        blank=True,
-        help_text="Rocket payment option."
-    )
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Values as loaded: save() writes only what changed and spots a new event_id without a query
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def get_current_values(self):
+        deferred = self.get_deferred_fields()
+        values = {}
+        for field in self._meta.concrete_fields:
+            if field.attname not in deferred:
+                value = getattr(self, field.attname)
+                values[field.attname] = value.name if isinstance(value, FieldFile) else value
+        return values
+
+    def get_dirty_fields(self):
+        """
+        Names of the fields changed since the row was read, None if it wasn't
+        read. Fields set without having been loaded count as changed.
+        """
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return None
+        current = self.get_current_values()
+        return {
+            field.name for field in self._meta.concrete_fields
+            if field.attname in current
+            and (field.attname not in loaded or current[field.attname] != loaded[field.attname])
+        }
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        # Also runs when a deferred field is first read
+        current = self.get_current_values()
+        if fields is not None:
+            current = {attname: value for attname, value in current.items() if attname in fields}
+        self._loaded_values = {**getattr(self, '_loaded_values', {}), **current}
+
+    @property
+    def seats_remaining(self):
+        if self.capacity is None:
+            return None
+        return max(self.capacity - self.seats_taken, 0)
+
+    def move_related(self, old_event_id, using):
+        """Point the rows referencing ``old_event_id`` at this event."""
+        for relation in self._meta.related_objects:
+            if relation.one_to_many or relation.one_to_one:
+                field = relation.field
+                relation.related_model._base_manager.using(using).filter(
+                    **{field.attname: old_event_id}
+                ).update(**{field.attname: self.event_id})
+        move_jobs(self, old_event_id)
+
+        # The new row holds its own reference to the media file, the old row's goes with it
+        storage = self.media_file.storage
+        if self.media_file and is_content_addressed(self.media_file.name) and hasattr(storage, 'retain'):
+            storage.retain(self.media_file.name)
+
+    def relocate_media_file(self, old_event_id):
+        """
+        Store a media file named after the old event_id under the new one.
+        Goes through the storage API, so it works the same on any backend.
+        Content-addressed names don't contain the event_id and stay as they are.
+        """
+        old_name = self.media_file.name
+        if not old_name or is_content_addressed(old_name) or old_event_id not in os.path.basename(old_name):
+            return
+
+        storage = self.media_file.storage
+        field = self._meta.get_field('media_file')
+        with storage.open(old_name, 'rb') as source:
+            new_name = storage.save(field.generate_filename(self, os.path.basename(old_name)), source)
+
+        # Unless the file was replaced meanwhile. update() sends no signals,
+        # so bump updated_at for the changes feed and drop the cached responses here.
+        updated_at = timezone.now()
+        if Event.objects.filter(pk=self.pk, media_file=old_name).update(media_file=new_name, updated_at=updated_at):
+            storage.delete(old_name)
+            delete_variants(storage, old_name)
+            self.media_file.name = new_name
+            self.updated_at = updated_at
+            self._loaded_values.update(media_file=new_name, updated_at=updated_at)
+            transaction.on_commit(cache.invalidate, using=router.db_for_write(Event, instance=self))
+            enqueue(self, 'media_file', operation='variants')
+        else:
+            storage.delete(new_name)
 
-    # Bank fields
-    bank_account_name = models.CharField(max_length=100, blank=True, help_text="Bank account name.")
-    bank_account_number = models.CharField(max_length=20, blank=True, help_text="Bank account number.")
-    bank_name = models.CharField(max_length=100, blank=True, help_text="Bank name.")
-    bank_branch_name = models.CharField(max_length=100, blank=True, help_text="Bank branch name.")
-    bank_swift_code = models.CharField(max_length=20, blank=True, help_text="Bank SWIFT code.")
-    bank_routing_number = models.CharField(max_length=20, blank=True, help_text="Bank routing number.")
-    bank_city = models.CharField(max_length=100, blank=True, help_text="Bank city.")
-    bank_country = models.CharField(max_length=100, blank=True, help_text="Bank country.")
-
-    def rename_media_files(self, old_event_id):
-        """Rename the media file to the new event ID if applicable."""
-        if self.media_file:
-            old_media_path = self.media_file.path
-            # Check if the old event ID is part of the filename
-            if old_event_id in old_media_path:
-                new_file_name = old_media_path.replace(old_event_id, self.event_id)
-                new_media_path = os.path.join(os.path.dirname(old_media_path), os.path.basename(new_file_name))
-                
-                # Rename the file on the filesystem
-                os.rename(old_media_path, new_media_path)
-                
-                # Update the media file field with the new path
-                self.media_file.name = os.path.relpath(new_media_path, start=os.path.dirname(self.media_file.storage.location))
-    
     def save(self, *args, **kwargs):
         """Override save to handle renaming the event and its media file."""
         # Ensure event_id is created if not set
         if not self.event_id:
             self.event_id = slugify(self.title)  # Automatically generate event_id based on title
-        
-        # Check if this is an update (not a new instance)
-        if self.pk:
-            try:
-                old_event = Event.objects.get(pk=self.pk)
-                old_event_id = old_event.event_id
-                if old_event_id != self.event_id:
-                    # If event_id changed, rename associated media files
-                    self.rename_media_files(old_event_id)
-            except Event.DoesNotExist:
-                pass  # In case the event does not exist, skip renaming (unlikely for update)
-        
-        # Save the event object
-        super().save(*args, **kwargs)
-           
+            if self.event_id in RESERVED_EVENT_IDS:
+                self.event_id += '-event'
+
+        # Status follows the clock unless the event was cancelled, see events/status.py
+        timed = {'status', 'start_time', 'end_time'}
+        if not timed & self.get_deferred_fields() and self.status != 'cancelled' and self.start_time and self.end_time:
+            self.status = derive_status(self.start_time, self.end_time)
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'status'}
+
+        # Keep the list summary in sync, unless the description wasn't loaded
+        if 'description' not in self.get_deferred_fields():
+            self.summary = make_summary(self.description)
+            if kwargs.get('update_fields') is not None and 'description' in kwargs['update_fields']:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'summary'}
+
+        loaded = getattr(self, '_loaded_values', None)
+        old_event_id = None
+        if not self._state.adding and loaded is not None and loaded.get('event_id') != self.event_id:
+            # event_id is the primary key, so a new one means a new row
+            old_event_id = loaded['event_id']
+            kwargs.update(force_insert=True, update_fields=None)
+        elif (
+            not self._state.adding and loaded is not None
+            and kwargs.get('update_fields') is None and not kwargs.get('force_insert')
+        ):
+            # Only write what changed. seats_taken only changes through F() updates,
+            # don't write back the copy loaded with the form
+            auto_now = {field.name for field in self._meta.concrete_fields if getattr(field, 'auto_now', False)}
+            kwargs['update_fields'] = (self.get_dirty_fields() - {'seats_taken'}) | auto_now
+
+        # Responsive variants of a new upload are rendered in the background
+        needs_variants = bool(self.media_file) and not self.media_file._committed
+
+        if old_event_id is None:
+            super().save(*args, **kwargs)
+        else:
+            using = kwargs.get('using') or router.db_for_write(Event, instance=self)
+            with transaction.atomic(using=using):
+                # Lock the old row so no seats are taken while it moves, and carry its counter over
+                old = (
+                    Event._base_manager.using(using).select_for_update()
+                    .filter(pk=old_event_id).values('seats_taken', 'created_at').first()
+                )
+                if old is not None:
+                    self.seats_taken = old['seats_taken']
+                super().save(*args, **kwargs)
+                if old is not None:
+                    # auto_now_add stamps the inserted row, it's still the same event
+                    Event._base_manager.using(using).filter(pk=self.pk).update(created_at=old['created_at'])
+                    self.created_at = old['created_at']
+                    self.move_related(old_event_id, using)
+                    # Nothing references it any more, its delete signals clean up the old event_id
+                    Event._base_manager.using(using).filter(pk=old_event_id).delete()
+            if not needs_variants:
+                transaction.on_commit(lambda: self.relocate_media_file(old_event_id), using=using)
+
+        self._loaded_values = self.get_current_values()
+
+        if needs_variants:
+            enqueue(self, 'media_file', operation='variants')
+
     def clean(self):
         # Validate file type (image, gif, video)
         if self.media_file:
@@ -0,0 +1,18 @@
+from django.db import models
+from django.utils import timezone
+
+class EventTombstone(models.Model):
+    """Marks a deleted event for the change feed, see events/changes.py."""
+
+    # Not a foreign key, the event row is gone
+    event_id = models.CharField(max_length=50)
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # The change feed reads tombstones in (deleted_at, id) order after a cursor
+            models.Index(fields=['deleted_at', 'id'], name='tombstone_deleted_at_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_id} deleted at {self.deleted_at}"
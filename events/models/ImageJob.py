@@ -0,0 +1,43 @@
+from django.db import models
+from django.utils import timezone
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
+
+class ImageJob(models.Model):
+    """A queued image processing task for a file field of any model instance."""
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    OPERATION_CHOICES = [
+        ('compress', 'Compress'),
+        ('variants', 'Responsive variants'),
+    ]
+
+    # The instance and file field the job works on
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.CharField(max_length=255)
+    target = GenericForeignKey('content_type', 'object_id')
+    field_name = models.CharField(max_length=100)
+
+    operation = models.CharField(max_length=20, choices=OPERATION_CHOICES, default='compress')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    last_error = models.TextField(blank=True)
+
+    run_after = models.DateTimeField(default=timezone.now, help_text="The job is not picked up before this time.")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+        ]
+
+    def __str__(self):
+        return f"{self.operation} {self.content_type.model}:{self.object_id}.{self.field_name} ({self.status})"
@@ -0,0 +1,35 @@
+from django.db import models
+from django.utils import timezone
+from .Registration import Registration
+
+class Notification(models.Model):
+    """An email waiting to be sent to a registrant, see events/notifications.py."""
+
+    KIND_CHOICES = [
+        ('approved', 'Registration approved'),
+        ('rejected', 'Registration rejected'),
+    ]
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    registration = models.ForeignKey(Registration, on_delete=models.CASCADE, related_name='notifications')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now, help_text="Not sent before this time, pushed back after every failure.")
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='notification_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} email for registration {self.registration_id} ({self.status})"
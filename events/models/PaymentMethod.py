@@ -0,0 +1,58 @@
+from django.db import models
+from .Event import Event
+
+class PaymentMethod(models.Model):
+    """
+    One way to pay for an event, e.g. a bKash wallet or a bank account.
+
+    Providers are free-form slugs so a new wallet only needs a new row, not a
+    new column. Blank details are left out of the API output.
+    """
+
+    PAYMENT_OPTION_CHOICES = [
+        ('make payment', 'Make Payment'),
+        ('send money', 'Send Money'),
+    ]
+
+    # Details in the order they are returned by the payment methods API
+    DETAIL_FIELDS = [
+        'account_name',
+        'account_number',
+        'payment_option',
+        'bank_name',
+        'branch_name',
+        'swift_code',
+        'routing_number',
+        'city',
+        'country',
+    ]
+
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='payment_methods')
+    provider = models.SlugField(max_length=30, help_text="Identifier sent by registrants, e.g. bkash, nagad, rocket or bank.")
+    is_active = models.BooleanField(default=True)
+    sort_order = models.PositiveSmallIntegerField(default=0)
+
+    account_name = models.CharField(max_length=100, blank=True, help_text="Account holder name.")
+    account_number = models.CharField(max_length=30, blank=True, help_text="Wallet or bank account number.")
+    payment_option = models.CharField(max_length=20, choices=PAYMENT_OPTION_CHOICES, blank=True, help_text="Wallet payment option.")
+
+    # Bank transfer details
+    bank_name = models.CharField(max_length=100, blank=True, help_text="Bank name.")
+    branch_name = models.CharField(max_length=100, blank=True, help_text="Bank branch name.")
+    swift_code = models.CharField(max_length=20, blank=True, help_text="Bank SWIFT code.")
+    routing_number = models.CharField(max_length=20, blank=True, help_text="Bank routing number.")
+    city = models.CharField(max_length=100, blank=True, help_text="Bank city.")
+    country = models.CharField(max_length=100, blank=True, help_text="Bank country.")
+
+    class Meta:
+        ordering = ['sort_order', 'id']
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'provider'], name='unique_event_payment_provider'),
+        ]
+
+    def as_dict(self):
+        """The non-empty details of this method."""
+        return {name: getattr(self, name) for name in self.DETAIL_FIELDS if getattr(self, name)}
+
+    def __str__(self):
+        return f"{self.provider} for {self.event_id}"
@@ -1,100 +1,155 @@
 from django.db import models
 from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.contrib.auth.hashers import make_password, check_password
 import os
-from PIL import Image
-from io import BytesIO
-from django.core.files.uploadedfile import InMemoryUploadedFile
-from django.db import models
 from .Event import Event
+from ..jobs import enqueue
+from ..pricing import prices_from_event, quote
+from ..seats import SeatsUnavailable, promote_waitlist, release_seats, reserve_seats, seats_available, seats_for
 
 def transaction_upload_to(instance, filename):
-    """Generate file path for the transaction document using student_id."""
+    """Generate file path for the transaction document using student_id.
+
+    The default storage keeps only the directory and extension and names the
+    file after its content, see events/storage.py.
+    """
     file_extension = os.path.splitext(filename)[1]
     return os.path.join('transactions_documents', instance.student_id + file_extension)
 
 def profile_picture_upload_to(instance, filename):
-    """Generate file path for the profile picture using student_id."""
+    """Generate file path for the profile picture using student_id (see transaction_upload_to)."""
     file_extension = os.path.splitext(filename)[1]
     return os.path.join('profile_picture', instance.student_id + file_extension)
 
-def compress_image(image):
-    """
-    Compress the uploaded image before saving.
-    """
-    # Open the image file using Pillow
-    img = Image.open(image)
-    
-    # # Perform the compression: reduce the quality to 85%
-    # img = img.convert('RGB')  # Ensure the image is in RGB mode (useful for PNG to JPEG conversion)
-    
-    # Get original dimensions
-    original_width, original_height = img.size
-    
-    target_height = 900
-    # Calculate new width maintaining the aspect ratio
-    target_width = int((target_height / original_height) * original_width)
-    
-    # Resize image with the new width and height
-    img = img.resize((target_width, target_height), Image.Resampling.LANCZOS)
-    
-    # Save the image to a BytesIO object
-    img_io = BytesIO()
-    img.save(img_io, format='JPEG', quality=50)
-    img_io.seek(0)
-
-    # Create an InMemoryUploadedFile to replace the original image
-    return InMemoryUploadedFile(img_io, None, image.name, 'image/jpeg', img_io.tell(), None)
-
 class Registration(models.Model):
     student_id = models.CharField(max_length=50, unique=True, blank=False)
     full_name = models.CharField(max_length=255, blank=False)
     date_of_birth = models.DateField(blank=False)
     batch = models.CharField(max_length=50, blank=False)
     session = models.CharField(max_length=50, blank=False)
-    email = models.EmailField(blank=False)
+    email = models.EmailField(blank=False, db_index=True)
     contact_number = models.CharField(max_length=15, blank=False)
     whatsapp_number = models.CharField(max_length=15, blank=False)
     adult_guests = models.PositiveIntegerField(blank=False)
     child_guests = models.PositiveIntegerField(blank=False)
     total_amount = models.PositiveIntegerField(default=0, blank=False)
-    payment_method = models.CharField(max_length=100, choices=Event.PAYMENT_METHOD_CHOICES, blank=False)
-    transaction_id = models.CharField(max_length=255, blank=False)
+    payment_method = models.CharField(max_length=100, blank=False, help_text="Provider of one of the event's payment methods.")
+    transaction_id = models.CharField(max_length=255, blank=False, db_index=True)
     
-    # Media files should be saved under student_id
+    # Media files are stored by content hash, see events/storage.py
     transaction_document = models.FileField(upload_to=transaction_upload_to, null=False, blank=False)
     profile_picture = models.ImageField(upload_to=profile_picture_upload_to, null=False, blank=False)
+    profile_picture_rendered = models.CharField(
+        max_length=100, blank=True, editable=False,
+        help_text="Profile picture whose responsive variants have all been rendered, see events/images.py."
+    )
     
-    registration_datetime = models.DateTimeField(auto_now_add=True)
-    password = models.CharField(max_length=255, blank=False)  # Store hashed password
+    registration_datetime = models.DateTimeField(auto_now_add=True, db_index=True)
+    password = models.CharField(max_length=255, blank=False)  # Hashed, see set_password()
     event = models.ForeignKey(Event, on_delete=models.CASCADE, blank=False)
     approved = models.BooleanField(default=False)
+    waitlisted = models.BooleanField(
+        default=False,
+        help_text="Registered after the event was full. Holds no seats until promoted."
+    )
+
+    class Meta:
+        indexes = [
+            # Admin/export filters: registrations of an event by approval state
+            models.Index(fields=['event', 'approved'], name='registration_event_approved'),
+            models.Index(fields=['approved'], name='registration_approved'),
+            # Admin search by name prefix
+            models.Index(fields=['full_name'], name='registration_full_name'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Seats held as loaded, to update the event's counter by the difference on save
+        if {'event_id', 'adult_guests', 'child_guests', 'waitlisted'} <= set(field_names):
+            instance._held_seats = (instance.event_id, instance.held_seats)
+        return instance
+
+    @property
+    def seats(self):
+        return seats_for(self.adult_guests, self.child_guests)
+
+    @property
+    def held_seats(self):
+        return 0 if self.waitlisted else self.seats
+
+    def extra_seats(self):
+        """Seats an existing registration takes beyond what it holds, or gives back when negative."""
+        held = getattr(self, '_held_seats', None)
+        if self._state.adding or held is None:
+            return 0
+        old_event_id, old_seats = held
+        if old_event_id != self.event_id:
+            old_seats = 0
+        return self.held_seats - old_seats
+
+    def clean(self):
+        # New registrations are waitlisted when the event is full, changed ones have to fit
+        extra = self.extra_seats()
+        if extra > 0 and not seats_available(self.event_id, extra):
+            raise ValidationError({'adult_guests': "Not enough seats left for the guests of this registration."})
+
+    def sync_seats(self):
+        """
+        Take or give back seats for this save, waitlisting a new registration that
+        doesn't fit. Raises SeatsUnavailable when the seats clean() found free were
+        taken meanwhile.
+        """
+        if self._state.adding:
+            if not self.waitlisted and not reserve_seats(self.event_id, self.seats):
+                self.waitlisted = True
+            return
+
+        held = getattr(self, '_held_seats', None)
+        if held is None:
+            return
+        old_event_id, old_seats = held
+        if old_event_id != self.event_id:
+            release_seats(old_event_id, old_seats)
+            promote_waitlist(old_event_id)
+        extra = self.extra_seats()
+        if extra > 0 and not reserve_seats(self.event_id, extra):
+            raise SeatsUnavailable("Not enough seats left for the guests of this registration.")
+        if extra < 0:
+            release_seats(self.event_id, -extra)
+            promote_waitlist(self.event_id)
 
     def calculate_total_amount(self):
         """Calculate total amount based on number of guests and event price."""
         if self.event:
-            total = self.event.amount_per_person + self.adult_guests * self.event.amount_per_adult_guest + self.child_guests * self.event.amount_per_child_guest
-            return total
+            return quote(prices_from_event(self.event), self.adult_guests, self.child_guests)
         return 0
 
     def save(self, *args, **kwargs):
-        """Override save to calculate total amount and hash password."""
+        """Override save to calculate the total amount and keep the seats in step."""
         if not self.total_amount:
             self.total_amount = self.calculate_total_amount()
 
-        # Hash the password before saving
-        if self.password:
-            self.password = make_password(self.password)
-        
-        if self.profile_picture:
-            # Compress the profile picture before saving
-            self.profile_picture = compress_image(self.profile_picture)
+        # A freshly uploaded picture is compressed in the background, see events/jobs.py
+        needs_compression = bool(self.profile_picture) and not self.profile_picture._committed
+
+        # The seat counter, the row and its image job change together or not at all
+        with transaction.atomic():
+            self.sync_seats()
+            super().save(*args, **kwargs)
+            if needs_compression:
+                enqueue(self, 'profile_picture')
+        self._held_seats = (self.event_id, self.held_seats)
 
-        super().save(*args, **kwargs)
+    def set_password(self, raw_password):
+        """Store a hash of ``raw_password``. Code that receives a raw password hashes it, save() doesn't."""
+        self.password = make_password(raw_password)
 
     def check_password(self, raw_password):
         """Check if the provided password matches the stored hashed password."""
         return check_password(raw_password, self.password)
 
     def __str__(self):
-        return f"Registration for {self.full_name} - {self.event.title}"
+        # event_id instead of event.title, so listing registrations never loads events one by one
+        return f"Registration for {self.full_name} - {self.event_id}"
@@ -0,0 +1,13 @@
+from django.db import models
+
+class StoredFile(models.Model):
+    """A content-addressed media file and how many file fields point at it, see events/storage.py."""
+
+    name = models.CharField(max_length=255, unique=True, help_text="Storage name, derived from the SHA-256 of the content.")
+    sha256 = models.CharField(max_length=64, db_index=True)
+    size = models.PositiveBigIntegerField(default=0)
+    references = models.PositiveIntegerField(default=1, help_text="The file is deleted when this drops to zero.")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.references} references)"
@@ -0,0 +1,122 @@
+"""
+Outbox for registrant emails. Notifications are queued in the database by
+the request and sent in batches over a single SMTP connection by
+``python manage.py send_notifications`` (or ``send_pending()`` in tests).
+Every email is tracked on its own: one that fails is retried after a
+growing delay, the others of its batch are not sent twice. A batch is
+claimed before it is sent, so concurrent senders don't overlap.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models.Notification import Notification
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 3
+RETRY_DELAY = 60  # Seconds, doubled after every failed attempt
+CLAIM_TIMEOUT = 10 * 60  # Seconds before a batch claimed by a sender that died is sent again
+
+SUBJECTS = {
+    'approved': "Your registration for {event} is approved",
+    'rejected': "Your registration for {event} was not approved",
+}
+
+BODIES = {
+    'approved': "Dear {name},\n\nYour registration for {event} has been approved. We look forward to seeing you.\n",
+    'rejected': "Dear {name},\n\nYour registration for {event} could not be approved. Please contact the organizers for details.\n",
+}
+
+
+def queue_notifications(registration_ids, kind):
+    return Notification.objects.bulk_create(
+        [Notification(registration_id=registration_id, kind=kind) for registration_id in registration_ids],
+        batch_size=500,
+    )
+
+
+def build_message(notification, connection=None):
+    registration = notification.registration
+    context = {'name': registration.full_name, 'event': registration.event.title}
+    return EmailMessage(
+        subject=SUBJECTS[notification.kind].format(**context),
+        body=BODIES[notification.kind].format(**context),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[registration.email],
+        connection=connection,
+    )
+
+
+def claim_batch(batch_size=100, now=None):
+    """
+    Move up to ``batch_size`` due notifications to ``sending`` and return them,
+    so concurrent senders (cron next to ``--loop``) never email anyone twice.
+    """
+    now = now or timezone.now()
+    due = Q(status__in=['pending', 'sending'], next_attempt_at__lte=now)
+    with transaction.atomic():
+        # Other senders skip the locked rows, SQLite runs one write transaction at a time anyway
+        pks = list(
+            Notification.objects.select_for_update(skip_locked=True).filter(due)
+            .order_by('next_attempt_at', 'pk').values_list('pk', flat=True)[:batch_size]
+        )
+        Notification.objects.filter(due, pk__in=pks).update(
+            status='sending', next_attempt_at=now + timedelta(seconds=CLAIM_TIMEOUT)
+        )
+    return list(Notification.objects.filter(pk__in=pks).select_related('registration__event').order_by('pk'))
+
+
+def send_pending(batch_size=100, max_batches=None):
+    """Send due notifications in batches over one reused connection. Returns the number sent."""
+    sent = 0
+    batches = 0
+    connection = get_connection()
+    try:
+        while max_batches is None or batches < max_batches:
+            now = timezone.now()
+            # Claimed before the connection is opened
+            notifications = claim_batch(batch_size, now)
+            if not notifications:
+                break
+            batches += 1
+
+            sent_ids = []
+            failed = []
+            for notification in notifications:
+                try:
+                    # Reconnects after a failure closed it, does nothing while it is open
+                    connection.open()
+                    connection.send_messages([build_message(notification, connection)])
+                except Exception as error:
+                    notification.last_error = str(error)
+                    failed.append(notification)
+                    # The connection may be gone, the next email gets a fresh one
+                    connection.close()
+                else:
+                    sent_ids.append(notification.pk)
+
+            if sent_ids:
+                Notification.objects.filter(pk__in=sent_ids).update(
+                    status='sent', sent_at=timezone.now(), attempts=F('attempts') + 1
+                )
+                sent += len(sent_ids)
+            if failed:
+                logger.warning("Sending %s of %s notification(s) failed", len(failed), len(notifications))
+                for notification in failed:
+                    notification.attempts += 1
+                    if notification.attempts >= MAX_ATTEMPTS:
+                        notification.status = 'failed'
+                    else:
+                        notification.status = 'pending'
+                        delay = RETRY_DELAY * 2 ** (notification.attempts - 1)
+                        notification.next_attempt_at = now + timedelta(seconds=delay)
+                Notification.objects.bulk_update(failed, ['status', 'attempts', 'last_error', 'next_attempt_at'])
+    finally:
+        connection.close()
+    return sent
@@ -0,0 +1,177 @@
+import base64
+import json
+from django.core.paginator import InvalidPage, Paginator
+from django.db import connection, models
+from django.db.models import Q
+from django.utils.functional import cached_property
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over the ``(start_time, event_id)`` key.
+
+    Each page is a range scan on the composite index that starts right after
+    the last row of the previous page, so there is no COUNT(*) and no OFFSET,
+    and pages stay stable while events are added or removed.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.get_page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """``paginate_queryset()`` for async views."""
+        return self.set_page([obj async for obj in self.get_page_queryset(queryset, request)])
+
+    def get_page_queryset(self, queryset, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.cursor = self.decode_cursor(request)
+
+        if self.cursor is None:
+            reverse, position = False, None
+        else:
+            reverse, position = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by('-start_time', '-event_id')
+        else:
+            queryset = queryset.order_by('start_time', 'event_id')
+
+        if position is not None:
+            start_time, event_id = position
+            if reverse:
+                queryset = queryset.filter(Q(start_time__lt=start_time) | Q(start_time=start_time, event_id__lt=event_id))
+            else:
+                queryset = queryset.filter(Q(start_time__gt=start_time) | Q(start_time=start_time, event_id__gt=event_id))
+
+        # Fetch one extra row to find out whether there is another page
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, results):
+        reverse, position = self.cursor if self.cursor is not None else (False, None)
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if reverse:
+            results.reverse()
+            self.has_previous, self.has_next = has_more, True
+        else:
+            self.has_previous, self.has_next = position is not None, has_more
+
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            start_time = parse_datetime(payload['p'][0])
+            event_id = str(payload['p'][1])
+            reverse = bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, IndexError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if start_time is None:
+            raise NotFound(self.invalid_cursor_message)
+        return reverse, (start_time, event_id)
+
+    def encode_cursor(self, reverse, event):
+        payload = {'p': [event.start_time.isoformat(), event.event_id]}
+        if reverse:
+            payload['r'] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode()
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(False, self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(True, self.page[0])
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
+class AsyncPageNumberPagination(PageNumberPagination):
+    """PageNumberPagination with an ``apaginate_queryset()`` for async views."""
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        # Counted here so Paginator.page() has nothing left to query
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        self.page.object_list = [obj async for obj in self.page.object_list]
+        return list(self.page)
+
+
+def estimate_row_count(model):
+    """
+    Cheap approximate row count of a whole table: the planner statistics on
+    PostgreSQL, the highest auto-increment id elsewhere. None if unknown.
+    """
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [table])
+        elif isinstance(model._meta.pk, models.AutoField):
+            cursor.execute(f"SELECT MAX({connection.ops.quote_name(model._meta.pk.column)}) FROM {connection.ops.quote_name(table)}")
+        else:
+            return None
+        row = cursor.fetchone()
+    return row[0] if row and row[0] is not None and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for big admin tables: the unfiltered list uses an estimated
+    row count instead of COUNT(*), filtered lists are counted as usual.
+    """
+    estimate_threshold = 10000
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            estimate = estimate_row_count(self.object_list.model)
+            if estimate is not None and estimate > self.estimate_threshold:
+                return estimate
+        return super().count
@@ -0,0 +1,79 @@
+"""
+Cached payment method lookups, invalidated by signals on PaymentMethod changes.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from .models.Event import Event
+from .models.PaymentMethod import PaymentMethod
+
+PAYMENT_METHODS_TIMEOUT = 60 * 60 * 24
+
+
+def get_timeout():
+    # Short without a shared cache, where the signals only reach this process
+    return getattr(settings, 'EVENTS_LOOKUP_CACHE_TIMEOUT', PAYMENT_METHODS_TIMEOUT)
+
+
+def payment_methods_key(event_id):
+    return f'events:payment-methods:{event_id}'
+
+
+def build_payment_methods(event_id):
+    """``{provider: {detail: value}}`` for the active methods of an event, or None if the event doesn't exist."""
+    methods = PaymentMethod.objects.filter(event_id=event_id, is_active=True)
+    payment_methods = {method.provider: method.as_dict() for method in methods}
+    if not payment_methods and not Event.objects.filter(event_id=event_id).exists():
+        return None
+    return payment_methods
+
+
+def get_payment_methods(event_id):
+    payment_methods = cache.get(payment_methods_key(event_id))
+    if payment_methods is None:
+        payment_methods = build_payment_methods(event_id)
+        if payment_methods is not None:
+            cache.set(payment_methods_key(event_id), payment_methods, get_timeout())
+    return payment_methods
+
+
+async def abuild_payment_methods(event_id):
+    methods = PaymentMethod.objects.filter(event_id=event_id, is_active=True)
+    payment_methods = {method.provider: method.as_dict() async for method in methods}
+    if not payment_methods and not await Event.objects.filter(event_id=event_id).aexists():
+        return None
+    return payment_methods
+
+
+async def aget_payment_methods(event_id):
+    payment_methods = await cache.aget(payment_methods_key(event_id))
+    if payment_methods is None:
+        payment_methods = await abuild_payment_methods(event_id)
+        if payment_methods is not None:
+            await cache.aset(payment_methods_key(event_id), payment_methods, get_timeout())
+    return payment_methods
+
+
+def providers_key(event_id):
+    return f'events:payment-providers:{event_id}'
+
+
+def build_accepted_providers(event_id):
+    """Providers a registration for the event may choose."""
+    rows = list(PaymentMethod.objects.filter(event_id=event_id).values_list('provider', 'is_active'))
+    if not rows:
+        # Events that never had payment methods configured accept the default providers
+        return sorted(provider for provider, label in Event.PAYMENT_METHOD_CHOICES)
+    # Deactivating every method closes payments, it doesn't bring the defaults back
+    return sorted(provider for provider, is_active in rows if is_active)
+
+
+def get_accepted_providers(event_id):
+    providers = cache.get(providers_key(event_id))
+    if providers is None:
+        providers = build_accepted_providers(event_id)
+        cache.set(providers_key(event_id), providers, get_timeout())
+    return set(providers)
+
+
+def invalidate_payment_methods(event_id):
+    cache.delete_many([payment_methods_key(event_id), providers_key(event_id)])
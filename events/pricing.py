@@ -0,0 +1,79 @@
+"""
+Event pricing. The three per-head amounts are cached per event so quotes
+don't need to load the event row, signals drop them when the event changes.
+"""
+from collections import namedtuple
+from django.conf import settings
+from django.core.cache import cache
+from .models.Event import Event
+
+PRICES_TIMEOUT = 60 * 60 * 24
+
+EventPrices = namedtuple('EventPrices', ['amount_per_person', 'amount_per_adult_guest', 'amount_per_child_guest'])
+
+
+def get_timeout():
+    # Short without a shared cache, where the signals only reach this process
+    return getattr(settings, 'EVENTS_LOOKUP_CACHE_TIMEOUT', PRICES_TIMEOUT)
+
+
+def prices_key(event_id):
+    return f'events:prices:{event_id}'
+
+
+def prices_from_event(event):
+    return EventPrices(event.amount_per_person, event.amount_per_adult_guest, event.amount_per_child_guest)
+
+
+def get_event_prices(event_id):
+    """Cached prices of an event, or None if it doesn't exist."""
+    prices = cache.get(prices_key(event_id))
+    if prices is None:
+        row = Event.objects.filter(event_id=event_id).values_list(*EventPrices._fields).first()
+        if row is None:
+            return None
+        prices = tuple(row)
+        cache.set(prices_key(event_id), prices, get_timeout())
+    return EventPrices(*prices)
+
+
+async def aget_event_prices(event_id):
+    prices = await cache.aget(prices_key(event_id))
+    if prices is None:
+        row = await Event.objects.filter(event_id=event_id).values_list(*EventPrices._fields).afirst()
+        if row is None:
+            return None
+        prices = tuple(row)
+        await cache.aset(prices_key(event_id), prices, get_timeout())
+    return EventPrices(*prices)
+
+
+def get_prices_for_events(event_ids):
+    """Cached prices of many events at once, ``{event_id: EventPrices}``. Unknown events are left out."""
+    event_ids = set(event_ids)
+    cached = cache.get_many([prices_key(event_id) for event_id in event_ids])
+    prices = {
+        event_id: EventPrices(*cached[prices_key(event_id)])
+        for event_id in event_ids if prices_key(event_id) in cached
+    }
+
+    missing = event_ids - set(prices)
+    if missing:
+        rows = Event.objects.filter(event_id__in=missing).values_list('event_id', *EventPrices._fields)
+        fetched = {row[0]: EventPrices(*row[1:]) for row in rows}
+        cache.set_many({prices_key(event_id): tuple(value) for event_id, value in fetched.items()}, get_timeout())
+        prices.update(fetched)
+    return prices
+
+
+def invalidate_event_prices(event_id):
+    cache.delete(prices_key(event_id))
+
+
+def quote(prices, adult_guests=0, child_guests=0):
+    """Total amount for the registrant plus their guests."""
+    return (
+        prices.amount_per_person
+        + adult_guests * prices.amount_per_adult_guest
+        + child_guests * prices.amount_per_child_guest
+    )
@@ -0,0 +1,52 @@
+"""
+Cache-backed counters for failed attempts, e.g. wrong registration passwords.
+"""
+from django.core.cache import cache
+
+
+def _key(scope, ident):
+    return f'events:failures:{scope}:{ident}'
+
+
+def is_limited(scope, idents, limit):
+    """True if any of ``idents`` already failed ``limit`` times within the window."""
+    counts = cache.get_many([_key(scope, ident) for ident in idents if ident])
+    return any(count >= limit for count in counts.values())
+
+
+def record_failure(scope, idents, window):
+    for ident in idents:
+        if not ident:
+            continue
+        key = _key(scope, ident)
+        # The window starts at the first failure
+        if not cache.add(key, 1, window):
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.add(key, 1, window)
+
+
+def reset(scope, ident):
+    cache.delete(_key(scope, ident))
+
+
+async def ais_limited(scope, idents, limit):
+    counts = await cache.aget_many([_key(scope, ident) for ident in idents if ident])
+    return any(count >= limit for count in counts.values())
+
+
+async def arecord_failure(scope, idents, window):
+    for ident in idents:
+        if not ident:
+            continue
+        key = _key(scope, ident)
+        if not await cache.aadd(key, 1, window):
+            try:
+                await cache.aincr(key)
+            except ValueError:
+                await cache.aadd(key, 1, window)
+
+
+async def areset(scope, ident):
+    await cache.adelete(_key(scope, ident))
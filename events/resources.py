@@ -0,0 +1,183 @@
+"""
+django-import-export resources for bulk loading offline/on-site registrations.
+
+Rows are validated without per-row queries, priced from cached event prices,
+written with bulk_create/bulk_update in batches, and passwords are hashed
+in a process pool. Seats are taken in row order, and new registrations that
+don't fit are waitlisted as they would be through the API. Profile pictures
+are compressed later by the image jobs.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from decimal import InvalidOperation
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.db import connection
+from import_export import fields, resources, widgets
+from import_export.instance_loaders import CachedInstanceLoader
+
+from .jobs import enqueue_many
+from .models.Event import Event
+from .models.Registration import Registration
+from .payments import get_accepted_providers
+from .pricing import get_prices_for_events, quote
+from .seats import promote_waitlist, recount_seats
+
+
+def hash_passwords(passwords, workers=None):
+    """Hash many passwords, in parallel processes when there are enough of them."""
+    if len(passwords) < RegistrationResource.pool_threshold:
+        return [make_password(password) for password in passwords]
+    with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as executor:
+        return list(executor.map(make_password, passwords, chunksize=16))
+
+
+class WholeNumberWidget(widgets.IntegerWidget):
+    """IntegerWidget that reports bad input as a validation error instead of a decimal exception."""
+
+    def clean(self, value, row=None, **kwargs):
+        try:
+            return super().clean(value, row=row, **kwargs)
+        except InvalidOperation:
+            raise ValueError("Enter a whole number.")
+
+
+class RegistrationResource(resources.ModelResource):
+    # The raw id, so rows don't need an Event query each
+    event = fields.Field(attribute='event_id', column_name='event', widget=widgets.CharWidget())
+    adult_guests = fields.Field(attribute='adult_guests', column_name='adult_guests', widget=WholeNumberWidget())
+    child_guests = fields.Field(attribute='child_guests', column_name='child_guests', widget=WholeNumberWidget())
+
+    # Passwords are hashed together before the rows are imported
+    pool_threshold = 50
+    hash_workers = None
+
+    # Checked in bulk instead of by full_clean(), which would query per row
+    unchecked_fields = ['event']
+    # Imported by name, the files have to be in storage already
+    file_fields = ['transaction_document', 'profile_picture']
+
+    class Meta:
+        model = Registration
+        fields = (
+            'student_id', 'full_name', 'date_of_birth', 'batch', 'session', 'email', 'contact_number',
+            'whatsapp_number', 'adult_guests', 'child_guests', 'payment_method', 'transaction_id',
+            'transaction_document', 'profile_picture', 'password', 'event', 'approved',
+        )
+        import_id_fields = ('student_id',)
+        instance_loader_class = CachedInstanceLoader
+        clean_model_instances = True
+        use_bulk = True
+        batch_size = 500
+        skip_diff = True
+
+    def import_data(self, dataset, dry_run=False, **kwargs):
+        # import_data() doesn't pass dry_run on to the import hooks
+        self.dry_run = dry_run
+        return super().import_data(dataset, dry_run=dry_run, **kwargs)
+
+    def before_import(self, dataset, **kwargs):
+        super().before_import(dataset, **kwargs)
+        # One lookup for the prices of every event in the file
+        event_ids = {str(event_id).strip() for event_id in dataset['event'] if event_id} if 'event' in dataset.headers else set()
+        self.prices = get_prices_for_events(event_ids)
+        self.providers = {event_id: get_accepted_providers(event_id) for event_id in self.prices}
+        self.load_seats_left()
+        self.seen_student_ids = set()
+        self.new_pictures = []
+
+        if not self.dry_run and 'password' in dataset.headers:
+            self.hash_password_column(dataset)
+
+    def hash_password_column(self, dataset):
+        index = dataset.headers.index('password')
+        # Every value is a raw password, even one that looks like a hash
+        rows = [row for row in range(len(dataset)) if dataset[row][index]]
+        hashed = hash_passwords([str(dataset[row][index]) for row in rows], self.hash_workers)
+        for row, password in zip(rows, hashed):
+            values = list(dataset[row])
+            values[index] = password
+            dataset[row] = values
+
+    def load_seats_left(self):
+        # Taken in row order while validating, so the file can't oversell an event
+        events = Event.objects.filter(event_id__in=self.prices).values_list('event_id', 'capacity', 'seats_taken')
+        if connection.in_atomic_block:
+            events = events.select_for_update()
+        self.seats_left = {
+            event_id: None if capacity is None else max(capacity - seats_taken, 0)
+            for event_id, capacity, seats_taken in events
+        }
+        self.seat_event_ids = set(self.prices)
+
+    def allocate_seats(self, instance):
+        """
+        Take the seats of a valid row like reserve_seats() would. New registrations
+        that don't fit are waitlisted, updates that don't fit are errors, as in
+        Registration.clean().
+        """
+        event_id = instance.event_id
+        left = self.seats_left[event_id]
+        if instance._state.adding:
+            instance.waitlisted = left is not None and instance.seats > left
+            extra = instance.held_seats
+        else:
+            extra = instance.extra_seats()
+            if left is not None and extra > left:
+                raise ValidationError({'adult_guests': "Not enough seats left for the guests of this registration."})
+            old_event_id, old_seats = instance._held_seats
+            if old_event_id != event_id:
+                self.seat_event_ids.add(old_event_id)
+                if self.seats_left.get(old_event_id) is not None:
+                    self.seats_left[old_event_id] += old_seats
+        if left is not None:
+            self.seats_left[event_id] = left - extra
+
+    def validate_instance(self, instance, import_validation_errors=None, validate_unique=True):
+        errors = dict(import_validation_errors or {})
+        try:
+            instance.full_clean(exclude=set(errors) | set(self.unchecked_fields), validate_unique=False)
+        except ValidationError as e:
+            errors = e.update_error_dict(errors)
+
+        if instance.event_id not in self.prices:
+            errors.setdefault('event', []).append(f'Event "{instance.event_id}" does not exist.')
+        elif instance.payment_method and instance.payment_method not in self.providers[instance.event_id]:
+            errors.setdefault('payment_method', []).append(f'"{instance.payment_method}" is not a valid choice.')
+        for name in self.file_fields:
+            field_file = getattr(instance, name)
+            if name not in errors and field_file and not field_file.storage.exists(field_file.name):
+                errors.setdefault(name, []).append(f'File "{field_file.name}" does not exist.')
+        if instance.student_id in self.seen_student_ids:
+            errors.setdefault('student_id', []).append('Student ID appears more than once in the file.')
+        self.seen_student_ids.add(instance.student_id)
+
+        if errors:
+            raise ValidationError(errors)
+        self.allocate_seats(instance)
+
+    def get_bulk_update_fields(self):
+        # Set in before_save_instance(), not read from the file
+        return [*super().get_bulk_update_fields(), 'total_amount']
+
+    def before_save_instance(self, instance, row, **kwargs):
+        # bulk_create skips Registration.save(), so price the row here
+        instance.total_amount = quote(self.prices[instance.event_id], instance.adult_guests, instance.child_guests)
+        if instance._state.adding and instance.profile_picture:
+            self.new_pictures.append(instance.student_id)
+
+    def after_import(self, dataset, result, **kwargs):
+        super().after_import(dataset, result, **kwargs)
+        if self.dry_run or result.has_errors() or result.has_validation_errors():
+            return
+
+        # bulk_create skipped the per-row seat updates. The counts match the seats
+        # taken in allocate_seats(), updates that needed fewer seats make room
+        recount_seats(self.seat_event_ids)
+        for event_id in self.seat_event_ids:
+            promote_waitlist(event_id)
+
+        # Compress the profile pictures of new rows in the background
+        pks = Registration.objects.filter(student_id__in=self.new_pictures).values_list('pk', flat=True)
+        enqueue_many(Registration, list(pks), 'profile_picture')
@@ -0,0 +1,227 @@
+"""
+Full-text search over event title, location and description text.
+
+SQLite uses an FTS5 virtual table, PostgreSQL a tsvector column with a GIN
+index. Both live in side tables created by migration 0012 and are kept in
+sync by signals (``python manage.py rebuild_search_index`` rebuilds them).
+Other databases, or SQLite builds without FTS5, fall back to ``icontains``.
+"""
+import re
+
+from django.db import OperationalError, ProgrammingError, connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models.Event import Event, html_to_text
+
+SQLITE_TABLE = 'events_event_fts'
+POSTGRES_TABLE = 'events_event_search'
+
+# Title matches count most, then location, then the description
+SQLITE_CREATE = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_TABLE} USING fts5("
+    "event_id UNINDEXED, title, location, body, tokenize='unicode61 remove_diacritics 2')"
+)
+SQLITE_RANK = f"bm25({SQLITE_TABLE}, 0.0, 10.0, 4.0, 1.0)"
+
+POSTGRES_CREATE = [
+    f"CREATE TABLE IF NOT EXISTS {POSTGRES_TABLE} ("
+    "event_id varchar(50) PRIMARY KEY REFERENCES events_event (event_id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+    "document tsvector NOT NULL)",
+    f"CREATE INDEX IF NOT EXISTS {POSTGRES_TABLE}_document_gin ON {POSTGRES_TABLE} USING GIN (document)",
+]
+POSTGRES_DOCUMENT = (
+    "setweight(to_tsvector('simple', %s), 'A') || "
+    "setweight(to_tsvector('simple', %s), 'B') || "
+    "setweight(to_tsvector('simple', %s), 'C')"
+)
+
+
+def create_index(schema_editor):
+    schema_editor.connection.__dict__.pop('_events_search_available', None)
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        try:
+            schema_editor.execute(SQLITE_CREATE)
+        except OperationalError:
+            pass  # SQLite without FTS5, search falls back to icontains
+    elif vendor == 'postgresql':
+        for statement in POSTGRES_CREATE:
+            schema_editor.execute(statement)
+
+
+def drop_index(schema_editor):
+    schema_editor.connection.__dict__.pop('_events_search_available', None)
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {SQLITE_TABLE}")
+    elif vendor == 'postgresql':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {POSTGRES_TABLE}")
+
+
+def backend():
+    """'sqlite', 'postgresql' or None when there is no full-text index."""
+    vendor = connection.vendor
+    table = {'sqlite': SQLITE_TABLE, 'postgresql': POSTGRES_TABLE}.get(vendor)
+    if table is None:
+        return None
+    # Looked up once per connection
+    available = getattr(connection, '_events_search_available', None)
+    if available is None:
+        available = table in connection.introspection.table_names()
+        connection._events_search_available = available
+    return vendor if available else None
+
+
+def _document(event):
+    return [event.title, event.location, html_to_text(event.description)]
+
+
+def index_event(event):
+    vendor = backend()
+    if vendor is None:
+        return
+    with connection.cursor() as cursor:
+        if vendor == 'sqlite':
+            cursor.execute(f"DELETE FROM {SQLITE_TABLE} WHERE event_id = %s", [event.event_id])
+            cursor.execute(
+                f"INSERT INTO {SQLITE_TABLE} (event_id, title, location, body) VALUES (%s, %s, %s, %s)",
+                [event.event_id, *_document(event)],
+            )
+        else:
+            cursor.execute(
+                f"INSERT INTO {POSTGRES_TABLE} (event_id, document) VALUES (%s, {POSTGRES_DOCUMENT}) "
+                "ON CONFLICT (event_id) DO UPDATE SET document = EXCLUDED.document",
+                [event.event_id, *_document(event)],
+            )
+
+
+def remove_event(event_id):
+    vendor = backend()
+    if vendor is None:
+        return
+    table = SQLITE_TABLE if vendor == 'sqlite' else POSTGRES_TABLE
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {table} WHERE event_id = %s", [event_id])
+
+
+def rebuild(queryset=None, batch_size=500):
+    """Re-index every event, returns the number indexed."""
+    vendor = backend()
+    if vendor is None:
+        return 0
+    table = SQLITE_TABLE if vendor == 'sqlite' else POSTGRES_TABLE
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {table}")
+    count = 0
+    if queryset is None:
+        queryset = Event.objects.all()
+    for event in queryset.only('event_id', 'title', 'location', 'description').iterator(chunk_size=batch_size):
+        index_event(event)
+        count += 1
+    return count
+
+
+def _sqlite_match(query):
+    # Quote every word so user input can't use FTS5 syntax, and match prefixes
+    words = re.findall(r'\w+', query)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def filter_matching(queryset, query):
+    """``queryset`` narrowed to the events matching ``query``, in its own order. For the admin search."""
+    query = query.strip()
+    vendor = backend()
+    if vendor is None:
+        q = Q(title__icontains=query) | Q(location__icontains=query) | Q(summary__icontains=query)
+        return queryset.filter(q)
+    if vendor == 'sqlite':
+        match = _sqlite_match(query)
+        if not match:
+            return queryset.none()
+        matching = RawSQL(f"SELECT event_id FROM {SQLITE_TABLE} WHERE {SQLITE_TABLE} MATCH %s", [match])
+    else:
+        matching = RawSQL(
+            f"SELECT event_id FROM {POSTGRES_TABLE} WHERE document @@ websearch_to_tsquery('simple', %s)", [query]
+        )
+    return queryset.filter(event_id__in=matching)
+
+
+class SearchResults:
+    """
+    Lazily evaluated, ranked search hits that Django's Paginator can slice,
+    so only one page of events is loaded. Filters on ``queryset`` (status,
+    start_time range) are applied inside the full-text query, so the count
+    and the ranking cover the same events.
+    """
+
+    def __init__(self, query, queryset=None):
+        self.query = query.strip()
+        self.queryset = queryset if queryset is not None else Event.objects.all()
+        self.vendor = backend()
+        if self.vendor == 'sqlite':
+            self.match = _sqlite_match(self.query)
+
+    def _fallback(self):
+        q = Q(title__icontains=self.query) | Q(location__icontains=self.query) | Q(summary__icontains=self.query)
+        return self.queryset.filter(q).order_by('start_time', 'event_id')
+
+    def _filtered(self, column):
+        """SQL restricting the hits to ``self.queryset``, so filters apply before counting and ranking."""
+        if not self.queryset.query.where:
+            return '', []
+        sql, params = self.queryset.order_by().values('event_id').query.sql_with_params()
+        return f" AND {column} IN ({sql})", list(params)
+
+    def _execute(self, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def count(self):
+        if self.vendor is None:
+            return self._fallback().count()
+        if self.vendor == 'sqlite':
+            if not self.match:
+                return 0
+            sql = f"SELECT COUNT(*) FROM {SQLITE_TABLE} WHERE {SQLITE_TABLE} MATCH %s"
+            params = [self.match]
+        else:
+            sql = f"SELECT COUNT(*) FROM {POSTGRES_TABLE} WHERE document @@ websearch_to_tsquery('simple', %s)"
+            params = [self.query]
+        filtered, filter_params = self._filtered('event_id')
+        return self._execute(sql + filtered, params + filter_params)[0][0]
+
+    def __len__(self):
+        return self.count()
+
+    def ranked_ids(self, offset, limit):
+        if self.vendor == 'sqlite':
+            if not self.match:
+                return []
+            filtered, filter_params = self._filtered('event_id')
+            sql = (
+                f"SELECT event_id FROM {SQLITE_TABLE} WHERE {SQLITE_TABLE} MATCH %s{filtered} "
+                f"ORDER BY {SQLITE_RANK}, event_id LIMIT %s OFFSET %s"
+            )
+            params = [self.match, *filter_params, limit, offset]
+        else:
+            filtered, filter_params = self._filtered(f'{POSTGRES_TABLE}.event_id')
+            sql = (
+                f"SELECT event_id FROM {POSTGRES_TABLE}, websearch_to_tsquery('simple', %s) query "
+                f"WHERE document @@ query{filtered} ORDER BY ts_rank(document, query) DESC, event_id LIMIT %s OFFSET %s"
+            )
+            params = [self.query, *filter_params, limit, offset]
+        return [row[0] for row in self._execute(sql, params)]
+
+    def __getitem__(self, index):
+        if self.vendor is None:
+            return self._fallback()[index]
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+
+        start = index.start or 0
+        limit = (index.stop - start) if index.stop is not None else -1
+        ids = self.ranked_ids(start, limit if limit >= 0 else (-1 if self.vendor == 'sqlite' else None))
+        events = self.queryset.in_bulk(ids)
+        return [events[event_id] for event_id in ids if event_id in events]
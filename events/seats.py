@@ -0,0 +1,92 @@
+"""
+Seat accounting for events with a capacity.
+
+``Event.seats_taken`` is a counter changed only by the conditional F()
+updates below, inside the transaction that saves or deletes a registration,
+so concurrent registrations can't oversell an event and nothing ever has to
+COUNT() registrations. A registrant takes ``1 + adult_guests + child_guests``
+seats. Registrations that don't fit are waitlisted and promoted in order
+when seats are released.
+"""
+from django.db import transaction
+from django.db.models import F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from . import cache
+from .models.Event import Event
+
+
+class SeatsUnavailable(Exception):
+    """The seats checked by Registration.clean() were taken by another request before the save."""
+
+
+def seats_for(adult_guests, child_guests):
+    return 1 + (adult_guests or 0) + (child_guests or 0)
+
+
+def _fits(seats):
+    return Q(capacity__isnull=True) | Q(capacity__gte=F('seats_taken') + seats)
+
+
+def seats_available(event_id, seats):
+    """Whether ``seats`` are free right now, for validation. Only reserve_seats() takes them."""
+    return seats <= 0 or Event.objects.filter(_fits(seats), event_id=event_id).exists()
+
+
+def reserve_seats(event_id, seats):
+    """Take ``seats`` if they are still free. Returns False when the event is full."""
+    if seats <= 0:
+        return True
+    updated = Event.objects.filter(_fits(seats), event_id=event_id).update(
+        seats_taken=F('seats_taken') + seats, updated_at=timezone.now()
+    )
+    if updated:
+        transaction.on_commit(cache.invalidate)
+    return bool(updated)
+
+
+def release_seats(event_id, seats):
+    if seats <= 0:
+        return
+    Event.objects.filter(event_id=event_id).update(
+        seats_taken=Greatest(F('seats_taken') - seats, Value(0)),
+        updated_at=timezone.now(),
+    )
+    transaction.on_commit(cache.invalidate)
+
+
+def promote_waitlist(event_id):
+    """Move waitlisted registrations into freed seats, first come first served. Returns their ids."""
+    from .models.Registration import Registration  # Registration imports this module
+
+    promoted = []
+    waitlist = (
+        Registration.objects.filter(event_id=event_id, waitlisted=True)
+        .order_by('registration_datetime', 'id')
+        .only('id', 'adult_guests', 'child_guests')
+    )
+    for registration in waitlist:
+        if not reserve_seats(event_id, registration.seats):
+            break
+        promoted.append(registration.pk)
+    if promoted:
+        Registration.objects.filter(pk__in=promoted).update(waitlisted=False)
+    return promoted
+
+
+def recount_seats(event_ids=None):
+    """Recompute the counters from the registrations, e.g. after a bulk import."""
+    from .models.Registration import Registration
+
+    seats = (
+        Registration.objects.filter(event=OuterRef('pk'), waitlisted=False)
+        .order_by()
+        .values('event')
+        .annotate(total=Sum(F('adult_guests') + F('child_guests') + 1))
+        .values('total')
+    )
+    events = Event.objects.all() if event_ids is None else Event.objects.filter(event_id__in=event_ids)
+    updated = events.update(seats_taken=Coalesce(Subquery(seats), Value(0)), updated_at=timezone.now())
+    transaction.on_commit(cache.invalidate)
+    return updated
@@ -0,0 +1,9 @@
+from rest_framework import serializers
+
+class ApprovalSerializer(serializers.Serializer):
+    approved = serializers.BooleanField(default=True)
+
+class BulkApprovalSerializer(ApprovalSerializer):
+    MAX_IDS = 1000
+
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=MAX_IDS)
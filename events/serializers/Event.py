@@ -3,15 +3,57 @@ from django.core.exceptions import ValidationError
 from django.utils.text import slugify
 from rest_framework.reverse import reverse
 from ..models.Event import Event
+from ..images import variant_urls
 
-class EventSerializer(serializers.ModelSerializer):
+class DynamicFieldsMixin:
+    """
+    Let clients pick fields with ``?fields=a,b`` or drop them with ``?omit=c``.
+
+    ``Meta.method_field_sources`` maps computed fields to the model columns
+    they read, so views can load only what will be rendered, see ``get_only_fields()``.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None:
+            return
+
+        fields = self._split(request.query_params.get('fields'))
+        omit = self._split(request.query_params.get('omit'))
+        if fields:
+            for name in set(self.fields) - fields:
+                self.fields.pop(name)
+        for name in omit & set(self.fields):
+            self.fields.pop(name)
+
+    @staticmethod
+    def _split(value):
+        return {name.strip() for name in value.split(',') if name.strip()} if value else set()
+
+    def get_only_fields(self, *always):
+        """Model columns needed to render the selected fields, for ``QuerySet.only()``."""
+        sources = getattr(self.Meta, 'method_field_sources', {})
+        columns = set(always) | {self.Meta.model._meta.pk.name}
+        for name, field in self.fields.items():
+            if name in sources:
+                columns.update(sources[name])
+            elif field.source != '*' and '.' not in field.source:
+                columns.add(field.source)
+        return sorted(columns)
+
+class EventSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     details = serializers.SerializerMethodField()
+    # From the counter on the event row, no per-row COUNT()
+    seats_remaining = serializers.IntegerField(read_only=True, allow_null=True)
+    media_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Event
         fields = [
             'event_id',
             'title',
+            'summary',
             'description',
             'start_time',
             'end_time',
@@ -20,9 +62,43 @@ class EventSerializer(serializers.ModelSerializer):
             'created_at',
             'updated_at',
             'media_file',
+            'media_variants',
+            'capacity',
+            'seats_remaining',
             'details'
         ]
+        method_field_sources = {
+            'details': ['event_id'],
+            'media_variants': ['media_file', 'media_file_rendered'],
+            'seats_remaining': ['capacity', 'seats_taken'],
+        }
 
     def get_details(self, obj):
-        request = self.context.get('request')
-        return reverse('event-detail', kwargs={'event_id': obj.event_id}, request=request)
\ No newline at end of file
+        # Reverse once and reuse it for every row of a list
+        if not hasattr(self, '_details_url'):
+            request = self.context.get('request')
+            self._details_url = reverse('event-detail', kwargs={'event_id': '__event_id__'}, request=request)
+        return self._details_url.replace('__event_id__', obj.event_id)
+
+    def get_media_variants(self, obj):
+        return variant_urls(obj.media_file, self.context.get('request'), obj.media_file_rendered)
+
+class EventListSerializer(EventSerializer):
+    """Compact shape for the event list: the plain-text summary instead of the description HTML."""
+
+    class Meta(EventSerializer.Meta):
+        fields = [
+            'event_id',
+            'title',
+            'summary',
+            'start_time',
+            'end_time',
+            'location',
+            'status',
+            'updated_at',
+            'media_file',
+            'media_variants',
+            'capacity',
+            'seats_remaining',
+            'details'
+        ]
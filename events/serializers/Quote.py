@@ -0,0 +1,10 @@
+from rest_framework import serializers
+
+class QuoteSerializer(serializers.Serializer):
+    adult_guests = serializers.IntegerField(min_value=0, max_value=1000, default=0)
+    child_guests = serializers.IntegerField(min_value=0, max_value=1000, default=0)
+
+class BatchQuoteSerializer(serializers.Serializer):
+    MAX_QUOTES = 100
+
+    quotes = QuoteSerializer(many=True, allow_empty=False, max_length=MAX_QUOTES)
@@ -1,10 +1,53 @@
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import serializers
 from ..models.Registration import Registration
+from ..images import open_image, variant_urls
+from ..uploads import IMAGE_TYPES, sniff
+from ..payments import get_accepted_providers
 
 class RegistrationSerializer(serializers.ModelSerializer):
+    profile_picture_variants = serializers.SerializerMethodField()
+
     class Meta:
         model = Registration
         fields = [
             'student_id', 'full_name', 'date_of_birth', 'batch', 'session', 'email', 'contact_number', 'whatsapp_number',
-            'adult_guests', 'child_guests', 'total_amount', 'payment_method', 'transaction_id', 'transaction_document', 'profile_picture', 'password', 'event'
-        ]
\ No newline at end of file
+            'adult_guests', 'child_guests', 'total_amount', 'payment_method', 'transaction_id', 'transaction_document', 'profile_picture', 'profile_picture_variants', 'password', 'event', 'waitlisted'
+        ]
+        # The event comes from the URL (see EventRegistrationView), waitlisted is set when it is full
+        read_only_fields = ['event', 'waitlisted']
+
+    def get_profile_picture_variants(self, obj):
+        return variant_urls(obj.profile_picture, self.context.get('request'), obj.profile_picture_rendered)
+
+    def check_image(self, value):
+        # Pixel count from the header only, before anything decodes the image
+        if sniff(value.read(16)) in IMAGE_TYPES:
+            value.seek(0)
+            try:
+                # Not closed, that would close the upload too
+                open_image(value)
+            except DjangoValidationError as e:
+                raise serializers.ValidationError(e.messages)
+        value.seek(0)
+        return value
+
+    def validate_password(self, value):
+        # Stored hashed, the model saves it as it is
+        return make_password(value)
+
+    def validate_profile_picture(self, value):
+        return self.check_image(value)
+
+    def validate_transaction_document(self, value):
+        return self.check_image(value)
+
+    def validate(self, attrs):
+        # The payment method has to be one the event accepts
+        event = attrs.get('event') or self.context.get('event')
+        payment_method = attrs.get('payment_method')
+        if event is not None and payment_method:
+            if payment_method not in get_accepted_providers(event.event_id):
+                raise serializers.ValidationError({'payment_method': f'"{payment_method}" is not a valid choice.'})
+        return attrs
@@ -0,0 +1,80 @@
+from django.db.models.signals import post_save, post_delete
+from django.db import transaction
+from django.dispatch import receiver
+from .models.Event import Event
+from .models.PaymentMethod import PaymentMethod
+from .models.Registration import Registration
+from .models.EventTombstone import EventTombstone
+from . import cache
+from .payments import invalidate_payment_methods
+from .pricing import invalidate_event_prices
+from .broker import publish_registration_status
+from . import search
+from .seats import promote_waitlist, release_seats
+from .storage import release_files
+
+# Cached copies are dropped once the change is committed. Dropped earlier, a request
+# in between could cache the old row again under the new generation
+
+@receiver([post_save, post_delete], sender=Event)
+def invalidate_event_cache(sender, **kwargs):
+    transaction.on_commit(cache.invalidate)
+
+@receiver(post_save, sender=Event)
+def update_search_index(sender, instance, **kwargs):
+    search.index_event(instance)
+
+@receiver(post_delete, sender=Event)
+def remove_from_search_index(sender, instance, **kwargs):
+    search.remove_event(instance.event_id)
+
+@receiver(post_delete, sender=Event)
+def record_event_deletion(sender, instance, **kwargs):
+    # For the change feed, see events/changes.py
+    EventTombstone.objects.create(event_id=instance.event_id)
+
+@receiver([post_save, post_delete], sender=PaymentMethod)
+def invalidate_payment_methods_cache(sender, instance, **kwargs):
+    event_id = instance.event_id
+    transaction.on_commit(lambda: invalidate_payment_methods(event_id))
+
+@receiver(post_delete, sender=Event)
+def drop_payment_methods_cache(sender, instance, **kwargs):
+    event_id = instance.event_id
+    transaction.on_commit(lambda: invalidate_payment_methods(event_id))
+
+@receiver([post_save, post_delete], sender=Event)
+def invalidate_event_prices_cache(sender, instance, **kwargs):
+    event_id = instance.event_id
+    transaction.on_commit(lambda: invalidate_event_prices(event_id))
+
+@receiver(post_save, sender=Event)
+def promote_waitlist_on_capacity_change(sender, instance, created, **kwargs):
+    # Runs before save() resets the loaded values, so the dirty fields are still those of this save
+    dirty = instance.get_dirty_fields()
+    if ('capacity' in dirty) if dirty is not None else not created:
+        with transaction.atomic():
+            promote_waitlist(instance.event_id)
+
+@receiver(post_save, sender=Registration)
+def push_registration_status(sender, instance, created, **kwargs):
+    # Wake up status streams once the change is visible to them
+    if not created:
+        transaction.on_commit(lambda: publish_registration_status(instance.pk, instance.approved))
+
+@receiver(post_delete, sender=Registration)
+def release_registration_seats(sender, instance, **kwargs):
+    # Runs inside the delete's transaction
+    event_id, seats = getattr(instance, '_held_seats', (instance.event_id, None))
+    if seats is None:
+        seats = instance.held_seats
+    if seats:
+        release_seats(event_id, seats)
+        promote_waitlist(event_id)
+
+
+@receiver(post_delete, sender=Event)
+@receiver(post_delete, sender=Registration)
+def release_stored_files(sender, instance, **kwargs):
+    # Files shared with other rows stay until their last reference goes
+    release_files(instance)
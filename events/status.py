@@ -0,0 +1,55 @@
+"""
+Event status from the clock.
+
+An event is ``upcoming`` before its start_time, ``ongoing`` until its
+end_time and ``completed`` after that. ``cancelled`` is set by hand and is
+never changed here. Event.save() derives the status. ``refresh_statuses()``
+moves events whose time has come, with one UPDATE per status, and is run
+periodically by ``python manage.py refresh_event_status``. The updates also
+set updated_at, so the change feed and the response caches notice.
+"""
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import cache
+
+STATUSES = ('upcoming', 'ongoing', 'completed', 'cancelled')
+# Statuses that follow the clock
+TIMED_STATUSES = ('upcoming', 'ongoing', 'completed')
+
+
+def derive_status(start_time, end_time, now=None):
+    now = now or timezone.now()
+    if start_time > now:
+        return 'upcoming'
+    if end_time > now:
+        return 'ongoing'
+    return 'completed'
+
+
+def status_conditions(now):
+    """{status: Q matching the events that should have it at ``now``}, mirrors derive_status()."""
+    return {
+        'upcoming': Q(start_time__gt=now),
+        'ongoing': Q(start_time__lte=now, end_time__gt=now),
+        'completed': Q(start_time__lte=now, end_time__lte=now),
+    }
+
+
+def refresh_statuses(now=None):
+    """Bring the status of every event up to date. Returns {status: events moved to it}."""
+    from .models.Event import Event  # Event.save() imports this module
+
+    now = now or timezone.now()
+    moved = {}
+    with transaction.atomic():
+        for status, condition in status_conditions(now).items():
+            moved[status] = (
+                Event.objects.filter(condition)
+                .exclude(status__in=[status, 'cancelled'])
+                .update(status=status, updated_at=now)
+            )
+        if any(moved.values()):
+            transaction.on_commit(cache.invalidate)
+    return moved
@@ -0,0 +1,214 @@
+"""
+Content-addressed media storage.
+
+Files saved into one of ``MEDIA_STORAGE['CONTENT_ADDRESSED_DIRS']`` are
+stored under the SHA-256 of their content, sharded into subdirectories:
+
+    profile_picture/3f/a2/3fa2...9e.jpg
+
+so no directory grows to hold every upload, names can't collide and
+identical uploads are stored once. The upload_to functions only pick the
+directory and the extension. A StoredFile row counts the file fields that
+point at each file; ``delete()`` drops one reference and the file goes with
+the last one. A name always stands for the same bytes, so its URL can be
+cached forever, see ``serve_media`` in views/Media.py.
+
+Names outside those directories (the image variants) are stored as
+FileSystemStorage would.
+"""
+import hashlib
+import os
+import posixpath
+import re
+import uuid
+from collections import Counter
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from django.utils import timezone
+
+DEFAULTS = {
+    'CONTENT_ADDRESSED_DIRS': ('event_media', 'profile_picture', 'transactions_documents'),
+    'SHARD_LEVELS': 2,
+    'CACHE_MAX_AGE': 365 * 24 * 60 * 60,
+    'RECOUNT_GRACE': 60 * 60,
+}
+
+CONTENT_ADDRESSED_RE = re.compile(r'^(?P<dir>[\w-]+)/(?:[0-9a-f]{2}/)*(?P<sha256>[0-9a-f]{64})(?:\.\w+)?$')
+
+
+def get_setting(name):
+    return getattr(settings, 'MEDIA_STORAGE', {}).get(name, DEFAULTS[name])
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_addressed_name(directory, sha256, extension=''):
+    shards = [sha256[i * 2:i * 2 + 2] for i in range(get_setting('SHARD_LEVELS'))]
+    return posixpath.join(directory, *shards, sha256 + extension.lower())
+
+
+def parse_name(name):
+    """The SHA-256 of a content-addressed name, or None for any other name."""
+    match = CONTENT_ADDRESSED_RE.match(name or '')
+    if match is None or match['dir'] not in get_setting('CONTENT_ADDRESSED_DIRS'):
+        return None
+    return match['sha256']
+
+
+def is_content_addressed(name):
+    return parse_name(name) is not None
+
+
+class ContentAddressedMixin:
+    """
+    Content addressing and reference counting on top of any storage class.
+    ``_write()`` stores new content, override it where the parent's
+    ``_save()`` can't be pointed at an existing name.
+    """
+
+    def is_content_addressed_dir(self, name):
+        return posixpath.dirname(name) in get_setting('CONTENT_ADDRESSED_DIRS')
+
+    def get_available_name(self, name, max_length=None):
+        # The final name comes from the content, don't probe for a free one
+        if self.is_content_addressed_dir(name):
+            return name
+        return super().get_available_name(name, max_length=max_length)
+
+    def _save(self, name, content):
+        if not self.is_content_addressed_dir(name):
+            return super()._save(name, content)
+
+        sha256 = content_hash(content)
+        name = content_addressed_name(posixpath.dirname(name), sha256, os.path.splitext(name)[1])
+        if self.retain(name):
+            return name
+        if not self.exists(name):
+            self._write(name, content)
+        from .models.StoredFile import StoredFile
+        try:
+            with transaction.atomic():
+                StoredFile.objects.create(name=name, sha256=sha256, size=content.size)
+        except IntegrityError:
+            # Stored by another request meanwhile
+            self.retain(name)
+        return name
+
+    def _write(self, name, content):
+        return super()._save(name, content)
+
+    def retain(self, name, count=1):
+        """Add references to an indexed file. Returns False when it isn't indexed."""
+        from .models.StoredFile import StoredFile
+        return bool(StoredFile.objects.filter(name=name).update(references=F('references') + count))
+
+    def release(self, name):
+        """Drop a reference. Returns True when it was the last one."""
+        from .models.StoredFile import StoredFile
+        StoredFile.objects.filter(name=name, references__gt=0).update(references=F('references') - 1)
+        deleted, _ = StoredFile.objects.filter(name=name, references=0).delete()
+        return bool(deleted)
+
+    def delete(self, name):
+        if not is_content_addressed(name):
+            return super().delete(name)
+        # Keep the file until the transaction that dropped the reference commits
+        if self.release(name):
+            transaction.on_commit(lambda: self.delete_unreferenced(name))
+
+    def delete_unreferenced(self, name):
+        from .images import delete_variants
+        from .models.StoredFile import StoredFile
+        # Unless it was uploaded again in the meantime
+        if not StoredFile.objects.filter(name=name).exists():
+            super().delete(name)
+            delete_variants(self, name)
+
+
+class ContentAddressedStorage(ContentAddressedMixin, FileSystemStorage):
+    """The default media storage, see STORAGES in settings.py."""
+
+    def _write(self, name, content):
+        # Write beside the target and move it into place: readers never see a
+        # partial file, and a concurrent upload of the same bytes just replaces it
+        temp_name = FileSystemStorage._save(self, posixpath.join(posixpath.dirname(name), f'.{uuid.uuid4().hex}.tmp'), content)
+        os.replace(self.path(temp_name), self.path(name))
+        return name
+
+
+def file_fields():
+    """(model, field) for every file field kept in content-addressed storage."""
+    for model in apps.get_models():
+        for field in model._meta.concrete_fields:
+            if isinstance(field, models.FileField) and isinstance(field.storage, ContentAddressedMixin):
+                yield model, field
+
+
+def release_files(instance):
+    """Drop the references held by the file fields of a deleted row."""
+    for field in instance._meta.concrete_fields:
+        if isinstance(field, models.FileField) and isinstance(field.storage, ContentAddressedMixin):
+            name = getattr(instance, field.attname).name
+            if is_content_addressed(name):
+                field.storage.delete(name)
+
+
+def recount_references():
+    """
+    Rebuild the reference counts from the file fields, e.g. after files
+    were replaced through the admin. Indexed files nothing points at any
+    more are deleted. Returns (files indexed, files deleted).
+
+    Safe to run next to the server: the StoredFile rows are locked before
+    the file fields are read, so a reference added meanwhile waits for the
+    recount, and files indexed in the last RECOUNT_GRACE seconds are left
+    alone, since the rows pointing at them may not have been committed yet.
+    """
+    from .models.StoredFile import StoredFile
+
+    with transaction.atomic():
+        settled_before = timezone.now() - timedelta(seconds=get_setting('RECOUNT_GRACE'))
+        indexed = dict(
+            StoredFile.objects.select_for_update().filter(created_at__lt=settled_before).values_list('name', 'references')
+        )
+
+        counts = Counter()
+        storages = {}
+        for model, field in file_fields():
+            for name in model._default_manager.values_list(field.attname, flat=True).iterator(chunk_size=2000):
+                if is_content_addressed(name):
+                    counts[name] += 1
+                    storages.setdefault(name, field.storage)
+
+        recent = set(StoredFile.objects.filter(created_at__gte=settled_before).values_list('name', flat=True))
+        for name, count in counts.items():
+            if name in recent:
+                continue
+            if name not in indexed:
+                storage = storages[name]
+                size = storage.size(name) if storage.exists(name) else 0
+                try:
+                    with transaction.atomic():
+                        StoredFile.objects.create(name=name, sha256=parse_name(name), size=size, references=count)
+                except IntegrityError:
+                    pass  # Indexed by an upload meanwhile, with its own count
+            elif indexed[name] != count:
+                StoredFile.objects.filter(name=name).update(references=count)
+
+        unreferenced = [name for name in indexed if name not in counts]
+        for i in range(0, len(unreferenced), 500):
+            StoredFile.objects.filter(name__in=unreferenced[i:i + 500]).delete()
+        if isinstance(default_storage, ContentAddressedMixin):
+            # Unless one was uploaded again before the commit
+            transaction.on_commit(lambda: [default_storage.delete_unreferenced(name) for name in unreferenced])
+    return len(counts), len(unreferenced)
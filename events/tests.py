@@ -1,3 +1,1048 @@
-from django.test import TestCase
+import asyncio
+import csv
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.core.files.storage import default_storage
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from openpyxl import load_workbook
+from PIL import Image
+
+from api.testing import QueryBudgetMixin
+
+from . import cache as event_cache, jobs, notifications
+from .approvals import set_approval
+from .broker import publish_registration_status
+from .models.Event import Event
+from .models.ImageJob import ImageJob
+from .models.Notification import Notification
+from .models.PaymentMethod import PaymentMethod
+from .models.Registration import Registration
+from .models.StoredFile import StoredFile
+from .serializers.Event import EventSerializer
+from .storage import is_content_addressed, recount_references
+from .tokens import make_status_token
+from .uploads import BoundedUploadHandler, RequestTooLarge
+
+
+def image_file(name='picture.png', size=(1200, 1600), color=(200, 10, 10)):
+    buffer = BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+def make_event(event_id='reunion', **kwargs):
+    now = timezone.now()
+    fields = {
+        'event_id': event_id,
+        'title': f'Event {event_id}',
+        'description': '<p>Annual <b>reunion</b></p>',
+        'start_time': now + timedelta(days=1),
+        'end_time': now + timedelta(days=2),
+        'location': 'Rajshahi',
+        'amount_per_person': 1000,
+        'amount_per_adult_guest': 500,
+        'amount_per_child_guest': 200,
+    }
+    fields.update(kwargs)
+    return Event.objects.create(**fields)
+
+
+def registration_data(student_id='1001', **kwargs):
+    fields = {
+        'student_id': student_id,
+        'full_name': 'Rahim Uddin',
+        'date_of_birth': '1995-01-01',
+        'batch': '22',
+        'session': '2020-21',
+        'email': f'{student_id}@example.com',
+        'contact_number': '01700000000',
+        'whatsapp_number': '01700000000',
+        'adult_guests': 1,
+        'child_guests': 1,
+        'payment_method': 'bkash',
+        'transaction_id': f'TX{student_id}',
+        'transaction_document': image_file('document.png', (50, 50), (10, 10, 10)),
+        'profile_picture': image_file(color=(200, 10, int(student_id) % 256)),
+        'password': 'secret-pass',
+    }
+    fields.update(kwargs)
+    return fields
+
+
+# Hashed once, the model stores the password as it is given
+PASSWORD_HASH = make_password('secret-pass')
+
+
+def make_registration(event, student_id='1001', **kwargs):
+    kwargs.setdefault('password', PASSWORD_HASH)
+    return Registration.objects.create(event=event, **registration_data(student_id, **kwargs))
+
+
+class ApiTestCase(QueryBudgetMixin, TestCase):
+    """Without the JSON line logged for every request."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.enterClassContext(mock.patch.object(logging.getLogger('api.requests'), 'disabled', True))
+        super().setUpClass()
+
+
+class MediaTestCase(ApiTestCase):
+    """Keeps uploads in a temporary MEDIA_ROOT."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.enterClassContext(override_settings(MEDIA_ROOT=cls.media_root))
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+
+class ImageJobTests(MediaTestCase):
+
+    def test_upload_enqueues_compression_in_the_same_transaction(self):
+        event = make_event()
+        with mock.patch('events.models.Registration.enqueue', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                make_registration(event)
+        self.assertFalse(Registration.objects.exists())
+
+        registration = make_registration(event)
+        job = ImageJob.objects.get()
+        self.assertEqual((job.object_id, job.operation, job.status), (str(registration.pk), 'compress', 'pending'))
+
+    def test_drain_compresses_then_cuts_variants(self):
+        registration = make_registration(make_event())
+        self.assertEqual(jobs.drain(), 2)
+
+        registration.refresh_from_db()
+        self.assertTrue(registration.profile_picture.name.endswith('.jpg'))
+        self.assertLessEqual(max(registration.profile_picture.width, registration.profile_picture.height), 1024)
+        self.assertEqual(
+            list(ImageJob.objects.order_by('pk').values_list('operation', 'status')),
+            [('compress', 'done'), ('variants', 'done')],
+        )
+
+    def test_compression_leaves_a_picture_replaced_meanwhile_alone(self):
+        registration = make_registration(make_event())
+        original = registration.profile_picture.name
+        replacement = default_storage.save('profile_picture/1001.png', image_file(color=(1, 1, 1)))
+        Registration.objects.filter(pk=registration.pk).update(profile_picture=replacement)
+
+        jobs.compress(registration, 'profile_picture')
+        self.assertEqual(Registration.objects.get(pk=registration.pk).profile_picture.name, replacement)
+        self.assertTrue(default_storage.exists(replacement))
+        # The compressed copy of the old picture isn't kept
+        self.assertFalse(StoredFile.objects.filter(name__endswith='.jpg').exists())
+        self.assertTrue(default_storage.exists(original))
+        self.assertFalse(ImageJob.objects.filter(operation='variants').exists())
+
+    def test_failed_job_is_retried_later_then_given_up(self):
+        registration = make_registration(make_event())
+        failing = mock.patch.dict(jobs.OPERATIONS, compress=mock.Mock(side_effect=OSError('broken')))
+        with failing, self.assertLogs('events.jobs', 'WARNING'):
+            self.assertEqual(jobs.drain(), 1)
+            job = ImageJob.objects.get()
+            self.assertEqual(job.status, 'pending')
+            self.assertGreater(job.run_after, timezone.now())
+
+            ImageJob.objects.update(run_after=timezone.now(), attempts=job.max_attempts - 1)
+            jobs.drain()
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('broken', job.last_error)
+        self.assertEqual(job.object_id, str(registration.pk))
+
+    def test_job_is_claimed_once(self):
+        make_registration(make_event())
+        job = jobs.claim()
+        self.assertEqual(job.status, 'processing')
+        self.assertIsNone(jobs.claim())
+
+
+class ImageVariantTests(MediaTestCase):
+
+    def test_variant_urls_follow_the_rendered_file_without_touching_storage(self):
+        event = make_event(media_file=image_file('cover.png', (800, 600)))
+
+        def serializer_urls():
+            return EventSerializer(Event.objects.get(pk=event.pk)).data['media_variants']
+
+        with mock.patch.object(default_storage, 'exists', side_effect=AssertionError('storage was asked')):
+            self.assertIn('/api/media/variants/thumbnail/webp/', serializer_urls()['sizes']['thumbnail']['webp'])
+        jobs.drain()
+        with mock.patch.object(default_storage, 'exists', side_effect=AssertionError('storage was asked')):
+            url = serializer_urls()['sizes']['thumbnail']['webp']
+        self.assertTrue(url.startswith('/media/variants/'))
+        self.assertTrue(default_storage.exists(url[len('/media/'):]))
+
+        # A new file starts over with the lazy endpoint
+        Event.objects.filter(pk=event.pk).update(media_file='event_media/other.png')
+        self.assertIn('/api/media/variants/', serializer_urls()['sizes']['full']['jpeg'])
+
+
+class EventCacheTests(ApiTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_list_is_served_from_cache_until_an_event_changes(self):
+        event = make_event()
+        with self.assertQueryBudget('event-list'):
+            first = self.client.get('/api/events/')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/events/')
+        self.assertEqual(first.content, second.content)
+
+        event.title = 'Renamed reunion'
+        with self.captureOnCommitCallbacks(execute=True):
+            event.save()
+        self.assertContains(self.client.get('/api/events/'), 'Renamed reunion')
+
+    def test_invalidated_only_once_the_change_is_committed(self):
+        event = make_event()
+        before = event_cache.generation()
+        with self.captureOnCommitCallbacks() as callbacks:
+            event.title = 'Renamed reunion'
+            event.save()
+            self.assertEqual(event_cache.generation(), before)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(event_cache.generation(), before)
+
+    def test_conditional_request_gets_304(self):
+        make_event()
+        response = self.client.get('/api/events/reunion/')
+        with self.assertNumQueries(0):
+            not_modified = self.client.get('/api/events/reunion/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+
+class PasswordTests(MediaTestCase):
+
+    def test_registration_hashes_the_raw_password_even_when_it_looks_hashed(self):
+        make_event()
+        raw = 'pbkdf2_sha256$870000$salt$notreallyahash='
+        response = self.client.post('/api/events/reunion/register/', registration_data(password=raw))
+        self.assertEqual(response.status_code, 201)
+
+        registration = Registration.objects.get()
+        self.assertNotEqual(registration.password, raw)
+        self.assertTrue(registration.check_password(raw))
+
+    def test_save_leaves_the_stored_hash_alone(self):
+        registration = make_registration(make_event())
+        registration.full_name = 'Karim Uddin'
+        registration.save()
+        registration.refresh_from_db()
+        self.assertEqual(registration.password, PASSWORD_HASH)
+        self.assertTrue(registration.check_password('secret-pass'))
+
+
+class NotificationTests(MediaTestCase):
+
+    def setUp(self):
+        event = make_event()
+        self.registrations = [make_registration(event, str(1001 + i)) for i in range(3)]
+
+    def test_set_approval_queues_one_email_per_changed_registration(self):
+        ids = [registration.pk for registration in self.registrations]
+        self.assertEqual(set_approval(ids[:2], True), ids[:2])
+        self.assertEqual(set_approval(ids, True), ids[2:])
+        self.assertEqual(Notification.objects.filter(kind='approved').count(), 3)
+
+        self.assertEqual(notifications.send_pending(), 3)
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ['1001@example.com', '1002@example.com', '1003@example.com'])
+        self.assertEqual(notifications.send_pending(), 0)
+
+    def test_failed_email_is_retried_after_a_delay_without_resending_the_rest(self):
+        set_approval([registration.pk for registration in self.registrations], True)
+        send = EmailBackend.send_messages
+
+        def flaky(backend, messages):
+            if messages[0].to == ['1002@example.com']:
+                raise OSError('mailbox unavailable')
+            return send(backend, messages)
+
+        with mock.patch.object(EmailBackend, 'send_messages', flaky), self.assertLogs('events.notifications', 'WARNING'):
+            self.assertEqual(notifications.send_pending(), 2)
+            # Not due yet
+            self.assertEqual(notifications.send_pending(), 0)
+        self.assertEqual(len(mail.outbox), 2)
+
+        failed = Notification.objects.get(status='pending')
+        self.assertEqual((failed.registration.email, failed.attempts), ('1002@example.com', 1))
+        self.assertIn('mailbox unavailable', failed.last_error)
+        self.assertGreater(failed.next_attempt_at, timezone.now())
+
+        Notification.objects.filter(pk=failed.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(notifications.send_pending(), 1)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertFalse(Notification.objects.exclude(status='sent').exists())
+
+
+    def test_concurrent_senders_claim_different_notifications(self):
+        set_approval([registration.pk for registration in self.registrations], True)
+        first = notifications.claim_batch(2)
+        second = notifications.claim_batch(2)
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(second), 1)
+        self.assertFalse({n.pk for n in first} & {n.pk for n in second})
+        self.assertEqual(notifications.claim_batch(2), [])
+        self.assertEqual(notifications.send_pending(), 0)
+
+        # A sender that died leaves its batch to the next one after the claim timeout
+        later = timezone.now() + timedelta(seconds=notifications.CLAIM_TIMEOUT + 1)
+        self.assertEqual(len(notifications.claim_batch(10, now=later)), 3)
+
+
+class ExportTests(MediaTestCase):
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('organizer', is_staff=True))
+        make_registration(make_event(), full_name='=HYPERLINK("http://evil","click")', batch='-22')
+
+    def test_csv_escapes_formulas(self):
+        response = self.client.get('/api/events/reunion/registrations/export/?file_format=csv')
+        rows = list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+        row = dict(zip(rows[0], rows[1]))
+        self.assertEqual(row['Full Name'], "'=HYPERLINK(\"http://evil\",\"click\")")
+        self.assertEqual(row['Batch'], "'-22")
+        self.assertEqual(row['Adult Guests'], '1')
+
+    def test_xlsx_stores_formulas_as_text(self):
+        response = self.client.get('/api/events/reunion/registrations/export/?file_format=xlsx')
+        sheet = load_workbook(BytesIO(b''.join(response.streaming_content))).active
+        header = [cell.value for cell in sheet[1]]
+        cell = sheet[2][header.index('Full Name')]
+        self.assertEqual(cell.data_type, 's')
+        self.assertEqual(cell.value, "'=HYPERLINK(\"http://evil\",\"click\")")
+
+
+class AdminSearchTests(MediaTestCase):
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+
+    def test_registrations_are_found_by_indexed_prefixes_and_exact_values(self):
+        make_registration(make_event(), full_name='Rahim Uddin', email='rahim@example.com', transaction_id='TX9')
+        for term in ('Rahim U', 'rahim', '100', 'RAHIM@example.com', 'TX9'):
+            self.assertContains(self.client.get('/admin/events/registration/', {'q': term}), '1001</a>', msg_prefix=term)
+        for term in ('Uddin', 'example.com', 'TX', 'Nobody'):
+            self.assertNotContains(self.client.get('/admin/events/registration/', {'q': term}), '1001</a>', msg_prefix=term)
+
+    def test_events_are_searched_through_the_full_text_index(self):
+        make_event('reunion', title='Silver Jubilee', description='<p>Annual <b>reunion</b> dinner</p>')
+        make_event('picnic', title='Picnic', description='<p>Lunch by the river</p>')
+        response = self.client.get('/admin/events/event/', {'q': 'dinner'})
+        self.assertContains(response, '/admin/events/event/reunion/change/')
+        self.assertNotContains(response, '/admin/events/event/picnic/change/')
+        self.assertContains(self.client.get('/admin/events/event/', {'q': 'picnic'}), '/admin/events/event/picnic/change/')
+        # HTML markup is not searchable
+        self.assertNotContains(self.client.get('/admin/events/event/', {'q': 'b'}), '/admin/events/event/reunion/change/')
+
+
+class EventSearchTests(ApiTestCase):
+
+    def test_search_ranks_title_matches_first(self):
+        make_event('in-description', title='Picnic', description='<p>After the reunion dinner</p>')
+        make_event('in-title', title='Silver Jubilee Reunion')
+        with self.assertQueryBudget('event-search'):
+            response = self.client.get('/api/events/search/', {'q': 'reunion'})
+        self.assertEqual([event['event_id'] for event in response.json()['results']], ['in-title', 'in-description'])
+
+    def test_search_counts_and_ranks_only_filtered_events(self):
+        now = timezone.now()
+        for i in range(4):
+            make_event(f'past-gala-{i}', title='Gala', start_time=now - timedelta(days=10 + i), end_time=now - timedelta(days=9))
+        make_event('gala-march', title='Gala', start_time=now + timedelta(days=30), end_time=now + timedelta(days=31))
+        make_event('gala-april', title='Gala', start_time=now + timedelta(days=60), end_time=now + timedelta(days=61))
+
+        response = self.client.get('/api/events/search/', {'q': 'gala', 'status': 'upcoming', 'page_size': 2})
+        self.assertEqual(response.json()['count'], 2)
+        self.assertEqual({event['event_id'] for event in response.json()['results']}, {'gala-march', 'gala-april'})
+
+        response = self.client.get('/api/events/search/', {
+            'q': 'gala', 'from': (now + timedelta(days=40)).date().isoformat(), 'to': (now + timedelta(days=90)).date().isoformat(),
+        })
+        self.assertEqual([event['event_id'] for event in response.json()['results']], ['gala-april'])
+        self.assertEqual(response.json()['count'], 1)
+
+    def test_collection_paths_are_reserved_event_ids(self):
+        for event_id in ('search', 'changes'):
+            event = Event(event_id=event_id, title='x', description='x', start_time=timezone.now(), end_time=timezone.now())
+            with self.assertRaises(ValidationError) as context:
+                event.full_clean()
+            self.assertIn('event_id', context.exception.message_dict)
+
+        self.assertEqual(Event.objects.create(title='Search', description='x', start_time=timezone.now(), end_time=timezone.now()).event_id, 'search-event')
+
+
+class WriteConcurrencyTests(TransactionTestCase):
+    """Registrations written from several threads at once, like concurrent requests."""
+
+    threads = 8
+    writes = 20
+
+    def write_registrations(self, capacity=None):
+        make_event('concurrency', capacity=capacity)
+        errors = []
+        start = threading.Barrier(self.threads)
+
+        def worker(number):
+            start.wait()
+            try:
+                for i in range(self.writes):
+                    student_id = f'c{number:03d}-{i:05d}'
+                    # Read, then write in one transaction, like a registration does
+                    with transaction.atomic():
+                        event = Event.objects.only(
+                            'event_id', 'amount_per_person', 'amount_per_adult_guest', 'amount_per_child_guest'
+                        ).get(pk='concurrency')
+                        Registration.objects.create(
+                            event=event, student_id=student_id, full_name='Concurrent Writer',
+                            date_of_birth='1995-01-01', batch='20', session='2015-16',
+                            email=f'{student_id}@example.com', contact_number='01700000000',
+                            whatsapp_number='01700000000', adult_guests=1, child_guests=0,
+                            payment_method='bkash', transaction_id=f'TX{student_id}', password=PASSWORD_HASH,
+                        )
+            except OperationalError as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=worker, args=(number,)) for number in range(self.threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return errors
+
+    def test_concurrent_writers_wait_instead_of_failing(self):
+        self.assertEqual(self.write_registrations(), [])
+        self.assertEqual(Registration.objects.count(), self.threads * self.writes)
+
+    def test_seats_are_never_oversold(self):
+        self.assertEqual(self.write_registrations(capacity=50), [])
+        registrations = Registration.objects.filter(event_id='concurrency')
+        held = sum(registration.seats for registration in registrations.filter(waitlisted=False))
+        self.assertEqual(Event.objects.get(pk='concurrency').seats_taken, held)
+        self.assertEqual(held, 50)
+        self.assertEqual(registrations.filter(waitlisted=True).count(), self.threads * self.writes - 25)
+
+
+class SeatTests(MediaTestCase):
+
+    def setUp(self):
+        # 3 seats per registration: the registrant, one adult and one child guest
+        self.event = make_event(capacity=4)
+        self.first = make_registration(self.event, '1001')
+        self.second = make_registration(self.event, '1002')
+
+    def seats_taken(self):
+        return Event.objects.values_list('seats_taken', flat=True).get(pk=self.event.pk)
+
+    def test_registration_that_does_not_fit_is_waitlisted(self):
+        self.assertEqual((self.first.waitlisted, self.second.waitlisted), (False, True))
+        self.assertEqual(self.seats_taken(), 3)
+
+    def test_deleting_a_registration_promotes_the_waitlist(self):
+        Registration.objects.get(pk=self.first.pk).delete()
+        self.assertFalse(Registration.objects.get(pk=self.second.pk).waitlisted)
+        self.assertEqual(self.seats_taken(), 3)
+
+    def test_raising_the_capacity_promotes_the_waitlist(self):
+        event = Event.objects.get(pk=self.event.pk)
+        event.capacity = 10
+        event.save()
+        self.assertFalse(Registration.objects.get(pk=self.second.pk).waitlisted)
+        self.assertEqual(self.seats_taken(), 6)
+
+    def test_more_guests_than_seats_left_is_a_form_error_in_the_admin(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        url = f'/admin/events/registration/{self.first.pk}/change/'
+        form = self.client.get(url).context['adminform'].form
+        data = {name: value for name, value in form.initial.items() if value is not None and name not in ('transaction_document', 'profile_picture')}
+        data.update(adult_guests=5, event=self.event.pk)
+
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Not enough seats left', str(response.context['adminform'].form.errors))
+        self.assertEqual(self.seats_taken(), 3)
+
+    def test_clean_rejects_extra_guests_that_do_not_fit(self):
+        registration = Registration.objects.get(pk=self.first.pk)
+        registration.adult_guests = 3
+        with self.assertRaises(ValidationError):
+            registration.clean()
+        registration.adult_guests = 0
+        registration.clean()
+        registration.save()
+        self.assertEqual(self.seats_taken(), 2)
+
+
+class StorageTests(MediaTestCase):
+
+    def test_identical_uploads_are_stored_once_and_deleted_with_the_last_reference(self):
+        event = make_event()
+        first = make_registration(event, '1001', profile_picture=image_file(color=(1, 2, 3)))
+        second = make_registration(event, '1002', profile_picture=image_file(color=(1, 2, 3)))
+        name = first.profile_picture.name
+        self.assertEqual(second.profile_picture.name, name)
+        self.assertTrue(is_content_addressed(name))
+        self.assertEqual(StoredFile.objects.get(name=name).references, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(default_storage.exists(name))
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(StoredFile.objects.filter(name=name).exists())
+
+    def test_recount_fixes_counts_and_deletes_settled_unreferenced_files(self):
+        registration = make_registration(make_event())
+        picture = registration.profile_picture.name
+        orphan = default_storage.save('profile_picture/orphan.png', image_file('orphan.png', color=(9, 9, 9)))
+        StoredFile.objects.filter(name=picture).update(references=5)
+        StoredFile.objects.update(created_at=timezone.now() - timedelta(days=1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(recount_references(), (2, 1))
+        self.assertEqual(StoredFile.objects.get(name=picture).references, 1)
+        self.assertFalse(default_storage.exists(orphan))
+
+    def test_recount_leaves_files_indexed_during_the_grace_period(self):
+        # Stored by an upload whose row isn't committed yet
+        name = default_storage.save('profile_picture/upload.png', image_file('upload.png', color=(8, 8, 8)))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(recount_references(), (0, 0))
+        self.assertTrue(default_storage.exists(name))
+        self.assertTrue(StoredFile.objects.filter(name=name).exists())
+
+
+class EventRenameTests(MediaTestCase):
+
+    def test_new_event_id_moves_the_event_and_keeps_its_history(self):
+        event = make_event(capacity=10)
+        registration = make_registration(event)
+        created_at = timezone.now() - timedelta(days=30)
+        Event.objects.filter(pk='reunion').update(created_at=created_at)
+
+        event = Event.objects.get(pk='reunion')
+        event.event_id = 'reunion-2025'
+        with self.captureOnCommitCallbacks(execute=True):
+            event.save()
+
+        self.assertFalse(Event.objects.filter(pk='reunion').exists())
+        renamed = Event.objects.get(pk='reunion-2025')
+        self.assertEqual(renamed.created_at, created_at)
+        self.assertEqual(event.created_at, created_at)
+        self.assertEqual(renamed.seats_taken, 3)
+        self.assertEqual(Registration.objects.get(pk=registration.pk).event_id, 'reunion-2025')
+
+    @override_settings(MEDIA_STORAGE={**settings.MEDIA_STORAGE, 'CONTENT_ADDRESSED_DIRS': ()})
+    def test_media_file_named_after_the_old_event_id_is_relocated(self):
+        make_event('reunion-2025')
+        old_name = default_storage.save('event_media/reunion.png', image_file('reunion.png'))
+        updated_at = timezone.now() - timedelta(days=1)
+        Event.objects.filter(pk='reunion-2025').update(media_file=old_name, updated_at=updated_at)
+        generation = event_cache.generation()
+
+        event = Event.objects.get(pk='reunion-2025')
+        with self.captureOnCommitCallbacks(execute=True):
+            event.relocate_media_file('reunion')
+
+        relocated = Event.objects.get(pk='reunion-2025')
+        self.assertTrue(os.path.basename(relocated.media_file.name).startswith('reunion-2025'))
+        self.assertFalse(default_storage.exists(old_name))
+        self.assertGreater(relocated.updated_at, updated_at)
+        self.assertEqual(event.get_dirty_fields(), set())
+        self.assertGreater(event_cache.generation(), generation)
+
+
+@override_settings(CHANGE_FEED={'SETTLE_SECONDS': 0})
+class ChangeFeedTests(ApiTestCase):
+
+    def get_changes(self, **params):
+        response = self.client.get('/api/events/changes/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_cursor_returns_only_what_changed_since(self):
+        make_event('reunion')
+        make_event('picnic')
+        first = self.get_changes()
+        self.assertEqual([change['event_id'] for change in first['results']], ['reunion', 'picnic'])
+
+        Event.objects.get(pk='reunion').delete()
+        make_event('seminar')
+        second = self.get_changes(cursor=first['cursor'])
+        self.assertEqual(
+            [(change['op'], change['event_id']) for change in second['results']],
+            [('delete', 'reunion'), ('upsert', 'seminar')],
+        )
+        self.assertEqual(self.get_changes(cursor=second['cursor'])['results'], [])
+
+    def test_limit_pages_through_the_changes(self):
+        for event_id in ('a', 'b', 'c'):
+            make_event(event_id)
+        page = self.get_changes(limit=2)
+        self.assertTrue(page['has_more'])
+        rest = self.get_changes(cursor=page['cursor'], limit=2)
+        self.assertEqual([change['event_id'] for change in rest['results']], ['c'])
+        self.assertFalse(rest['has_more'])
+
+    def test_invalid_positions_are_bad_requests(self):
+        for params, field in (
+            ({'cursor': 'not-a-cursor'}, 'cursor'),
+            ({'since': 'yesterday'}, 'since'),
+            ({'since': '2020-13-01T00:00:00'}, 'since'),
+        ):
+            response = self.client.get('/api/events/changes/', params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn(field, response.json())
+
+    def test_expired_position_is_gone(self):
+        since = (timezone.now() - timedelta(days=365)).isoformat()
+        self.assertEqual(self.client.get('/api/events/changes/', {'since': since}).status_code, 410)
+
+
+class EventStatusTests(ApiTestCase):
+
+    def test_status_is_saved_with_explicit_update_fields(self):
+        event = make_event()
+        event.start_time = timezone.now() - timedelta(hours=1)
+        event.save(update_fields=['start_time'])
+        self.assertEqual(Event.objects.get(pk=event.pk).status, 'ongoing')
+
+    def test_cancelled_events_keep_their_status(self):
+        event = make_event(status='cancelled')
+        event.end_time = timezone.now() - timedelta(hours=1)
+        event.save(update_fields=['end_time'])
+        self.assertEqual(Event.objects.get(pk=event.pk).status, 'cancelled')
+
+    def test_list_filters_by_several_statuses_in_start_time_order(self):
+        now = timezone.now()
+        make_event('later', start_time=now + timedelta(days=3), end_time=now + timedelta(days=4))
+        make_event('now', start_time=now - timedelta(hours=1), end_time=now + timedelta(hours=1))
+        make_event('past', start_time=now - timedelta(days=2), end_time=now - timedelta(days=1))
+        make_event('soon', start_time=now + timedelta(days=1), end_time=now + timedelta(days=2))
+
+        response = self.client.get('/api/events/', {'status': 'upcoming,ongoing'})
+        self.assertEqual([event['event_id'] for event in response.json()['results']], ['now', 'soon', 'later'])
+        self.assertEqual(self.client.get('/api/events/', {'status': 'finished'}).status_code, 400)
+
+
+class PaymentMethodTests(MediaTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.event = make_event()
+
+    def register(self, payment_method, student_id='1001'):
+        return self.client.post('/api/events/reunion/register/', registration_data(student_id, payment_method=payment_method))
+
+    def test_events_without_payment_methods_accept_the_default_providers(self):
+        self.assertEqual(self.register('bkash').status_code, 201)
+        self.assertEqual(self.register('paypal', '1002').status_code, 400)
+
+    def test_only_active_providers_are_accepted(self):
+        PaymentMethod.objects.create(event=self.event, provider='nagad', account_number='01800000000')
+        PaymentMethod.objects.create(event=self.event, provider='bkash', account_number='01700000000', is_active=False)
+
+        for provider in ('bkash', 'paypal'):
+            response = self.register(provider)
+            self.assertEqual(response.status_code, 400, provider)
+            self.assertIn('payment_method', response.json())
+        self.assertEqual(self.register('nagad').status_code, 201)
+
+    def test_deactivating_every_method_does_not_bring_back_the_defaults(self):
+        method = PaymentMethod.objects.create(event=self.event, provider='bkash', account_number='01700000000')
+        method.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            method.save()
+        self.assertEqual(self.register('bkash').status_code, 400)
+
+
+class PaymentMethodMigrationTests(TransactionTestCase):
+
+    def setUp(self):
+        self.executor = MigrationExecutor(connection)
+        self.executor.migrate([('events', '0008_event_summary')])
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes('events'))
+
+    def test_legacy_columns_become_payment_methods(self):
+        Event = self.executor.loader.project_state([('events', '0008_event_summary')]).apps.get_model('events', 'Event')
+        now = timezone.now()
+        Event.objects.create(
+            event_id='reunion', title='Reunion', description='x', start_time=now, end_time=now, location='Rajshahi',
+            bkash_account_number='01700000000', bkash_payment_option='send money',
+            bank_name='Sonali Bank', bank_account_number='0123456789',
+        )
+
+        executor = MigrationExecutor(connection)
+        executor.migrate([('events', '0009_paymentmethod')])
+        PaymentMethod = executor.loader.project_state([('events', '0009_paymentmethod')]).apps.get_model('events', 'PaymentMethod')
+        methods = {method.provider: method for method in PaymentMethod.objects.filter(event_id='reunion')}
+        self.assertEqual(set(methods), {'bkash', 'bank'})
+        self.assertEqual((methods['bkash'].account_number, methods['bkash'].payment_option), ('01700000000', 'send money'))
+        self.assertEqual((methods['bank'].bank_name, methods['bank'].account_number), ('Sonali Bank', '0123456789'))
+
+
+class ImportTests(MediaTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.event = make_event()
+        self.document = default_storage.save('transactions_documents/1001.png', image_file('1001.png', (50, 50)))
+        self.picture = default_storage.save('profile_picture/1001.png', image_file('1001.png'))
+
+    def row(self, student_id='1001', **kwargs):
+        fields = registration_data(student_id, transaction_document=self.document, profile_picture=self.picture, event='reunion')
+        fields.update(kwargs)
+        return fields
+
+    def import_rows(self, *rows, dry_run=False):
+        path = os.path.join(self.media_root, 'registrations.csv')
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        stdout, stderr = StringIO(), StringIO()
+        args = ['--dry-run'] if dry_run else []
+        try:
+            call_command('import_registrations', path, *args, stdout=stdout, stderr=stderr)
+        except CommandError:
+            pass
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_dry_run_only_validates(self):
+        out, err = self.import_rows(self.row('1001'), self.row('1002'), dry_run=True)
+        self.assertIn('2 row(s) are valid', out)
+        self.assertEqual(err, '')
+        self.assertFalse(Registration.objects.exists())
+
+    def test_invalid_rows_are_reported_by_number_and_nothing_is_written(self):
+        out, err = self.import_rows(
+            self.row('1001'),
+            self.row('1002', payment_method='paypal'),
+            self.row('1003', profile_picture='', transaction_document='transactions_documents/missing.png'),
+        )
+        self.assertIn('Row 2: payment_method: "paypal" is not a valid choice.', err)
+        self.assertIn('Row 3: profile_picture: This field cannot be blank.', err)
+        self.assertIn('Row 3: transaction_document: File "transactions_documents/missing.png" does not exist.', err)
+        self.assertNotIn('Row 1:', err)
+        self.assertFalse(Registration.objects.exists())
+
+    def test_existing_registration_is_updated_by_student_id(self):
+        make_registration(self.event, '1001', adult_guests=0, child_guests=0)
+        out, err = self.import_rows(self.row('1001', full_name='Karim Uddin', adult_guests=2, child_guests=0), self.row('1002'))
+        self.assertIn('Imported 1 new and 1 updated', out)
+
+        registration = Registration.objects.get(student_id='1001')
+        self.assertEqual((registration.full_name, registration.adult_guests), ('Karim Uddin', 2))
+        self.assertEqual(registration.total_amount, 2000)
+        self.assertTrue(registration.check_password('secret-pass'))
+        self.assertEqual(Registration.objects.count(), 2)
+
+    def test_seats_are_taken_in_row_order_and_the_rest_is_waitlisted(self):
+        Event.objects.filter(pk='reunion').update(capacity=4)
+        out, err = self.import_rows(
+            self.row('1001'),
+            self.row('1002'),
+            self.row('1003', adult_guests=0, child_guests=0),
+        )
+        self.assertIn('Imported 3 new', out)
+        waitlisted = dict(Registration.objects.values_list('student_id', 'waitlisted'))
+        self.assertEqual(waitlisted, {'1001': False, '1002': True, '1003': False})
+        self.assertEqual(Event.objects.get(pk='reunion').seats_taken, 4)
+
+    def test_updated_guests_that_do_not_fit_are_rejected(self):
+        Event.objects.filter(pk='reunion').update(capacity=3)
+        make_registration(self.event, '1001', adult_guests=0, child_guests=0)
+        out, err = self.import_rows(self.row('1001', adult_guests=5))
+        self.assertIn('Row 1: adult_guests: Not enough seats left', err)
+        self.assertEqual(Registration.objects.get().adult_guests, 0)
+        self.assertEqual(Event.objects.get(pk='reunion').seats_taken, 1)
+
+
+class UploadTests(MediaTestCase):
+
+    def setUp(self):
+        cache.clear()
+        make_event()
+
+    def register(self, **kwargs):
+        return self.client.post('/api/events/reunion/register/', registration_data(**kwargs))
+
+    @override_settings(REGISTRATION_UPLOADS={'MAX_REQUEST_BYTES': 4096})
+    def test_body_over_the_request_cap_is_rejected_with_413(self):
+        self.assertEqual(self.register().status_code, 413)
+        self.assertFalse(Registration.objects.exists())
+
+    @override_settings(REGISTRATION_UPLOADS={'MAX_REQUEST_BYTES': 4096})
+    def test_file_bytes_count_against_the_request_cap_without_a_content_length(self):
+        handler = BoundedUploadHandler()
+        head = b'\x89PNG\r\n\x1a\n' + b'\0' * 2040
+        handler.new_file('profile_picture', 'a.png', 'image/png', None)
+        handler.receive_data_chunk(head, 0)
+        handler.new_file('transaction_document', 'b.png', 'image/png', None)
+        handler.receive_data_chunk(head, 0)
+        with self.assertRaises(RequestTooLarge):
+            handler.receive_data_chunk(b'\0' * 100, len(head))
+
+    @override_settings(REGISTRATION_UPLOADS={'MAX_BYTES': {'profile_picture': 1024}})
+    def test_file_over_its_field_limit_is_rejected(self):
+        response = self.register()
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('File too large', response.json()['profile_picture'][0])
+
+    def test_file_type_is_sniffed_from_its_content(self):
+        fake = SimpleUploadedFile('picture.png', b'<?php echo "hi"; ?>', content_type='image/png')
+        response = self.register(profile_picture=fake)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Unsupported file type', response.json()['profile_picture'][0])
+
+        # PDFs are allowed for the transaction document only
+        def pdf():
+            return SimpleUploadedFile('document.pdf', b'%PDF-1.4\n%%EOF\n', content_type='application/pdf')
+        self.assertIn('Unsupported file type', self.register(profile_picture=pdf()).json()['profile_picture'][0])
+        self.assertEqual(self.register(transaction_document=pdf()).status_code, 201)
+
+    @override_settings(REGISTRATION_UPLOADS={'MAX_IMAGE_PIXELS': 1000})
+    def test_image_with_too_many_pixels_is_rejected_before_decoding(self):
+        with mock.patch('PIL.ImageFile.ImageFile.load') as load:
+            response = self.register()
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('too large', response.json()['profile_picture'][0])
+        load.assert_not_called()
+
+
+class RegistrationCheckTests(MediaTestCase):
+
+    def setUp(self):
+        cache.clear()
+        make_registration(make_event())
+
+    def check(self, password, remote_addr='127.0.0.1'):
+        return self.client.post('/api/events/registrations/check/', {'student_id': '1001', 'password': password}, REMOTE_ADDR=remote_addr)
+
+    def test_too_many_failures_are_rate_limited(self):
+        for _ in range(5):
+            self.assertEqual(self.check('wrong').status_code, 400)
+        # Even the right password, until the window passes
+        self.assertEqual(self.check('secret-pass').status_code, 429)
+        self.assertEqual(self.check('secret-pass', '203.0.113.7').status_code, 429)
+
+    def test_success_resets_the_student_id_count(self):
+        for i in range(4):
+            self.check('wrong', f'10.0.0.{i}')
+        self.assertEqual(self.check('secret-pass', '10.0.1.1').status_code, 200)
+        for i in range(4):
+            self.assertEqual(self.check('wrong', f'10.0.2.{i}').status_code, 400)
+        self.check('wrong', '10.0.3.1')
+        self.assertEqual(self.check('secret-pass', '10.0.3.2').status_code, 429)
+
+    def test_status_token_from_a_successful_check(self):
+        token = self.check('secret-pass').json()['status_token']
+        response = self.client.get('/api/events/registrations/status/', HTTP_X_STATUS_TOKEN=token)
+        self.assertEqual(response.json(), {'approved': False, 'waitlisted': False, 'event': 'Event reunion'})
+
+        tampered = token[:-1] + ('A' if token[-1] != 'A' else 'B')
+        self.assertEqual(self.client.get('/api/events/registrations/status/', {'token': tampered}).status_code, 401)
+
+        expired = time.time() + settings.REGISTRATION_STATUS_TOKEN_MAX_AGE + 1
+        with mock.patch('django.core.signing.time.time', return_value=expired):
+            response = self.client.get('/api/events/registrations/status/', HTTP_X_STATUS_TOKEN=token)
+        self.assertEqual(response.status_code, 401)
+
+
+class AsyncViewTests(MediaTestCase):
+    """The async endpoints answer exactly like their sync counterparts."""
+
+    def setUp(self):
+        cache.clear()
+        make_registration(make_event())
+        make_event('picnic', title='Picnic')
+
+    def assertSameResponse(self, path, method='get', **kwargs):
+        sync = getattr(self.client, method)(f'/api/events/{path}', **kwargs)
+        cache.clear()
+        asynchronous = getattr(self.client, method)(f'/api/async/events/{path}', **kwargs)
+        self.assertEqual(asynchronous.status_code, sync.status_code, path)
+        # Page links point back at the endpoint that was called
+        self.assertEqual(json.loads(asynchronous.content.replace(b'/api/async/events/', b'/api/events/')), sync.json(), path)
+        return asynchronous
+
+    def test_list_and_detail(self):
+        self.assertSameResponse('', data={'page_size': 1})
+        self.assertSameResponse('', data={'status': 'upcoming', 'view': 'full'})
+        self.assertSameResponse('', data={'status': 'someday'})
+        self.assertSameResponse('reunion/')
+        self.assertSameResponse('missing/')
+
+    def test_quote(self):
+        self.assertEqual(self.assertSameResponse('reunion/calculate_total_amount/', data={'adult_guests': 2, 'child_guests': 1}).json(), {'total_amount': 2200})
+        self.assertSameResponse('reunion/calculate_total_amount/', data={'adult_guests': -1})
+        self.assertSameResponse('missing/calculate_total_amount/')
+
+    def test_check(self):
+        check = 'registrations/check/'
+        response = self.client.post(f'/api/async/events/{check}', {'student_id': '1001', 'password': 'secret-pass'}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['event'], 'Event reunion')
+        for body in ('[]', '"x"'):
+            self.assertSameResponse(check, method='post', data=body, content_type='application/json')
+        response = self.client.post(f'/api/async/events/{check}', 'not json', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class CursorPaginationTests(ApiTestCase):
+
+    def setUp(self):
+        cache.clear()
+        start = timezone.now() + timedelta(days=1)
+        # Three events share a start_time, event_id breaks the tie
+        for event_id, days in (('c', 0), ('a', 0), ('b', 0), ('d', 1), ('e', 2)):
+            make_event(event_id, start_time=start + timedelta(days=days), end_time=start + timedelta(days=days + 1))
+
+    def ids(self, response):
+        return [event['event_id'] for event in response.json()['results']]
+
+    def test_next_and_previous_links_walk_the_list_without_gaps(self):
+        response = self.client.get('/api/events/', {'pagination': 'cursor', 'page_size': 2})
+        pages = [self.ids(response)]
+        self.assertIsNone(response.json()['previous'])
+        while response.json()['next']:
+            response = self.client.get(response.json()['next'])
+            pages.append(self.ids(response))
+        self.assertEqual(pages, [['a', 'b'], ['c', 'd'], ['e']])
+
+        response = self.client.get(response.json()['previous'])
+        self.assertEqual(self.ids(response), ['c', 'd'])
+        response = self.client.get(response.json()['previous'])
+        self.assertEqual(self.ids(response), ['a', 'b'])
+        self.assertIsNone(response.json()['previous'])
+
+    def test_pages_stay_stable_when_events_are_added_before_the_cursor(self):
+        first = self.client.get('/api/events/', {'pagination': 'cursor', 'page_size': 2})
+        make_event('0-early', start_time=timezone.now(), end_time=timezone.now() + timedelta(hours=1))
+        cache.clear()
+        self.assertEqual(self.ids(self.client.get(first.json()['next'])), ['c', 'd'])
+
+    def test_malformed_cursor(self):
+        self.assertEqual(self.client.get('/api/events/', {'cursor': 'garbage'}).status_code, 404)
+
+
+class FieldSelectionTests(ApiTestCase):
+
+    def setUp(self):
+        cache.clear()
+        make_event()
+
+    def select_sql(self, path, params):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(path, params)
+        select = next(query['sql'] for query in context.captured_queries if 'FROM "events_event"' in query['sql'] and 'COUNT' not in query['sql'])
+        return response, select.split(' FROM ')[0]
+
+    def test_fields_limits_the_output_and_the_columns_read(self):
+        response, columns = self.select_sql('/api/events/', {'fields': 'event_id,title'})
+        self.assertEqual(set(response.json()['results'][0]), {'event_id', 'title'})
+        self.assertIn('"title"', columns)
+        for column in ('"description"', '"location"', '"media_file"', '"summary"'):
+            self.assertNotIn(column, columns)
+
+    def test_omit_drops_fields_and_their_columns(self):
+        response, columns = self.select_sql('/api/events/reunion/', {'omit': 'description,media_variants'})
+        self.assertNotIn('description', response.json())
+        self.assertNotIn('media_variants', response.json())
+        self.assertIn('title', response.json())
+        self.assertNotIn('"description"', columns)
+        self.assertNotIn('"media_file_rendered"', columns)
+
+    def test_method_fields_read_their_sources(self):
+        response, columns = self.select_sql('/api/events/reunion/', {'fields': 'seats_remaining'})
+        self.assertEqual(response.json(), {'seats_remaining': None})
+        self.assertIn('"capacity"', columns)
+        self.assertIn('"seats_taken"', columns)
+
+
+class StatusStreamTests(MediaTestCase):
+
+    def setUp(self):
+        self.registration = make_registration(make_event())
+        self.token = make_status_token(self.registration)
+
+    def publish_soon(self, approved, delay=0.05):
+        async def publish():
+            await asyncio.sleep(delay)
+            publish_registration_status(self.registration.pk, approved)
+        return asyncio.create_task(publish())
+
+    async def test_long_poll_returns_when_a_change_is_published(self):
+        publisher = self.publish_soon(True)
+        started = time.monotonic()
+        response = await self.async_client.get(
+            '/api/events/registrations/status/wait/', {'token': self.token, 'approved': 'false', 'timeout': 5}
+        )
+        await publisher
+        self.assertEqual(json.loads(response.content), {'approved': True})
+        self.assertLess(time.monotonic() - started, 4)
+
+    async def test_long_poll_answers_at_once_when_the_client_is_behind(self):
+        response = await self.async_client.get('/api/events/registrations/status/wait/', {'token': self.token, 'approved': 'true'})
+        self.assertEqual(json.loads(response.content), {'approved': False})
+
+    async def test_long_poll_times_out_with_the_current_state(self):
+        response = await self.async_client.get(
+            '/api/events/registrations/status/wait/', {'token': self.token, 'approved': 'false', 'timeout': 0.05}
+        )
+        self.assertEqual(json.loads(response.content), {'approved': False})
+
+    async def test_stream_sends_the_status_then_every_change(self):
+        response = await self.async_client.get('/api/events/registrations/status/stream/', {'token': self.token})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        publisher = self.publish_soon(True)
+        chunks = [chunk.decode() async for chunk in response.streaming_content]
+        await publisher
+        events = [chunk for chunk in chunks if chunk.startswith('event:')]
+        self.assertEqual(events, [
+            'event: status\ndata: {"approved": false}\n\n',
+            'event: status\ndata: {"approved": true}\n\n',
+        ])
+
+    async def test_invalid_token_is_rejected(self):
+        for path in ('stream', 'wait'):
+            response = await self.async_client.get(f'/api/events/registrations/status/{path}/', {'token': 'forged'})
+            self.assertEqual(response.status_code, 401)
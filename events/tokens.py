@@ -0,0 +1,24 @@
+"""
+Signed, short-lived registration status tokens.
+
+A successful password check (or the registration itself) hands out a token
+so later status polls only need an HMAC check instead of a PBKDF2 hash.
+"""
+from django.conf import settings
+from django.core import signing
+
+STATUS_TOKEN_SALT = 'events.registration-status'
+
+
+def make_status_token(registration):
+    return signing.dumps({'r': registration.pk}, salt=STATUS_TOKEN_SALT, compress=False)
+
+
+def read_status_token(token):
+    """The registration pk of a valid, unexpired token, otherwise None."""
+    max_age = getattr(settings, 'REGISTRATION_STATUS_TOKEN_MAX_AGE', 60 * 60)
+    try:
+        payload = signing.loads(token, salt=STATUS_TOKEN_SALT, max_age=max_age)
+    except signing.BadSignature:
+        return None
+    return payload.get('r') if isinstance(payload, dict) else None
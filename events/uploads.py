@@ -0,0 +1,114 @@
+"""
+Size-bounded, type-checked registration uploads.
+
+BoundedMultiPartParser streams every uploaded file to a temporary file through
+BoundedUploadHandler, which stops reading a file once it passes its field's
+byte cap or when its first bytes aren't one of the field's allowed types.
+Rejected files are skipped and reported in ``request.upload_errors``. Memory
+use per request stays at one upload chunk, whatever is sent. The whole body
+is capped by its Content-Length, and by counting the file bytes received
+when it is sent without one.
+"""
+from django.conf import settings
+from django.core.files.uploadhandler import SkipFile, TemporaryFileUploadHandler
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.parsers import MultiPartParser
+
+MB = 1024 * 1024
+
+# Leading bytes of each accepted type
+SIGNATURES = {
+    'jpeg': [b'\xff\xd8\xff'],
+    'png': [b'\x89PNG\r\n\x1a\n'],
+    'gif': [b'GIF87a', b'GIF89a'],
+    'webp': [b'RIFF'],  # Followed by the size and 'WEBP', checked in sniff()
+    'pdf': [b'%PDF-'],
+}
+IMAGE_TYPES = ['jpeg', 'png', 'gif', 'webp']
+
+
+def get_upload_limits():
+    limits = {
+        'MAX_BYTES': {
+            'profile_picture': 5 * MB,
+            'transaction_document': 10 * MB,
+        },
+        'DEFAULT_MAX_BYTES': 5 * MB,
+        'ALLOWED_TYPES': {
+            'profile_picture': IMAGE_TYPES,
+            'transaction_document': IMAGE_TYPES + ['pdf'],
+        },
+        'MAX_REQUEST_BYTES': 20 * MB,
+    }
+    limits.update(getattr(settings, 'REGISTRATION_UPLOADS', {}))
+    return limits
+
+
+def sniff(head):
+    """The type of a file from its first bytes, or None if it isn't one we know."""
+    for kind, signatures in SIGNATURES.items():
+        if any(head.startswith(signature) for signature in signatures):
+            if kind == 'webp' and head[8:12] != b'WEBP':
+                continue
+            return kind
+    return None
+
+
+class RequestTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Request body too large.'
+    default_code = 'request_too_large'
+
+
+class BoundedUploadHandler(TemporaryFileUploadHandler):
+    """Stream files to disk, enforcing per-field byte caps and allowed types."""
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.limits = get_upload_limits()
+        # Across every file of the request, a chunked body has no Content-Length to check up front
+        self.request_received = 0
+        if request is not None and not hasattr(request, 'upload_errors'):
+            request.upload_errors = {}
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.max_bytes = self.limits['MAX_BYTES'].get(field_name, self.limits['DEFAULT_MAX_BYTES'])
+        self.allowed_types = self.limits['ALLOWED_TYPES'].get(field_name, IMAGE_TYPES)
+        self.received = 0
+
+    def reject(self, message):
+        if self.request is not None:
+            self.request.upload_errors[self.field_name] = [message]
+        raise SkipFile()
+
+    def receive_data_chunk(self, raw_data, start):
+        if start == 0 and sniff(raw_data[:16]) not in self.allowed_types:
+            allowed = ', '.join(kind.upper() for kind in self.allowed_types)
+            self.reject(f"Unsupported file type. Allowed: {allowed}.")
+
+        self.request_received += len(raw_data)
+        if self.request_received > self.limits['MAX_REQUEST_BYTES']:
+            raise RequestTooLarge()
+        self.received += len(raw_data)
+        if self.received > self.max_bytes:
+            self.reject(f"File too large, the limit is {self.max_bytes // MB} MB.")
+        return super().receive_data_chunk(raw_data, start)
+
+
+class BoundedMultiPartParser(MultiPartParser):
+    """MultiPartParser that only uses BoundedUploadHandler and caps the whole body."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = parser_context['request']
+        limits = get_upload_limits()
+        try:
+            content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            content_length = 0
+        if content_length > limits['MAX_REQUEST_BYTES']:
+            raise RequestTooLarge()
+
+        request._request.upload_handlers = [BoundedUploadHandler(request._request)]
+        return super().parse(stream, media_type, parser_context)
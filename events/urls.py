@@ -4,9 +4,25 @@ from django.urls import path
 # from .views.Registration import EventRegistrationView
 from .views import Event
 from .views import Registration
+from .views import Stream
 
 urlpatterns = [
+
+    # Registration status checks
+    path('registrations/check/', Registration.RegistrationCheckView.as_view(), name='registration-check'),
+    path('registrations/status/', Registration.RegistrationStatusView.as_view(), name='registration-status'),
+    path('registrations/status/stream/', Stream.registration_status_stream, name='registration-status-stream'),
+    path('registrations/status/wait/', Stream.registration_status_wait, name='registration-status-wait'),
+
+    # Approval (staff only)
+    path('registrations/approval/', Registration.BulkRegistrationApprovalView.as_view(), name='registration-bulk-approval'),
+    path('registrations/<int:pk>/approval/', Registration.RegistrationApprovalView.as_view(), name='registration-approval'),
     
+    # Full-text search, must come before the event detail path
+    path('search/', Event.EventSearchView.as_view(), name='event-search'),
+    # Change feed for incremental sync, also before the event detail path
+    path('changes/', Event.EventChangesView.as_view(), name='event-changes'),
+
     # Path to view the details of a single event (using the event ID)
     path('<str:event_id>/', Event.EventDetailView.as_view(), name='event-detail'),
     
@@ -15,5 +31,7 @@ urlpatterns = [
     path('<slug:event_id>/register/', Registration.EventRegistrationView.as_view(), name='event-registration'),
     
     path('<slug:event_id>/calculate_total_amount/', Event.CalculateTotalAmountView.as_view(), name='calculate-total-amount'),
-    path('<slug:event_id>/payment-methods/', Event.PaymentMethodsAPIView.as_view(), name='calculate-total-amount'),
+    path('<slug:event_id>/quotes/', Event.BatchQuoteView.as_view(), name='batch-quote'),
+    path('<slug:event_id>/registrations/export/', Registration.RegistrationExportView.as_view(), name='registration-export'),
+    path('<slug:event_id>/payment-methods/', Event.PaymentMethodsAPIView.as_view(), name='payment-methods'),
 ]
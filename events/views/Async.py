@@ -0,0 +1,160 @@
+"""
+Async versions of the read endpoints, mounted under /api/async/events/.
+
+Under an ASGI server these run on the event loop with the async ORM and
+cache API instead of going through a thread-sensitive sync adapter, so one
+worker can keep many slow clients waiting at once. Password hashing in the
+registration check runs in a thread pool. Responses are the same as their
+APIView counterparts in Event.py and Registration.py.
+"""
+import json
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_http_methods
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.request import Request
+
+from api.renderers import FastJsonResponse
+
+from ..cache import acached_response, aresponse_cache_key
+from ..models.Event import Event
+from ..models.Registration import Registration
+from ..payments import aget_payment_methods
+from ..pricing import aget_event_prices, quote
+from ..ratelimit import ais_limited, arecord_failure, areset
+from ..serializers.Event import EventSerializer
+from ..serializers.Quote import QuoteSerializer
+from ..tokens import make_status_token
+from .Event import EventListView
+
+
+def json_response(data, status=200):
+    return FastJsonResponse(data, status=status)
+
+
+def api_errors(view):
+    """Turn DRF exceptions into the error responses an APIView would send."""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            return await view(request, *args, **kwargs)
+        except APIException as exc:
+            detail = exc.detail if isinstance(exc.detail, (dict, list)) else {'detail': exc.detail}
+            return json_response(detail, status=exc.status_code)
+    return wrapper
+
+
+@require_GET
+@api_errors
+async def event_list(request):
+    # Wrapped for query_params, which the serializers and paginators expect
+    request = Request(request)
+    key = await aresponse_cache_key(request, 'event-list')
+    return await acached_response(request, key, lambda: build_event_list(request))
+
+
+async def build_event_list(request):
+    view = EventListView()
+    serializer_class = view.get_serializer_class(request)
+    context = {'request': request}
+    columns = serializer_class(context=context).get_only_fields('start_time', 'updated_at')
+
+    events = view.filter_queryset(Event.objects.only(*columns), request).order_by('start_time', 'event_id')
+    paginator = view.get_paginator(request)
+    paginated_events = await paginator.apaginate_queryset(events, request)
+    # No queries from here on, the variant lookups are storage checks
+    serializer = serializer_class(paginated_events, context=context, many=True)
+    last_modified = max((event.updated_at for event in paginated_events), default=None)
+    return paginator.get_paginated_response(serializer.data).data, last_modified
+
+
+@require_GET
+@api_errors
+async def event_detail(request, event_id):
+    request = Request(request)
+    key = await aresponse_cache_key(request, 'event-detail', event_id=event_id)
+    return await acached_response(request, key, lambda: build_event_detail(request, event_id))
+
+
+async def build_event_detail(request, event_id):
+    context = {'request': request}
+    columns = EventSerializer(context=context).get_only_fields('updated_at')
+    event = await Event.objects.only(*columns).filter(event_id=event_id).afirst()
+    if event is None:
+        raise NotFound("No Event matches the given query.")
+    return EventSerializer(event, context=context).data, event.updated_at
+
+
+@require_GET
+@api_errors
+async def calculate_total_amount(request, event_id):
+    serializer = QuoteSerializer(data=request.GET)
+    serializer.is_valid(raise_exception=True)
+
+    prices = await aget_event_prices(event_id)
+    if prices is None:
+        raise NotFound(detail="Event not found.")
+
+    return json_response({'total_amount': quote(prices, **serializer.validated_data)})
+
+
+@require_GET
+@api_errors
+async def payment_methods(request, event_id):
+    methods = await aget_payment_methods(event_id)
+    if methods is None:
+        raise NotFound(detail="Event not found.")
+    return json_response(methods)
+
+
+def read_params(request):
+    if request.method == 'GET':
+        return request.GET
+    if request.content_type == 'application/json':
+        try:
+            params = json.loads(request.body or b'{}')
+        except ValueError:
+            return {}
+        # A JSON array or string has no fields, like an empty object
+        return params if isinstance(params, dict) else {}
+    return request.POST
+
+
+@csrf_exempt
+@require_http_methods(['GET', 'POST'])
+async def registration_check(request):
+    """Same checks, rate limits and timing as RegistrationCheckView."""
+    params = read_params(request)
+    student_id = params.get('student_id')
+    password = params.get('password')
+    limit, window = getattr(settings, 'REGISTRATION_CHECK_RATE_LIMIT', (5, 15 * 60))
+    idents = [request.META.get('REMOTE_ADDR'), student_id]
+
+    if await ais_limited('registration-check', idents, limit):
+        return json_response({'error': 'Too many failed attempts, try again later.'}, status=429)
+
+    registration = await (
+        Registration.objects.select_related('event')
+        .only('id', 'password', 'approved', 'waitlisted', 'event__title')
+        .filter(student_id=student_id)
+        .afirst()
+    )
+
+    # Hashing is CPU bound, keep it off the event loop
+    if registration is None:
+        await sync_to_async(make_password, thread_sensitive=False)(password)
+    elif password and await sync_to_async(check_password, thread_sensitive=False)(password, registration.password):
+        await areset('registration-check', student_id)
+        return json_response({
+            'approved': registration.approved,
+            'waitlisted': registration.waitlisted,
+            'event': registration.event.title,
+            'status_token': make_status_token(registration),
+        })
+
+    await arecord_failure('registration-check', idents, window)
+    return json_response({'error': 'Invalid ID or Password'}, status=400)
@@ -1,80 +1,212 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from datetime import datetime, time, timedelta
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from ..models.Event import Event
-from ..serializers.Event import EventSerializer
-from rest_framework.pagination import PageNumberPagination
-from rest_framework.exceptions import NotFound
+from ..serializers.Event import EventSerializer, EventListSerializer
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from ..cache import cached_response, response_cache_key
+from ..pagination import AsyncPageNumberPagination, KeysetPagination
+from ..payments import get_payment_methods
+from ..pricing import get_event_prices, quote
+from ..serializers.Quote import QuoteSerializer, BatchQuoteSerializer
+from ..search import SearchResults
+from ..status import STATUSES
+from .. import changes
     
 class EventListView(APIView):
-    class EventPagination(PageNumberPagination):
+    class EventPagination(AsyncPageNumberPagination):
         page_size = 10  # Set the default number of items per page
         page_size_query_param = 'page_size'  # Allow clients to control the page size via query parameter
         max_page_size = 100  # Maximum page size the client can request
 
+    class EventCursorPagination(KeysetPagination):
+        page_size = 10
+        max_page_size = 100
+
+    def get_paginator(self, request):
+        # ?pagination=cursor (or following a cursor link) switches to keyset pagination
+        if request.query_params.get('pagination') == 'cursor' or 'cursor' in request.query_params:
+            return self.EventCursorPagination()
+        return self.EventPagination()
+
     def get(self, request, *args, **kwargs):
-        events = Event.objects.all()  # Fetch all events
-        paginator = self.EventPagination()
+        # Cached per page/page_size, see events/cache.py
+        key = response_cache_key(request, 'event-list')
+        return cached_response(request, key, lambda: self.build(request))
+
+    def get_serializer_class(self, request):
+        # ?view=full returns the complete event, description HTML included
+        if request.query_params.get('view') == 'full':
+            return EventSerializer
+        return EventListSerializer
+
+    def filter_queryset(self, queryset, request):
+        """
+        ?status=upcoming,ongoing and a start_time range with ?from= / ?to=
+        (ISO 8601 dates or date-times, ``to`` is exclusive for date-times and
+        includes the whole day for dates). Served by the (status, start_time) index.
+        """
+        params = request.query_params
+        errors = {}
+        if 'status' in params:
+            statuses = [value.strip() for value in params['status'].split(',') if value.strip()]
+            if not statuses or any(value not in STATUSES for value in statuses):
+                errors['status'] = [f"Choose from {', '.join(STATUSES)}, separated by commas."]
+            else:
+                queryset = queryset.filter(status__in=statuses)
+
+        for param, lookup in (('from', 'start_time__gte'), ('to', 'start_time__lt')):
+            if param not in params:
+                continue
+            try:
+                day = parse_date(params[param])
+                moment = parse_datetime(params[param]) if day is None else None
+            except ValueError:
+                day = moment = None
+            if day is not None:
+                moment = datetime.combine(day + timedelta(days=1 if param == 'to' else 0), time.min)
+            if moment is None:
+                errors[param] = ["Enter an ISO 8601 date or date and time."]
+                continue
+            if timezone.is_naive(moment):
+                moment = timezone.make_aware(moment)
+            queryset = queryset.filter(**{lookup: moment})
+
+        if errors:
+            raise ValidationError(errors)
+        return queryset
+
+    def build(self, request):
+        serializer_class = self.get_serializer_class(request)
+        context = {'request': request}
+        # Only read the columns that end up in the response (the description is skipped by default)
+        columns = serializer_class(context=context).get_only_fields('start_time', 'updated_at')
+
+        events = self.filter_queryset(Event.objects.only(*columns), request)
+        events = events.order_by('start_time', 'event_id')  # Stable order for page numbers
+        paginator = self.get_paginator(request)
         paginated_events = paginator.paginate_queryset(events, request)
-        serializer = EventSerializer(paginated_events, context={'request': request}, many=True)
-        return paginator.get_paginated_response(serializer.data)
+        serializer = serializer_class(paginated_events, context=context, many=True)
+        last_modified = max((event.updated_at for event in paginated_events), default=None)
+        return paginator.get_paginated_response(serializer.data).data, last_modified
     
+class EventSearchView(EventListView):
+    """Ranked full-text search, ?q=... (see events/search.py)."""
+
+    def get_paginator(self, request):
+        # Results are ordered by rank, so there is no keyset to page on
+        return self.EventPagination()
+
+    def get(self, request, *args, **kwargs):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            raise ValidationError({'q': ["This query parameter is required."]})
+        key = response_cache_key(request, 'event-search')
+        return cached_response(request, key, lambda: self.build(request, query))
+
+    def build(self, request, query):
+        serializer_class = self.get_serializer_class(request)
+        context = {'request': request}
+        columns = serializer_class(context=context).get_only_fields('start_time', 'updated_at')
+
+        results = SearchResults(query, self.filter_queryset(Event.objects.only(*columns), request))
+        paginator = self.get_paginator(request)
+        paginated_events = paginator.paginate_queryset(results, request)
+        serializer = serializer_class(paginated_events, context=context, many=True)
+        last_modified = max((event.updated_at for event in paginated_events), default=None)
+        return paginator.get_paginated_response(serializer.data).data, last_modified
+
+class EventChangesView(APIView):
+    """
+    Events created, updated or deleted since ``?cursor=`` (or ``?since=``),
+    oldest first, at most ``?limit=`` at a time (see events/changes.py).
+    """
+
+    def get(self, request, *args, **kwargs):
+        position = changes.read_position(request.query_params)
+        limit = changes.get_limit(request.query_params)
+        serializer_class = EventListView().get_serializer_class(request)
+        context = {'request': request}
+        columns = serializer_class(context=context).get_only_fields('updated_at')
+
+        page, position, has_more = changes.get_changes(Event.objects.only(*columns), position, limit)
+        events = [obj for kind, obj in page if kind == changes.EVENT]
+        data = iter(serializer_class(events, context=context, many=True).data)
+
+        results = []
+        for kind, obj in page:
+            if kind == changes.EVENT:
+                results.append({'op': 'upsert', 'event_id': obj.event_id, 'event': next(data)})
+            else:
+                results.append({'op': 'delete', 'event_id': obj.event_id, 'deleted_at': obj.deleted_at})
+
+        cursor = changes.encode_cursor(position)
+        return Response({
+            'results': results,
+            'has_more': has_more,
+            'cursor': cursor,
+            # Follow right away while has_more, otherwise poll it later
+            'next': replace_query_param(remove_query_param(request.build_absolute_uri(), 'since'), 'cursor', cursor),
+        })
+
 class EventDetailView(APIView):
     def get(self, request, *args, **kwargs):
         event_id = self.kwargs.get('event_id')
-        event = get_object_or_404(Event, event_id=event_id)  # Fetch the specific event
-        serializer = EventSerializer(event, context={'request': request})  # Serialize the event
-        return Response(serializer.data)  # Return the serialized event data as JSON
+        key = response_cache_key(request, 'event-detail', event_id=event_id)
+        return cached_response(request, key, lambda: self.build(request, event_id))
+
+    def build(self, request, event_id):
+        context = {'request': request}
+        columns = EventSerializer(context=context).get_only_fields('updated_at')
+        event = get_object_or_404(Event.objects.only(*columns), event_id=event_id)  # Fetch the specific event
+        serializer = EventSerializer(event, context=context)  # Serialize the event
+        return serializer.data, event.updated_at
 
 class CalculateTotalAmountView(APIView):
-    def get(self, request, *args, **kwargs):
-        event_id = request.query_params.get('event_id')
-        child_guests = int(request.query_params.get('child_guests', 0))
-        adult_guests = int(request.query_params.get('adult_guests', 0))
+    def get(self, request, event_id, *args, **kwargs):
+        serializer = QuoteSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+
+        prices = get_event_prices(event_id)
+        if prices is None:
+            raise NotFound(detail="Event not found.")
 
-        event = get_object_or_404(Event, event_id=event_id)
-        total_amount = event.amount_per_person + event.amount_per_adult_guest * adult_guests + event.amount_per_child_guest * child_guests
+        total_amount = quote(prices, **serializer.validated_data)
         return Response({'total_amount': total_amount})
 
+class BatchQuoteView(APIView):
+    """
+    Price many guest combinations of one event in a single request.
+    """
+
+    def post(self, request, event_id, *args, **kwargs):
+        serializer = BatchQuoteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        prices = get_event_prices(event_id)
+        if prices is None:
+            raise NotFound(detail="Event not found.")
+
+        quotes = [
+            dict(combination, total_amount=quote(prices, **combination))
+            for combination in serializer.validated_data['quotes']
+        ]
+        return Response({'quotes': quotes})
+
 class PaymentMethodsAPIView(APIView):
     """
     API view to fetch payment methods for a specific event.
     """
 
     def get(self, request, event_id):
-        try:
-            event = Event.objects.get(event_id=event_id)
-        except Event.DoesNotExist:
+        # Precomputed and cached per event, see events/payments.py
+        payment_methods = get_payment_methods(event_id)
+        if payment_methods is None:
             raise NotFound(detail="Event not found.")
 
-        payment_methods = {
-            "bkash": {
-                "account_number": event.bkash_account_number,
-                "payment_option": event.bkash_payment_option,
-            },
-            "nagad": {
-                "account_number": event.nagad_account_number,
-                "payment_option": event.nagad_payment_option,
-            },
-            "rocket": {
-                "account_number": event.rocket_account_number,
-                "payment_option": event.rocket_payment_option,
-            },
-            "bank": {
-                "account_name": event.bank_account_name,
-                "account_number": event.bank_account_number,
-                "bank_name": event.bank_name,
-                "branch_name": event.bank_branch_name,
-                "swift_code": event.bank_swift_code,
-                "routing_number": event.bank_routing_number,
-                "city": event.bank_city,
-                "country": event.bank_country,
-            },
-        }
-
-        # Remove empty fields
-        for key, value in payment_methods.items():
-            payment_methods[key] = {k: v for k, v in value.items() if v}
-
-        return Response(payment_methods)
\ No newline at end of file
+        return Response(payment_methods)
@@ -0,0 +1,48 @@
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.http import HttpResponseRedirect
+from django.views.static import serve
+from rest_framework.views import APIView
+from rest_framework.exceptions import NotFound
+from ..images import IMAGE_VARIANTS, VARIANT_FORMATS, ensure_variant, is_image
+from ..storage import get_setting, parse_name
+
+# Only media that is already public may be resized through this endpoint
+VARIANT_SOURCE_DIRS = ('event_media/', 'profile_picture/')
+
+class MediaVariantView(APIView):
+    """
+    Render a named size/format of an uploaded image on first request and
+    redirect to the stored file. Later requests are served by storage directly.
+    """
+
+    def get(self, request, size, fmt, source):
+        if size not in IMAGE_VARIANTS or fmt not in VARIANT_FORMATS:
+            raise NotFound(detail="Unknown image variant.")
+        if not source.startswith(VARIANT_SOURCE_DIRS) or not is_image(source) or '..' in source:
+            raise NotFound(detail="Image not found.")
+        if not default_storage.exists(source):
+            raise NotFound(detail="Image not found.")
+
+        try:
+            name = ensure_variant(default_storage, source, size, fmt)
+        except ValidationError:
+            # Not an image Pillow will decode (or too large to)
+            raise NotFound(detail="Image not found.")
+        response = HttpResponseRedirect(default_storage.url(name))
+        response['Cache-Control'] = 'public, max-age=86400'
+        return response
+
+
+def serve_media(request, path, document_root=None, show_indexes=False):
+    """
+    django.views.static.serve for MEDIA_URL. Content-addressed files never
+    change under their name, so browsers and CDNs may keep them for a year
+    without revalidating.
+    """
+    response = serve(request, path, document_root=document_root, show_indexes=show_indexes)
+    sha256 = parse_name(path)
+    if sha256 is not None and response.status_code in (200, 304):
+        response['Cache-Control'] = f"public, max-age={get_setting('CACHE_MAX_AGE')}, immutable"
+        response['ETag'] = f'"{sha256}"'
+    return response
@@ -2,52 +2,163 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.permissions import IsAdminUser
 from django.shortcuts import get_object_or_404
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
 from ..models.Event import Event
 from ..models.Registration import Registration
 from ..serializers.Registration import RegistrationSerializer
+from ..serializers.Approval import ApprovalSerializer, BulkApprovalSerializer
+from ..approvals import set_approval
+from ..exports import export_csv_response, export_xlsx_response
+from ..ratelimit import is_limited, record_failure, reset
+from ..tokens import make_status_token, read_status_token
+from ..uploads import BoundedMultiPartParser
 
 class EventRegistrationView(APIView):
+    # Uploads are streamed to temporary files with per-field size and type limits, see events/uploads.py
+    parser_classes = [BoundedMultiPartParser]
+
     def post(self, request, event_id, *args, **kwargs):
         # Fetch the Event object based on event_id
-        event = get_object_or_404(Event, event_id=event_id)
-        
-        # Prepare the data to create a Registration
-        data = request.data.copy()
-        # data['event'] = event.event_id  # Automatically set the event based on the event_id
-        data['event'] = event.event_id  # Automatically set the event based on the event_id
+        event = get_object_or_404(Event.objects.only('event_id', 'amount_per_person', 'amount_per_adult_guest', 'amount_per_child_guest'), event_id=event_id)
+
+        # Files the upload handler refused never reach the serializer, report why
+        data = request.data
+        upload_errors = getattr(request, 'upload_errors', None)
+        if upload_errors:
+            return Response(upload_errors, status=status.HTTP_400_BAD_REQUEST)
         
-        # Create the Registration instance and validate
-        serializer = RegistrationSerializer(data=data, context={'request': request})
+        # Create the Registration instance and validate, the event comes from the URL
+        serializer = RegistrationSerializer(data=data, context={'request': request, 'event': event})
         if serializer.is_valid():
-            registration = serializer.save()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            registration = serializer.save(event=event)
+            data = dict(serializer.data, status_token=make_status_token(registration))
+            return Response(data, status=status.HTTP_201_CREATED)
         
         print("Error invalid serializer")
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 class RegistrationApprovalView(APIView):
+    permission_classes = [IsAdminUser]
+
     def patch(self, request, *args, **kwargs):
         registration_id = kwargs.get('pk')
-        registration = get_object_or_404(Registration, id=registration_id)
+        get_object_or_404(Registration.objects.only('id'), id=registration_id)
+
+        serializer = ApprovalSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        approved = serializer.validated_data['approved']
+
+        # Update the approval status, the email is queued for send_notifications
+        set_approval([registration_id], approved)
 
-        # Update the approval status
-        registration.approved = True
-        registration.save()
+        message = 'Registration approved and email queued.' if approved else 'Registration rejected and email queued.'
+        return Response({'message': message}, status=status.HTTP_200_OK)
 
-        # Send email to student
-        registration.send_approval_email()
+class BulkRegistrationApprovalView(APIView):
+    """
+    Approve or reject many registrations in one request.
+    """
+    permission_classes = [IsAdminUser]
 
-        return Response({'message': 'Registration approved and email sent.'}, status=status.HTTP_200_OK)
+    def post(self, request, *args, **kwargs):
+        serializer = BulkApprovalSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        changed = set_approval(serializer.validated_data['ids'], serializer.validated_data['approved'])
+        return Response({'updated': len(changed), 'ids': changed}, status=status.HTTP_200_OK)
 
 class RegistrationCheckView(APIView):
+    """
+    Check a registration with student ID and password.
+
+    Every check costs a full password hash, so failures are rate limited per
+    client and per student ID, and unknown IDs look like wrong passwords.
+    A successful check returns a status token for RegistrationStatusView.
+    """
+
     def get(self, request, *args, **kwargs):
-        student_id = request.query_params.get('student_id')
-        password = request.query_params.get('password')
-        
-        registration = get_object_or_404(Registration, student_id=student_id)
+        return self.check(request, request.query_params)
+
+    def post(self, request, *args, **kwargs):
+        return self.check(request, request.data)
+
+    def check(self, request, params):
+        if not isinstance(params, dict):
+            params = {}  # A JSON array or string has no fields
+        student_id = params.get('student_id')
+        password = params.get('password')
+        limit, window = getattr(settings, 'REGISTRATION_CHECK_RATE_LIMIT', (5, 15 * 60))
+        idents = [request.META.get('REMOTE_ADDR'), student_id]
+
+        if is_limited('registration-check', idents, limit):
+            return Response({'error': 'Too many failed attempts, try again later.'}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+
+        registration = (
+            Registration.objects.select_related('event')
+            .only('id', 'password', 'approved', 'waitlisted', 'event__title')
+            .filter(student_id=student_id)
+            .first()
+        )
+
+        if registration is None:
+            # Spend the same time as a real check so IDs can't be enumerated by timing
+            make_password(password)
+        elif password and registration.check_password(password):
+            reset('registration-check', student_id)
+            return Response({
+                'approved': registration.approved,
+                'waitlisted': registration.waitlisted,
+                'event': registration.event.title,
+                'status_token': make_status_token(registration),
+            })
+
+        record_failure('registration-check', idents, window)
+        return Response({'error': 'Invalid ID or Password'}, status=status.HTTP_400_BAD_REQUEST)
+
+class RegistrationStatusView(APIView):
+    """
+    Approval status for the holder of a status token. Validating the token is
+    a signature check, no password hashing involved.
+    """
+
+    def get(self, request, *args, **kwargs):
+        token = request.META.get('HTTP_X_STATUS_TOKEN') or request.query_params.get('token')
+        registration_id = read_status_token(token) if token else None
+        if registration_id is None:
+            return Response({'error': 'Invalid or expired token'}, status=status.HTTP_401_UNAUTHORIZED)
+
+        registration = Registration.objects.filter(pk=registration_id).values('approved', 'waitlisted', 'event__title').first()
+        if registration is None:
+            return Response({'error': 'Invalid or expired token'}, status=status.HTTP_401_UNAUTHORIZED)
+
+        return Response({
+            'approved': registration['approved'],
+            'waitlisted': registration['waitlisted'],
+            'event': registration['event__title'],
+        })
+
+class RegistrationExportView(APIView):
+    """
+    Download the registrations of an event as CSV (streamed) or XLSX.
+    Filter with ``?approved=true|false``, pick the format with ``?file_format=csv|xlsx``.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, event_id, *args, **kwargs):
+        event = get_object_or_404(Event.objects.only('event_id'), event_id=event_id)
+        registrations = Registration.objects.filter(event=event)
+
+        approved = request.query_params.get('approved')
+        if approved is not None:
+            registrations = registrations.filter(approved=approved.lower() in ('1', 'true'))
 
-        if registration.check_password(password):
-            return Response({'approved': registration.approved, 'event': registration.event.title})
-        else:
-            return Response({'error': 'Invalid ID or Password'}, status=status.HTTP_400_BAD_REQUEST)
+        file_format = request.query_params.get('file_format', 'csv')
+        filename = f'{event.event_id}-registrations'
+        if file_format == 'xlsx':
+            return export_xlsx_response(registrations, filename)
+        if file_format == 'csv':
+            return export_csv_response(registrations, filename)
+        return Response({'error': 'file_format must be csv or xlsx'}, status=status.HTTP_400_BAD_REQUEST)
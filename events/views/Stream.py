@@ -0,0 +1,112 @@
+"""
+Async views that hold a connection open until a registration's approval
+changes. Served by the ASGI application, each waiting client is a cheap
+coroutine instead of a worker thread.
+"""
+import asyncio
+import json
+
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from ..broker import get_broker, registration_channel
+from ..models.Registration import Registration
+from ..tokens import read_status_token
+
+
+def get_stream_setting(name, default):
+    return getattr(settings, 'REGISTRATION_STATUS_STREAM', {}).get(name, default)
+
+
+async def open_subscription(request):
+    """Validate the status token, subscribe and read the current state (in that order, so no change is missed)."""
+    token = request.headers.get('X-Status-Token') or request.GET.get('token')
+    registration_id = read_status_token(token) if token else None
+    if registration_id is None:
+        return None, None
+
+    subscription = await get_broker().subscribe(registration_channel(registration_id))
+    state = await Registration.objects.filter(pk=registration_id).values('approved').afirst()
+    if state is None:
+        subscription.close()
+        return None, None
+    return subscription, state['approved']
+
+
+def server_sent_event(name, data):
+    return f'event: {name}\ndata: {json.dumps(data)}\n\n'
+
+
+@require_GET
+async def registration_status_stream(request):
+    """
+    Server-sent events: the current status right away, then every change,
+    with comment heartbeats in between. The stream ends once the
+    registration is approved or after MAX_DURATION seconds (EventSource reconnects).
+    """
+    subscription, approved = await open_subscription(request)
+    if subscription is None:
+        return JsonResponse({'error': 'Invalid or expired token'}, status=401)
+
+    heartbeat = get_stream_setting('HEARTBEAT', 15)
+    max_duration = get_stream_setting('MAX_DURATION', 300)
+
+    async def stream():
+        nonlocal approved
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max_duration
+        try:
+            yield server_sent_event('status', {'approved': approved})
+            while not approved:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                message = await subscription.get(timeout=min(heartbeat, remaining))
+                if message is None:
+                    yield ': keep-alive\n\n'
+                elif message['approved'] != approved:
+                    approved = message['approved']
+                    yield server_sent_event('status', {'approved': approved})
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Don't let nginx buffer the stream
+    return response
+
+
+@require_GET
+async def registration_status_wait(request):
+    """
+    Long-poll fallback: pass the last known ``approved`` value and the
+    response is held until it changes or ``timeout`` seconds pass.
+    """
+    subscription, approved = await open_subscription(request)
+    if subscription is None:
+        return JsonResponse({'error': 'Invalid or expired token'}, status=401)
+
+    known = request.GET.get('approved')
+    known = None if known is None else known.lower() in ('1', 'true')
+    max_wait = get_stream_setting('MAX_WAIT', 30)
+    try:
+        timeout = min(float(request.GET.get('timeout', max_wait)), max_wait)
+    except ValueError:
+        timeout = max_wait
+
+    try:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while known is not None and approved == known:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            message = await subscription.get(timeout=remaining)
+            if message is None:
+                break
+            approved = message['approved']
+    finally:
+        subscription.close()
+
+    return JsonResponse({'approved': approved})
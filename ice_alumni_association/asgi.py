@@ -3,6 +3,10 @@ ASGI config for ice_alumni_association project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve it with an ASGI server (e.g. ``uvicorn ice_alumni_association.asgi:application``)
+so the async registration status stream/long-poll views hold their
+connections as coroutines rather than worker threads.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
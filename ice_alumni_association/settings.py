@@ -40,18 +40,42 @@ INSTALLED_APPS = [
     'api',
     'events',
     'rest_framework',
+    'import_export',
 ]
 
 import os
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Uploads are stored once per distinct content, named by their SHA-256, see events/storage.py.
+# Move existing files with `python manage.py migrate_media_storage`
+STORAGES = {
+    'default': {'BACKEND': 'events.storage.ContentAddressedStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+MEDIA_STORAGE = {
+    'CONTENT_ADDRESSED_DIRS': ('event_media', 'profile_picture', 'transactions_documents'),
+    'SHARD_LEVELS': 2,  # Subdirectories of two hex digits each, 65536 leaf directories
+    'CACHE_MAX_AGE': 365 * 24 * 60 * 60,  # Seconds, for the immutable content-addressed URLs
+    'RECOUNT_GRACE': 60 * 60,  # Seconds a new file is left alone by migrate_media_storage --recount-only
+}
+
 TIME_ZONE = 'Asia/Dhaka'
 USE_TZ = True  # Django will store times in UTC internally, but you can use local time when necessary
 
+# Background image processing, run the worker with `python manage.py process_image_jobs`
+IMAGE_JOBS = {
+    'EAGER': False,  # Process right after the request commits instead of waiting for the worker
+    'MAX_ATTEMPTS': 3,
+    'RETRY_DELAY': 30,  # Seconds, doubled after every failed attempt
+    'STALE_AFTER': 600,  # Seconds before a job stuck in processing is picked up again
+}
+
 
 
 MIDDLEWARE = [
+    'api.instrumentation.RequestMetricsMiddleware',  # First, so its timings cover everything below
+    'api.compression.CompressionMiddleware',  # Configured by REST_FRAMEWORK['COMPRESSION']
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -85,12 +109,193 @@ WSGI_APPLICATION = 'ice_alumni_association.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# SQLite by default. Set DB_ENGINE=postgresql (and the POSTGRES_* variables) to use
+# PostgreSQL with a psycopg connection pool: pip install "psycopg[binary,pool]"
+
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'ice_alumni_association'),
+            'USER': os.environ.get('POSTGRES_USER', 'postgres'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                # Pooled connections can't also be persistent, so CONN_MAX_AGE stays 0
+                'pool': {
+                    'min_size': int(os.environ.get('POSTGRES_POOL_MIN_SIZE', 2)),
+                    'max_size': int(os.environ.get('POSTGRES_POOL_MAX_SIZE', 10)),
+                    'timeout': int(os.environ.get('POSTGRES_POOL_TIMEOUT', 10)),
+                },
+            },
+        }
+    }
+    if os.environ.get('POSTGRES_POOL', '1') == '0':
+        # e.g. behind pgbouncer: plain persistent connections instead
+        del DATABASES['default']['OPTIONS']['pool']
+        DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', 60))
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            # Keep connections between requests, checked before reuse
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 600)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                # Take the write lock when a transaction starts, so two writers wait
+                # for each other instead of one failing with "database is locked"
+                'transaction_mode': 'IMMEDIATE',
+            },
+            # A file rather than the in-memory default, so the threads of the write
+            # concurrency tests share it with WAL and the busy timeout like workers do.
+            # Removed after the run, and ignored by git if a run is interrupted.
+            'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+        }
+    }
+
+# Set on every new SQLite connection by api/db.py, on top of its DEFAULT_SQLITE_PRAGMAS
+SQLITE_PRAGMAS = {}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+# The event responses are invalidated by bumping a key in this cache (events/cache.py),
+# which reaches other processes only through a shared cache. Set REDIS_URL when running
+# more than one worker, or when management commands change events next to the server.
+REDIS_URL = os.environ.get('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
     }
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    # orjson when installed, 'stdlib' forces the json module (see api/renderers.py)
+    'JSON_BACKEND': os.environ.get('JSON_BACKEND', 'auto'),
+    # Negotiated gzip/brotli for responses of at least MIN_SIZE bytes (see api/compression.py)
+    'COMPRESSION': {
+        'ENABLED': True,
+        'MIN_SIZE': 1024,
+        'CONTENT_TYPES': ('application/json', 'text/', 'application/javascript', 'image/svg+xml'),
+        'BROTLI_QUALITY': 5,
+    },
+}
+
+# Seconds a cached event list/detail response is kept, saves and deletes invalidate it earlier.
+# A per-process cache only sees the invalidations of its own process, so stale responses
+# are bounded by this timeout there
+EVENTS_CACHE_TIMEOUT = int(os.environ.get('EVENTS_CACHE_TIMEOUT', 300 if REDIS_URL else 10))
+
+# Seconds the per-event prices and payment methods are cached, bounded the same way
+EVENTS_LOOKUP_CACHE_TIMEOUT = int(os.environ.get('EVENTS_LOOKUP_CACHE_TIMEOUT', 60 * 60 * 24 if REDIS_URL else 10))
+
+# Seconds a registration status token stays valid
+REGISTRATION_STATUS_TOKEN_MAX_AGE = 60 * 60
+
+# Registration status push (events/views/Stream.py). Use events.broker.CacheBroker
+# with a shared cache when running more than one worker process.
+EVENTS_BROKER = {
+    'BACKEND': 'events.broker.InProcessBroker',
 }
+REGISTRATION_STATUS_STREAM = {
+    'HEARTBEAT': 15,  # Seconds between keep-alive comments
+    'MAX_DURATION': 300,  # Seconds before a stream is closed, EventSource reconnects by itself
+    'MAX_WAIT': 30,  # Longest long-poll in seconds
+}
+
+# Registration uploads (events/uploads.py): bytes allowed per file field, and the most
+# pixels an image may have before it is rejected without being decoded
+REGISTRATION_UPLOADS = {
+    'MAX_BYTES': {
+        'profile_picture': 5 * 1024 * 1024,
+        'transaction_document': 10 * 1024 * 1024,
+    },
+    'MAX_REQUEST_BYTES': 20 * 1024 * 1024,
+    'MAX_IMAGE_PIXELS': 40_000_000,
+}
+
+# Failed registration checks allowed per client/student ID, and the window in seconds
+REGISTRATION_CHECK_RATE_LIMIT = (5, 15 * 60)
+
+# Addresses allowed to scrape /api/metrics/
+INTERNAL_IPS = ['127.0.0.1']
+
+# Change feed at /api/events/changes/ (events/changes.py)
+CHANGE_FEED = {
+    'DEFAULT_LIMIT': 100,
+    'MAX_LIMIT': 500,  # Most changes returned per request
+    'SETTLE_SECONDS': 2,  # Changes this recent are held back until slower transactions have committed
+    'TOMBSTONE_RETENTION_DAYS': 90,  # Older cursors get 410 Gone, prune with `python manage.py prune_event_tombstones`
+}
+
+# Per-request query count and timings (api/instrumentation.py). QUERY_BUDGETS is the
+# most queries a view may run before its request is logged as a warning, and what
+# api.testing.query_budget() checks against. Cached responses run none.
+REQUEST_METRICS = {
+    'ENABLED': True,
+    'SERVER_TIMING': os.environ.get('SERVER_TIMING', '') == '1',  # Add a Server-Timing header for INTERNAL_IPS
+    'QUERY_BUDGETS': {
+        'event-list': 2,
+        'event-search': 3,
+        'event-changes': 2,
+        'event-detail': 1,
+        'calculate-total-amount': 1,
+        'batch-quote': 1,
+        'payment-methods': 2,
+        'registration-check': 1,
+        'registration-status': 1,
+    },
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # One JSON line per request
+        'api.requests': {
+            'handlers': ['console'],
+            'level': os.environ.get('REQUEST_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+
+# Email
+# https://docs.djangoproject.com/en/5.1/topics/email/
+# Queued registrant emails are sent by `python manage.py send_notifications`.
+# Use django.core.mail.backends.filebased.EmailBackend with EMAIL_FILE_PATH to keep them on disk.
+
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 25))
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', '') == '1'
+EMAIL_FILE_PATH = os.environ.get('EMAIL_FILE_PATH', os.path.join(BASE_DIR, 'sent_emails'))
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'ICE Alumni Association <noreply@localhost>')
 
 
 # Password validation
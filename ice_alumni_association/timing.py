@@ -0,0 +1,40 @@
+"""
+Request timing shared by the apps.
+
+RequestMetricsMiddleware in api/instrumentation.py sets the metrics of the
+request being handled, the other apps time their own work with ``span()``
+without depending on the api app.
+"""
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_started = None
+        self.render_time = 0.0
+        self.spans = defaultdict(float)
+
+
+def current():
+    """Metrics of the request being handled, or None outside a request."""
+    return _current.get()
+
+
+@contextmanager
+def span(name):
+    """Time a block as its own Server-Timing entry (does nothing outside a request)."""
+    metrics = _current.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            metrics.spans[name] += time.perf_counter() - started